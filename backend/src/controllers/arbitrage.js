@@ -3,62 +3,38 @@ const asyncHandler = require('../middleware/async');
 const { spawn } = require('child_process');
 const path = require('path');
 const Product = require('../models/products');
+const { getSearchClient } = require('../utils/searchClient');
 
 // @desc    Search for profitable products
 // @route   GET /api/v1/arbitrage/search
 // @access  Private
 exports.searchProducts = asyncHandler(async (req, res, next) => {
-  const { keywords, category, minProfit, maxPrice } = req.query;
+  const { keywords, category, minProfit, maxPrice, limit } = req.query;
   
   // Validate required parameters
   if (!keywords) {
     return next(new ErrorResponse('Please provide search keywords', 400));
   }
   
-  // Call the Python product finder script
-  const scriptPath = path.join(__dirname, '../../../scripts/product_finder.py');
-  const args = [
-    '--keywords', keywords,
-    '--min-profit', minProfit || '5',
-    '--max-price', maxPrice || '100'
-  ];
-  
-  if (category) {
-    args.push('--category', category);
+  // Ask the long-lived Python search service
+  let results;
+  try {
+    results = await getSearchClient().search({
+      keywords,
+      category,
+      minProfit: minProfit || 5,
+      maxPrice: maxPrice || 100,
+      limit
+    });
+  } catch (err) {
+    console.error('Error from search service', err);
+    return next(new ErrorResponse('Error searching for products', 500));
   }
   
-  const pythonProcess = spawn('python3', [scriptPath, ...args]);
-  
-  let dataString = '';
-  let errorString = '';
-  
-  pythonProcess.stdout.on('data', (data) => {
-    dataString += data.toString();
-  });
-  
-  pythonProcess.stderr.on('data', (data) => {
-    errorString += data.toString();
-  });
-  
-  pythonProcess.on('close', (code) => {
-    if (code !== 0) {
-      console.error(`Product finder script exited with code ${code}`);
-      console.error(errorString);
-      return next(new ErrorResponse('Error searching for products', 500));
-    }
-    
-    try {
-      const results = JSON.parse(dataString);
-      
-      res.status(200).json({
-        success: true,
-        count: results.length,
-        data: results
-      });
-    } catch (err) {
-      console.error('Error parsing product finder results', err);
-      return next(new ErrorResponse('Error processing search results', 500));
-    }
+  res.status(200).json({
+    success: true,
+    count: results.length,
+    data: results
   });
 });
 
@@ -185,44 +161,26 @@ exports.checkProfitability = asyncHandler(async (req, res, next) => {
     });
   }
   
-  // Otherwise, fetch the price from Amazon API
-  const scriptPath = path.join(__dirname, '../../../scripts/product_finder.py');
-  const args = ['--product-id', amazonProductId, '--check-price-only'];
-  
-  const pythonProcess = spawn('python3', [scriptPath, ...args]);
-  
-  let dataString = '';
-  let errorString = '';
+  // Otherwise, fetch the price from Amazon through the search service
+  let result;
+  try {
+    result = await getSearchClient().product(amazonProductId);
+  } catch (err) {
+    console.error('Error checking product price', err);
+    return next(new ErrorResponse('Error checking product price', 500));
+  }
   
-  pythonProcess.stdout.on('data', (data) => {
-    dataString += data.toString();
-  });
+  if (!result) {
+    return next(new ErrorResponse(`No Amazon price found for ${amazonProductId}`, 404));
+  }
   
-  pythonProcess.stderr.on('data', (data) => {
-    errorString += data.toString();
-  });
+  const profitability = calculateProfitability(result.amazon_price);
   
-  pythonProcess.on('close', (code) => {
-    if (code !== 0) {
-      console.error(`Product price check script exited with code ${code}`);
-      console.error(errorString);
-      return next(new ErrorResponse('Error checking product price', 500));
-    }
-    
-    try {
-      const result = JSON.parse(dataString);
-      const profitability = calculateProfitability(result.price);
-      
-      res.status(200).json({
-        success: true,
-        data: {
-          ...profitability,
-          productDetails: result
-        }
-      });
-    } catch (err) {
-      console.error('Error parsing price check results', err);
-      return next(new ErrorResponse('Error processing price data', 500));
+  res.status(200).json({
+    success: true,
+    data: {
+      ...profitability,
+      productDetails: result
     }
   });
 });
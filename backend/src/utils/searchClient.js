@@ -0,0 +1,232 @@
+const net = require('net');
+const fs = require('fs');
+const path = require('path');
+const { spawn } = require('child_process');
+
+const SCRIPTS_DIR = path.join(__dirname, '../../../scripts');
+
+const DEFAULTS = {
+  socketPath: process.env.SEARCH_SERVICE_SOCKET || path.join(__dirname, '../../../data/search_service.sock'),
+  poolSize: parseInt(process.env.SEARCH_SERVICE_POOL_SIZE, 10) || 4,
+  timeout: parseInt(process.env.SEARCH_SERVICE_TIMEOUT, 10) || 60000,
+  // Start the Python service on first use when nothing is listening yet
+  autoStart: process.env.SEARCH_SERVICE_AUTOSTART !== 'false',
+  startTimeout: 30000,
+  pythonPath: process.env.PYTHON_PATH || 'python3'
+};
+
+// One socket to the search service; many requests can be in flight on it
+class Connection {
+  constructor(socketPath) {
+    this.pending = new Map();
+    this.buffer = '';
+    this.closed = false;
+    this.socket = net.createConnection(socketPath);
+    this.ready = new Promise((resolve, reject) => {
+      this.socket.once('connect', resolve);
+      this.socket.once('error', reject);
+    });
+
+    this.socket.setEncoding('utf8');
+    this.socket.on('data', (chunk) => this.onData(chunk));
+    this.socket.on('error', (err) => this.fail(err));
+    this.socket.on('close', () => this.fail(new Error('Search service connection closed')));
+  }
+
+  onData(chunk) {
+    this.buffer += chunk;
+    let newline;
+    while ((newline = this.buffer.indexOf('\n')) >= 0) {
+      const line = this.buffer.slice(0, newline);
+      this.buffer = this.buffer.slice(newline + 1);
+      if (!line.trim()) continue;
+
+      let response;
+      try {
+        response = JSON.parse(line);
+      } catch (err) {
+        console.error('Unparseable search service response', err);
+        continue;
+      }
+
+      const request = this.pending.get(response.id);
+      if (!request) continue;
+      this.pending.delete(response.id);
+      clearTimeout(request.timer);
+
+      if (response.error) {
+        const err = new Error(response.error.message);
+        err.code = response.error.code;
+        request.reject(err);
+      } else {
+        request.resolve(response.result);
+      }
+    }
+  }
+
+  send(id, method, params, timeout) {
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`Search service ${method} request timed out`));
+      }, timeout);
+
+      this.pending.set(id, { resolve, reject, timer });
+      this.socket.write(JSON.stringify({ jsonrpc: '2.0', id, method, params }) + '\n');
+    });
+  }
+
+  fail(err) {
+    this.closed = true;
+    for (const request of this.pending.values()) {
+      clearTimeout(request.timer);
+      request.reject(err);
+    }
+    this.pending.clear();
+  }
+
+  close() {
+    this.closed = true;
+    this.socket.end();
+  }
+}
+
+// Pool of connections to the long-lived Python search service
+class SearchClient {
+  constructor(options = {}) {
+    this.options = { ...DEFAULTS, ...options };
+    this.connections = [];
+    this.connecting = [];
+    this.nextId = 1;
+    this.starting = null;
+    this.child = null;
+  }
+
+  // Send a JSON-RPC request on the least busy connection
+  async call(method, params = {}) {
+    const connection = await this.acquire();
+    return connection.send(this.nextId++, method, params, this.options.timeout);
+  }
+
+  search({ keywords, category, minProfit, maxPrice, limit } = {}) {
+    return this.call('search', {
+      keywords,
+      category: category || null,
+      min_profit: minProfit != null ? Number(minProfit) : null,
+      max_price: maxPrice != null ? Number(maxPrice) : null,
+      limit: limit != null ? Number(limit) : null
+    });
+  }
+
+  product(asin) {
+    return this.call('product', { asin });
+  }
+
+  ping() {
+    return this.call('ping');
+  }
+
+  async acquire() {
+    this.connections = this.connections.filter((c) => !c.closed);
+
+    if (this.connections.length + this.connecting.length < this.options.poolSize) {
+      const pending = this.connect();
+      this.connecting.push(pending);
+      try {
+        const connection = await pending;
+        this.connections.push(connection);
+        return connection;
+      } finally {
+        this.connecting = this.connecting.filter((p) => p !== pending);
+      }
+    }
+
+    // Pool is full but nothing is open yet: share a connection being opened
+    if (this.connections.length === 0) {
+      return Promise.race(this.connecting);
+    }
+
+    return this.connections.reduce((best, c) => (c.pending.size < best.pending.size ? c : best));
+  }
+
+  async connect() {
+    try {
+      const connection = new Connection(this.options.socketPath);
+      await connection.ready;
+      return connection;
+    } catch (err) {
+      if (!this.options.autoStart || !['ENOENT', 'ECONNREFUSED'].includes(err.code)) {
+        throw err;
+      }
+      await this.startService();
+      const connection = new Connection(this.options.socketPath);
+      await connection.ready;
+      return connection;
+    }
+  }
+
+  // Spawn the service once and wait for its socket to accept connections
+  startService() {
+    if (!this.starting) {
+      this.starting = new Promise((resolve, reject) => {
+        fs.mkdirSync(path.dirname(this.options.socketPath), { recursive: true });
+
+        const child = spawn(
+          this.options.pythonPath,
+          [path.join(SCRIPTS_DIR, 'search_service.py'), '--socket', this.options.socketPath],
+          { cwd: SCRIPTS_DIR, stdio: ['ignore', 'ignore', 'inherit'] }
+        );
+        // The service lives as long as this process: stopped by close() or on exit
+        this.child = child;
+        const stop = () => child.kill();
+        process.once('exit', stop);
+        child.on('exit', (code) => {
+          console.error(`Search service exited with code ${code}`);
+          process.removeListener('exit', stop);
+          if (this.child === child) this.child = null;
+          this.starting = null;
+        });
+
+        const deadline = Date.now() + this.options.startTimeout;
+        const probe = () => {
+          const socket = net.createConnection(this.options.socketPath);
+          socket.once('connect', () => {
+            socket.end();
+            resolve();
+          });
+          socket.once('error', () => {
+            if (Date.now() > deadline) {
+              this.starting = null;
+              reject(new Error('Search service did not start in time'));
+            } else {
+              setTimeout(probe, 100);
+            }
+          });
+        };
+        probe();
+      });
+    }
+    return this.starting;
+  }
+
+  close() {
+    this.connections.forEach((c) => c.close());
+    this.connections = [];
+    if (this.child) {
+      this.child.kill();
+      this.child = null;
+    }
+  }
+}
+
+let sharedClient = null;
+
+// Process-wide client shared by all controllers
+const getSearchClient = () => {
+  if (!sharedClient) {
+    sharedClient = new SearchClient();
+  }
+  return sharedClient;
+};
+
+module.exports = { SearchClient, getSearchClient };
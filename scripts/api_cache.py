@@ -0,0 +1,233 @@
+"""
+Persistent response cache for Amazon PA-API calls
+"""
+
+import os
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from config import API_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Counting entries is a full index scan, so the size bound is enforced
+# every this many writes rather than on each one
+EVICTION_CHECK_EVERY = 64
+
+def _canonical(value):
+    """Reduce a request value to plain, order-independent JSON data"""
+    if hasattr(value, 'to_dict'):
+        value = value.to_dict()
+    elif hasattr(value, '__dict__') and not isinstance(value, type):
+        value = vars(value)
+
+    if isinstance(value, dict):
+        return {str(k).lstrip('_'): _canonical(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple, set)):
+        items = [_canonical(v) for v in value]
+        # Item ids and resources are sets as far as the API is concerned
+        if all(isinstance(v, (str, int, float)) for v in items):
+            return sorted(items, key=str)
+        return items
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+def request_key(operation, request):
+    """Canonical hash of an operation and its request parameters"""
+    payload = json.dumps([operation, _canonical(request)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """On-disk TTL cache of PA-API responses with LRU eviction
+
+    Entries live for the shortest TTL among the resources the request asked
+    for, so anything involving offers expires quickly while item info and
+    images are kept for days. An expired entry is still served for
+    stale_while_revalidate seconds while a background thread refreshes it.
+    The store is bounded to max_entries (checked every EVICTION_CHECK_EVERY
+    writes), evicting least recently used first.
+    """
+
+    def __init__(self, path=None, ttls=None, default_ttl=None, max_entries=None, stale_while_revalidate=None):
+        """Open (or create) the cache file"""
+        self.path = path or API_CACHE_CONFIG['filename']
+        self.ttls = ttls if ttls is not None else API_CACHE_CONFIG['ttl']
+        self.default_ttl = default_ttl if default_ttl is not None else API_CACHE_CONFIG['default_ttl']
+        self.max_entries = max_entries if max_entries is not None else API_CACHE_CONFIG['max_entries']
+        self.stale_while_revalidate = (stale_while_revalidate if stale_while_revalidate is not None
+                                       else API_CACHE_CONFIG['stale_while_revalidate'])
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._writes = 0
+        self.counters = {'hits': 0, 'misses': 0, 'stale_hits': 0, 'refreshes': 0, 'evictions': 0}
+
+        self._connection().execute('''
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            operation TEXT NOT NULL,
+            value BLOB NOT NULL,
+            expires REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+        ''')
+        self._connection().execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+
+    def _connection(self):
+        """This thread's connection to the cache file"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter):
+        """Increment a hit/miss counter"""
+        with self._lock:
+            self.counters[counter] += 1
+
+    def ttl_for(self, request):
+        """Shortest TTL among the resources a request asks for"""
+        resources = getattr(request, 'resources', None) or []
+        ttls = []
+
+        for resource in resources:
+            # Resources look like 'Offers.Listings.Price'; the TTL is set per family
+            family = str(getattr(resource, 'value', resource)).split('.')[0]
+            ttls.append(self.ttls.get(family, self.default_ttl))
+
+        return min(ttls) if ttls else self.default_ttl
+
+    def get_or_fetch(self, operation, request, fetch):
+        """Return the cached response for a request, calling fetch() on a miss
+
+        A fresh hit never calls fetch. A stale hit inside the revalidation
+        window is returned immediately and refreshed in the background.
+        Failed or empty responses are not cached.
+        """
+        key = request_key(operation, request)
+        now = time.time()
+
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading response cache: {e}")
+            row = None
+
+        if row is not None:
+            value, expires = row
+            if now < expires or now < expires + self.stale_while_revalidate:
+                try:
+                    response = pickle.loads(value)
+                except Exception as e:
+                    logger.warning(f"Discarding unreadable cache entry for {operation}: {e}")
+                else:
+                    self._touch(key, now)
+                    if now < expires:
+                        self._count('hits')
+                    else:
+                        self._count('stale_hits')
+                        self._refresh_in_background(key, operation, request, fetch)
+                    return response
+
+        self._count('misses')
+        response = fetch()
+        self._store(key, operation, request, response)
+        return response
+
+    def _touch(self, key, now):
+        """Record an access for LRU eviction"""
+        try:
+            self._connection().execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.debug(f"Could not update cache access time: {e}")
+
+    def _refresh_in_background(self, key, operation, request, fetch):
+        """Re-fetch a stale entry on a daemon thread, once per key at a time"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._store(key, operation, request, fetch())
+                self._count('refreshes')
+            except Exception as e:
+                logger.warning(f"Background refresh of {operation} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name='CacheRefresh', daemon=True).start()
+
+    def _store(self, key, operation, request, response):
+        """Write a response to the cache and enforce the size bound"""
+        if response is None:
+            return
+
+        try:
+            value = pickle.dumps(response, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug(f"Response for {operation} is not cacheable: {e}")
+            return
+
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, operation, value, expires, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, operation, value, now + self.ttl_for(request), now)
+            )
+            with self._lock:
+                self._writes += 1
+                check = self._writes % EVICTION_CHECK_EVERY == 0
+            if check:
+                self._evict(conn)
+        except sqlite3.Error as e:
+            logger.error(f"Error writing response cache: {e}")
+
+    def _evict(self, conn):
+        """Drop least recently used entries beyond max_entries"""
+        excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return
+
+        conn.execute('''
+        DELETE FROM responses WHERE key IN (
+            SELECT key FROM responses ORDER BY last_access LIMIT ?
+        )
+        ''', (excess,))
+        with self._lock:
+            self.counters['evictions'] += excess
+
+    def stats(self):
+        """Hit/miss counters plus the hit ratio and current entry count"""
+        with self._lock:
+            stats = dict(self.counters)
+
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+        try:
+            stats['entries'] = self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        except sqlite3.Error:
+            stats['entries'] = None
+        return stats
+
+    def clear(self):
+        """Remove every cached response"""
+        self._connection().execute("DELETE FROM responses")
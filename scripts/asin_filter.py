@@ -0,0 +1,111 @@
+"""
+Known-ASIN membership filter for Amazon to eBay Arbitrage System
+"""
+
+import os
+import json
+import math
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings
+
+    Membership tests never miss an added item; they report a false positive
+    for roughly error_rate of unseen items once capacity items are added.
+    The filter can be saved to and loaded from a snapshot file together with
+    a small metadata dict.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        """Size the bit array and hash count for capacity items at error_rate"""
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        self.meta = {}
+
+    def _positions(self, item):
+        """Bit positions for an item, by double hashing one blake2b digest"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        """Add an item; returns True if it was not (apparently) present before"""
+        added = False
+        for pos in self._positions(item):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                added = True
+
+        if added:
+            self.count += 1
+        return added
+
+    def update(self, items):
+        """Add every item from an iterable"""
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+    def save(self, path):
+        """Write the filter to path atomically"""
+        header = {
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'num_bits': self.num_bits,
+            'num_hashes': self.num_hashes,
+            'count': self.count,
+            'meta': self.meta
+        }
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a filter saved with save(), or return None if it is missing or unreadable"""
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                bits = bytearray(f.read())
+        except (OSError, ValueError) as e:
+            logger.info(f"No usable ASIN filter snapshot at {path}: {e}")
+            return None
+
+        bloom = cls.__new__(cls)
+        try:
+            bloom.capacity = header['capacity']
+            bloom.error_rate = header['error_rate']
+            bloom.num_bits = int(header['num_bits'])
+            bloom.num_hashes = header['num_hashes']
+            bloom.count = header['count']
+            bloom.meta = header.get('meta', {})
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"ASIN filter snapshot at {path} has a bad header, ignoring it: {e}")
+            return None
+        bloom.bits = bits
+
+        if len(bits) != (bloom.num_bits + 7) // 8:
+            logger.warning(f"ASIN filter snapshot at {path} is truncated, ignoring it")
+            return None
+
+        return bloom
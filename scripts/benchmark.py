@@ -0,0 +1,263 @@
+"""
+Benchmarks for Amazon to eBay Arbitrage System
+"""
+
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import logging
+
+from database import ArbitrageDatabase
+from product import Product
+from price_calculator import PriceCalculator
+from scoring import filter_profitable, filter_profitable_loop, products_frame, score_frame, profitable_mask
+
+logger = logging.getLogger('benchmark')
+
+CATEGORIES = ['Electronics', 'Home & Kitchen', 'Toys & Games', 'Office Products', 'Sports & Outdoors']
+
+def synthetic_product_dicts(count, seed=42):
+    """Generate synthetic products as the per-item dicts used before Product"""
+    rng = random.Random(seed)
+
+    for i in range(count):
+        amazon_price = round(rng.uniform(15.0, 100.0), 2)
+        ebay_price = round(amazon_price * rng.uniform(1.0, 1.6), 2)
+        yield {
+            'asin': f"B{i:09d}",
+            'title': f"Synthetic product {i}",
+            'amazon_price': amazon_price,
+            'ebay_price': ebay_price,
+            'profit_margin': (ebay_price - amazon_price) / amazon_price,
+            'category': rng.choice(CATEGORIES),
+            'image_url': f"https://example.com/images/{i}.jpg",
+            'description': f"Synthetic product {i}"
+        }
+
+def synthetic_products(count, seed=42):
+    """Generate synthetic Product records shaped like ProductFinder output"""
+    rng = random.Random(seed)
+
+    for i in range(count):
+        amazon_price = round(rng.uniform(15.0, 100.0), 2)
+        ebay_price = round(amazon_price * rng.uniform(1.0, 1.6), 2)
+        yield Product.from_prices(
+            f"B{i:09d}", f"Synthetic product {i}", amazon_price, ebay_price,
+            profit_margin=(ebay_price - amazon_price) / amazon_price,
+            category=rng.choice(CATEGORIES),
+            image_url=f"https://example.com/images/{i}.jpg",
+            description=f"Synthetic product {i}"
+        )
+
+def _timed(label, func):
+    """Run func and print its wall time"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:>8.3f}s")
+    return elapsed, result
+
+def bench_ingest(rows, baseline_rows, chunk_size):
+    """Compare per-row add_product against add_products_bulk"""
+    work_dir = tempfile.mkdtemp(prefix='arbitrage_bench_')
+
+    try:
+        print(f"Product ingestion ({rows} rows bulk, {baseline_rows} rows per-row baseline)")
+        print("-" * 60)
+
+        # Baseline: one add_product call (and one commit) per row
+        db = ArbitrageDatabase(os.path.join(work_dir, 'baseline.sqlite'))
+        db.connect()
+        db.setup_database()
+
+        def per_row():
+            for p in synthetic_products(baseline_rows):
+                db.add_product(p.asin, p.title, p.amazon_price, p.ebay_price, p.profit_margin,
+                               p.category, p.image_url, p.description)
+
+        baseline_time, _ = _timed("add_product (per row)", per_row)
+        db.close()
+
+        # Bulk: streamed through executemany inside one transaction
+        db = ArbitrageDatabase(os.path.join(work_dir, 'bulk.sqlite'))
+        db.connect()
+        db.setup_database()
+
+        bulk_time, counts = _timed(
+            "add_products_bulk",
+            lambda: db.add_products_bulk(synthetic_products(rows), chunk_size=chunk_size)
+        )
+        print(f"  {counts}")
+
+        # Re-ingesting the same rows exercises the ignore path
+        _, counts = _timed(
+            "add_products_bulk (all duplicates)",
+            lambda: db.add_products_bulk(synthetic_products(rows), chunk_size=chunk_size)
+        )
+        print(f"  {counts}")
+        db.close()
+
+        print("-" * 60)
+        print(f"per-row: {baseline_rows / baseline_time:>12,.0f} rows/s")
+        print(f"bulk:    {rows / bulk_time:>12,.0f} rows/s")
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def synthetic_candidates(count, seed=42):
+    """Generate search candidates, some without an eBay price, spanning the price band edges"""
+    rng = random.Random(seed)
+    candidates = []
+
+    for i in range(count):
+        amazon_price = round(rng.uniform(5.0, 150.0), 2)
+        ebay_price = round(amazon_price * rng.uniform(0.9, 1.6), 2) if rng.random() < 0.5 else None
+        candidates.append(Product.from_prices(f"B{i:09d}", f"Candidate {i}", amazon_price, ebay_price,
+                                              category=rng.choice(CATEGORIES)))
+
+    return candidates
+
+def bench_scoring(rows):
+    """Compare the per-product scoring loop against batch scoring"""
+    print(f"Profitability scoring ({rows} candidates)")
+    print("-" * 60)
+
+    # Both paths fill in fields on the products they keep, so each gets its own copy
+    loop_input = synthetic_candidates(rows)
+    batch_input = synthetic_candidates(rows)
+
+    loop_time, loop_result = _timed("filter_profitable_loop", lambda: filter_profitable_loop(loop_input))
+    batch_time, batch_result = _timed("filter_profitable (vectorized)", lambda: filter_profitable(batch_input))
+
+    # The column arithmetic alone, without converting to and from records
+    frame = products_frame(synthetic_candidates(rows))
+    column_time, _ = _timed("score_frame + profitable_mask", lambda: profitable_mask(score_frame(frame)))
+
+    same = (
+        [p.asin for p in loop_result] == [p.asin for p in batch_result]
+        and [p.net_profit_cents for p in loop_result] == [p.net_profit_cents for p in batch_result]
+    )
+
+    print("-" * 60)
+    print(f"profitable: {len(batch_result)} of {rows}, results match: {same}")
+    print(f"loop:       {rows / loop_time:>12,.0f} candidates/s")
+    print(f"vectorized: {rows / batch_time:>12,.0f} candidates/s ({loop_time / batch_time:.1f}x)")
+    print(f"columns:    {rows / column_time:>12,.0f} candidates/s ({loop_time / column_time:.1f}x)")
+
+def bench_repricing(rows, listed_share, moved_share):
+    """Time repricing runs over the active listings of a synthetic catalog"""
+    work_dir = tempfile.mkdtemp(prefix='arbitrage_bench_')
+
+    try:
+        print(f"Repricing ({rows} products, {listed_share:.0%} listed)")
+        print("-" * 60)
+
+        db = ArbitrageDatabase(os.path.join(work_dir, 'repricing.sqlite'))
+        db.connect()
+        db.setup_database()
+
+        _timed("load catalog", lambda: db.add_products_bulk(synthetic_products(rows), chunk_size=10000))
+
+        rng = random.Random(7)
+        with db.transaction() as cursor:
+            # Listings start without a target, as if listed before targets existed
+            cursor.executemany(
+                "INSERT INTO ebay_listings (product_id, ebay_item_id, current_price) "
+                "SELECT id, 'ITEM' || id, ebay_price FROM products WHERE id = ?",
+                ((i,) for i in range(1, rows + 1) if rng.random() < listed_share)
+            )
+            cursor.execute("UPDATE products SET is_listed = 1 WHERE id IN (SELECT product_id FROM ebay_listings)")
+
+        calculator = PriceCalculator(db)
+
+        def run(label):
+            elapsed, _ = _timed(label, calculator.update_prices)
+            stats = calculator.last_run
+            print(f"  {stats['retargeted']} of {stats['listings']} listings retargeted; "
+                  f"load {stats['load_seconds']}s, compute {stats['compute_seconds']}s, write {stats['write_seconds']}s")
+            return elapsed
+
+        first = run("update_prices (every target set)")
+        steady = run("update_prices (nothing changed)")
+
+        with db.transaction() as cursor:
+            cursor.executemany(
+                "UPDATE products SET amazon_price = ROUND(amazon_price * 1.25, 2) WHERE id = ?",
+                ((i,) for i in range(1, rows + 1) if rng.random() < moved_share)
+            )
+        moved = run(f"update_prices ({moved_share:.0%} of Amazon prices moved)")
+        listings = calculator.last_run['listings']
+        db.close()
+
+        print("-" * 60)
+        print(f"first run:    {listings / first:>12,.0f} listings/s")
+        print(f"steady state: {listings / steady:>12,.0f} listings/s")
+        print(f"{moved_share:.0%} moved:    {listings / moved:>12,.0f} listings/s")
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def _retained_bytes(build):
+    """Bytes still allocated after build() returns, with its result alive"""
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+def bench_memory(rows):
+    """Compare bytes held per product by per-item dicts and by Product records"""
+    print(f"Product memory ({rows} products)")
+    print("-" * 60)
+
+    dict_bytes = _retained_bytes(lambda: list(synthetic_product_dicts(rows)))
+    record_bytes = _retained_bytes(lambda: list(synthetic_products(rows)))
+
+    print(f"{'dict per product':<40} {dict_bytes / rows:>8.0f} bytes")
+    print(f"{'Product per product':<40} {record_bytes / rows:>8.0f} bytes")
+    print("-" * 60)
+    print(f"saved: {(dict_bytes - record_bytes) / rows:.0f} bytes per product "
+          f"({1 - record_bytes / dict_bytes:.0%}), {(dict_bytes - record_bytes) / 2**20:.1f} MiB in total")
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Amazon to eBay Arbitrage System benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    ingest = subparsers.add_parser('ingest', help='Bulk product ingestion')
+    ingest.add_argument('--rows', type=int, default=100000, help='Products to ingest in bulk')
+    ingest.add_argument('--baseline-rows', type=int, default=10000, help='Products to ingest one at a time')
+    ingest.add_argument('--chunk-size', type=int, default=None, help='Rows per executemany chunk')
+
+    scoring = subparsers.add_parser('scoring', help='Batch profitability scoring')
+    scoring.add_argument('--rows', type=int, default=1000000, help='Candidates to score')
+
+    repricing = subparsers.add_parser('repricing', help='Batch repricing with PriceCalculator')
+    repricing.add_argument('--rows', type=int, default=1000000, help='Products in the catalog')
+    repricing.add_argument('--listed-share', type=float, default=1.0, help='Share of products with an active listing')
+    repricing.add_argument('--moved-share', type=float, default=0.01, help='Share of Amazon prices moved before the last run')
+
+    memory = subparsers.add_parser('memory', help='Bytes per product, dicts against Product records')
+    memory.add_argument('--rows', type=int, default=100000, help='Products to hold in memory')
+
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_arguments()
+
+    if args.benchmark == 'ingest':
+        bench_ingest(args.rows, args.baseline_rows, args.chunk_size)
+    elif args.benchmark == 'scoring':
+        bench_scoring(args.rows)
+    elif args.benchmark == 'repricing':
+        bench_repricing(args.rows, args.listed_share, args.moved_share)
+    elif args.benchmark == 'memory':
+        bench_memory(args.rows)
@@ -9,7 +9,10 @@ AMAZON_CONFIG = {
     'partner_tag': 'YOUR_AMAZON_PARTNER_TAG',
     'partner_type': 'Associates',
     'marketplace': 'www.amazon.com',
-    'region': 'us-east-1'
+    'region': 'us-east-1',
+    'requests_per_second': 1,  # PA-API request quota shared by every Amazon call
+    'burst': 1,  # Requests allowed back to back after an idle period
+    'rate_limit_file': '../data/amazon_rate_limit.sqlite'  # Holds the quota's tokens for every process
 }
 
 # eBay API Configuration
@@ -22,9 +25,66 @@ EBAY_CONFIG = {
     'siteid': '0',  # US site
 }
 
+# PA-API Response Cache Configuration
+API_CACHE_CONFIG = {
+    'enabled': True,
+    'filename': '../data/api_cache.sqlite',
+    'ttl': {  # Seconds, per resource family; a request uses its shortest
+        'Offers': 900,
+        'ItemInfo': 604800,
+        'Images': 604800,
+        'BrowseNodeInfo': 604800,
+        'ParentASIN': 604800
+    },
+    'default_ttl': 3600,
+    'stale_while_revalidate': 3600,  # Serve expired entries this long while refreshing
+    'max_entries': 50000
+}
+
 # Database Configuration
 DATABASE_CONFIG = {
-    'filename': '../data/arbitrage_db.sqlite'
+    'filename': '../data/arbitrage_db.sqlite',
+    'pooled': True,  # One connection per thread
+    'journal_mode': 'WAL',  # Readers don't block behind writers
+    'synchronous': 'NORMAL',  # Safe with WAL, avoids an fsync per commit
+    'busy_timeout': 5000,  # ms to wait for a lock before failing
+    'cache_size': -65536,  # Negative means KiB, i.e. 64MB page cache per connection
+    'mmap_size': 268435456,  # 256MB memory-mapped I/O
+    'bulk_chunk_size': 1000,  # Rows per executemany in bulk writes
+    'page_size': 500  # Rows per page in the iter_* keyset readers
+}
+
+# Reporting Snapshot Configuration
+SNAPSHOT_CONFIG = {
+    'filename': '../data/arbitrage_db_snapshot.sqlite',  # Read-only replica for reports
+    'interval': 15,  # minutes between snapshots
+    'pages_per_step': 1024,  # Pages copied per backup step
+    'step_sleep': 0.01,  # Seconds to yield to writers between steps
+    'max_restarts': 5,  # Writes restart a stepped copy; after this many, copy in one step
+    'max_step_seconds': 300,  # Likewise once a stepped copy has run this long
+    'max_age': 3600  # Seconds before the replica is considered stale
+}
+
+# Change Log (outbox) Configuration
+CHANGE_LOG_CONFIG = {
+    'retention_days': 7,  # Consumers must sync at least this often
+    'batch_size': 500,  # Default entries per changes_since() call
+    'prune_interval': 1440  # minutes
+}
+
+# Price History Configuration
+PRICE_HISTORY_CONFIG = {
+    'raw_retention_days': 7,  # Keep every observation this long
+    'hourly_retention_days': 90,  # Then hourly buckets this long
+    'daily_retention_days': 730,  # Then daily buckets this long (0 = forever)
+    'compaction_interval': 60  # minutes
+}
+
+# Order Archive Configuration
+ARCHIVE_CONFIG = {
+    'archive_dir': '../data/archive',  # Monthly orders_YYYY_MM.sqlite files
+    'archive_after_days': 90,  # Archive orders fulfilled longer ago than this
+    'archive_interval': 1440  # minutes
 }
 
 # Product Search Configuration
@@ -32,7 +92,11 @@ PRODUCT_SEARCH_CONFIG = {
     'min_price': 15.0,
     'max_price': 100.0,
     'min_profit_margin': 0.15,  # 15% minimum profit margin
-    'max_results_per_search': 50,
+    'max_results_per_search': 100,  # Across pages of 10; the API serves at most 10 pages
+    'page_concurrency': 2,  # Result pages requested in parallel per category
+    'price_refresh_hours': 24,  # Known products checked more recently than this are skipped
+    'concurrent_search': True,  # Search categories in parallel, paced by the rate limiter
+    'max_workers': 4,  # Threads used by concurrent search
     'categories_to_search': [
         'Electronics',
         'Home & Kitchen',
@@ -42,6 +106,103 @@ PRODUCT_SEARCH_CONFIG = {
     ]
 }
 
+# Adaptive Price Refresh Configuration
+REFRESH_CONFIG = {
+    'interval': 15,  # minutes between refresh runs
+    'requests_per_run': 30,  # GetItems requests per run (10 ASINs each)
+    'base_interval_hours': 12,  # Check interval for a product with reference volatility and exposure
+    'min_interval_hours': 1,
+    'max_interval_hours': 168,
+    'reference_exposure': 50.0,  # Dollars at stake that earns the base interval
+    'listed_weight': 3.0,  # Exposure multiplier for products listed on eBay
+    'half_life_days': 14,  # Older price changes count half as much after this long
+    'prior_changes': 1.0,  # Prior belief: this many changes ...
+    'prior_hours': 12.0  # ... per this many hours, before any are observed
+}
+
+# Discovery Pipeline Configuration
+PIPELINE_CONFIG = {
+    'queue_size': 8,  # Items waiting between two stages before the earlier one blocks
+    'extract_workers': 1,
+    'comparables_workers': 2,  # Pages priced concurrently (each page also fans out)
+    'save_batch_size': 200,  # Profitable products per upsert
+    'flush_interval': 2.0  # seconds a partial save batch waits for more products
+}
+
+# Search Service Configuration
+SEARCH_SERVICE_CONFIG = {
+    'socket_path': '../data/search_service.sock',
+    'max_workers': 8,  # Requests handled concurrently across all connections
+    'max_limit': 50  # Most results one search may ask for
+}
+
+# eBay Comparables Configuration
+EBAY_COMPARABLES_CONFIG = {
+    'enabled': True,
+    'endpoint': 'https://svcs.ebay.com/services/search/FindingService/v1',  # Point at a stand-in server for tests
+    'global_id': 'EBAY-US',
+    'entries_per_query': 50,  # Listings fetched per sold/active query
+    'max_query_tokens': 8,  # Title tokens kept in search keywords
+    'nearest': 15,  # Most similar comps the estimate is taken from
+    'min_comps': 3,  # Fewer comps than this means no estimate
+    'min_similarity': 0.3,  # Title similarity (0-1) a listing needs to count as a comp
+    'trim': 0.2,  # Fraction trimmed from each end before taking the median
+    'max_workers': 8,  # Concurrent lookups per batch of products
+    'pool_size': 8,  # Pooled HTTP connections to eBay, and the cap on requests in flight across all batches
+    'requests_per_second': 5,
+    'timeout': 10,  # seconds
+    'cache_file': '../data/ebay_comps_cache.sqlite',
+    'cache_ttl': 21600,  # seconds per normalized query
+    'require_comps': True  # Drop candidates with no estimate rather than guessing
+}
+
+# Title Similarity Index Configuration
+TITLE_INDEX_CONFIG = {
+    'num_perm': 64,  # MinHash signature length; changing it recomputes stored signatures
+    'bands': 16,  # LSH bands of num_perm / bands rows; ~0.5 Jaccard candidate threshold
+    'rebuild_after': 1024,  # Titles added before the band arrays are re-sorted
+    'save_batch_size': 5000,  # Signatures computed per write when backfilling
+    'duplicate_threshold': 0.8  # Similarity at which a product counts as already listed
+}
+
+# Fee Model Configuration (shared by product scoring and repricing)
+FEE_CONFIG = {
+    'ebay_fee_rate': 0.10,  # eBay final value fee, share of sale price
+    'paypal_fee_rate': 0.029,  # Payment processing, share of sale price
+    'paypal_fixed_fee': 0.30,  # Payment processing, per order
+    'shipping_cost': 0.0,  # Per order; Prime orders ship to the buyer at no cost
+    'ebay_price_multiplier': 1.3,  # eBay price estimate when no comparables are known
+    'category_fee_rates': {  # Final value fee by category where it differs from ebay_fee_rate
+        'Electronics': 0.09,
+        'Home & Kitchen': 0.1325,
+        'Toys & Games': 0.1325,
+        'Office Products': 0.1325,
+        'Sports & Outdoors': 0.1325
+    }
+}
+
+# Repricing Configuration
+REPRICING_CONFIG = {
+    'chunk_size': 50000  # Rows per chunk when loading products into arrays
+}
+
+# Repricing Policy Configuration
+REPRICING_POLICY_CONFIG = {
+    'min_change_absolute': 0.50,  # Dollars; smaller moves leave the listing as it is ...
+    'min_change_percent': 0.03,  # ... as do moves under this share of the listed price
+    'min_revision_interval_hours': 24,  # Per listing, unless it is selling at a loss
+    'price_point_endings': (0.49, 0.99),  # Cents new prices are rounded up to
+    'daily_revision_budget': 1000,  # ReviseItem price changes per rolling 24 hours
+    'simulation_step_minutes': 120  # How often the simulated lister runs
+}
+
+# Known-ASIN Filter Configuration
+ASIN_FILTER_CONFIG = {
+    'snapshot_file': '../data/known_asins.bloom',
+    'capacity': 1000000,  # ASINs before the false-positive rate degrades
+    'error_rate': 0.001  # False-positive rate at capacity
+}
+
 # eBay Listing Configuration
 EBAY_LISTING_CONFIG = {
     'listing_duration': 'GTC',  # Good Till Cancelled
@@ -0,0 +1,22 @@
+"""
+Shared pytest fixtures for the arbitrage system tests
+"""
+
+import pytest
+
+from database import ArbitrageDatabase
+from benchmark import synthetic_products
+
+@pytest.fixture
+def db(tmp_path):
+    """An empty database with the full schema, in a temporary directory"""
+    database = ArbitrageDatabase(str(tmp_path / 'arbitrage.db'))
+    database.setup_database()
+    yield database
+    database.close()
+
+@pytest.fixture
+def catalog(db):
+    """The database seeded with synthetic products"""
+    db.add_products_bulk(synthetic_products(200))
+    return db
@@ -3,33 +3,457 @@ Database module for Amazon to eBay Arbitrage System
 """
 
 import os
+import glob
+import json
 import sqlite3
+import hashlib
 import logging
-from config import DATABASE_CONFIG
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from itertools import islice
+from config import DATABASE_CONFIG, PRICE_HISTORY_CONFIG, ARCHIVE_CONFIG, SNAPSHOT_CONFIG, CHANGE_LOG_CONFIG
+from product import Product
 
 logger = logging.getLogger(__name__)
 
+def product_content_hash(amazon_price, ebay_price, profit_margin):
+    """Hash the repriceable fields of a product
+    
+    Prices are compared to the cent and margins to four decimals so float
+    noise between sightings does not register as a change.
+    """
+    content = '|'.join([
+        '' if amazon_price is None else f"{amazon_price:.2f}",
+        '' if ebay_price is None else f"{ebay_price:.2f}",
+        '' if profit_margin is None else f"{profit_margin:.4f}"
+    ])
+    return hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
+
+# Secondary indexes kept in sync by setup_database. Partial indexes only
+# cover the rows the hot queries below actually look for.
+INDEXES = {
+    'idx_products_listable_margin': 'products (profit_margin DESC, id) WHERE is_listed = 0 AND duplicate_of IS NULL',
+    'idx_ebay_listings_status': 'ebay_listings (status)',
+    'idx_ebay_listings_product': 'ebay_listings (product_id)',
+    'idx_orders_new_date': "orders (date_ordered, id) WHERE order_status = 'new'",
+    'idx_orders_ebay_item': 'orders (ebay_item_id)',
+    'idx_profit_tracking_date': 'profit_tracking (date)',
+    'idx_profit_tracking_order': 'profit_tracking (order_id)',
+    'idx_listing_revisions_time': 'listing_revisions (revised_at)'
+}
+
+# Indexes earlier versions of INDEXES created. setup_database drops these;
+# any other index, such as one added by hand, is left alone.
+RETIRED_INDEXES = (
+    'idx_products_unlisted_margin',
+)
+
+UNLISTED_PRODUCTS_SQL = '''
+SELECT id, asin, title, amazon_price, ebay_price, profit_margin,
+       category, image_url, description
+FROM products
+WHERE is_listed = 0 AND duplicate_of IS NULL
+ORDER BY profit_margin DESC
+LIMIT ?
+'''
+
+PENDING_ORDERS_SQL = '''
+SELECT o.id, o.ebay_order_id, o.ebay_item_id, o.buyer_name,
+       o.shipping_address, p.asin, p.amazon_price
+FROM orders o
+JOIN ebay_listings e ON o.ebay_item_id = e.ebay_item_id
+JOIN products p ON e.product_id = p.id
+WHERE o.order_status = 'new'
+ORDER BY o.date_ordered
+'''
+
+# Everything the repricing policy weighs per listing whose target price
+# has moved away from the listed price
+REVISION_CANDIDATES_PAGE_SQL = '''
+SELECT e.id, e.ebay_item_id, e.current_price, e.quantity,
+       CAST(strftime('%s', e.last_updated) AS INTEGER),
+       p.amazon_price, e.target_price, p.category
+FROM ebay_listings e
+JOIN products p ON e.product_id = p.id
+WHERE e.status = 'active' AND e.target_price != e.current_price
+  AND e.id > ?
+ORDER BY e.id
+LIMIT ?
+'''
+
+# Revisions counted against the rolling daily budget
+LISTING_REVISIONS_SINCE_SQL = '''
+SELECT COUNT(*) FROM listing_revisions WHERE revised_at >= ?
+'''
+
+# Raw Amazon price observations for actively listed products, for replaying
+# repricing policies
+LISTED_PRICE_HISTORY_SQL = '''
+SELECT h.product_id, p.category, h.ts, h.amazon_cents
+FROM price_history h
+JOIN products p ON p.id = h.product_id
+WHERE h.ts >= ? AND h.amazon_cents > 0
+  AND EXISTS (SELECT 1 FROM ebay_listings e WHERE e.product_id = h.product_id AND e.status = 'active')
+ORDER BY h.product_id, h.ts
+'''
+
+# Keyset-paginated variants of the hot queries. Each page resumes strictly
+# after the sort key of the previous page's last row, so paging stays an
+# index range seek however deep into the table it goes.
+PRODUCT_ASINS_PAGE_SQL = '''
+SELECT id, asin
+FROM products
+WHERE id > ?
+ORDER BY id
+LIMIT ?
+'''
+
+TITLE_SIGNATURES_PAGE_SQL = '''
+SELECT s.product_id, s.signature
+FROM title_signatures s
+JOIN products p ON p.id = s.product_id
+WHERE s.product_id > ? {listed_filter}
+ORDER BY s.product_id
+LIMIT ?
+'''
+
+MISSING_TITLE_SIGNATURES_PAGE_SQL = '''
+SELECT p.id, p.title
+FROM products p
+LEFT JOIN title_signatures s ON s.product_id = p.id
+WHERE p.id > ? AND (s.product_id IS NULL OR length(s.signature) != ?)
+ORDER BY p.id
+LIMIT ?
+'''
+
+# Every product with its refresh due time, or the time it was last priced
+# for products the refresh planner has not seen yet
+REFRESH_SCHEDULE_PAGE_SQL = '''
+SELECT p.id, r.next_due, CAST(strftime('%s', COALESCE(p.price_updated, p.date_added)) AS INTEGER)
+FROM products p
+LEFT JOIN refresh_stats r ON r.product_id = p.id
+WHERE p.id > ?
+ORDER BY p.id
+LIMIT ?
+'''
+
+# Products row (as Product.from_row takes it) plus refresh statistics
+REFRESH_STATE_SQL = '''
+SELECT p.id, p.asin, p.title, p.amazon_price, p.ebay_price, p.profit_margin,
+       p.category, p.image_url, p.description, p.is_listed,
+       r.last_checked, r.change_events, r.exposure_seconds
+FROM products p
+LEFT JOIN refresh_stats r ON r.product_id = p.id
+WHERE p.id IN ({placeholders})
+'''
+
+# Everything the repricer needs per active listing
+REPRICING_SQL = '''
+SELECT e.id, p.amazon_price, p.ebay_price, p.category, e.target_price
+FROM ebay_listings e
+JOIN products p ON p.id = e.product_id
+WHERE e.status = 'active' AND p.amazon_price > 0
+ORDER BY e.id
+'''
+
+# Amazon price changes and observed time span per product in the raw history
+PRICE_CHANGE_COUNTS_SQL = '''
+SELECT product_id, SUM(changed), MAX(ts) - MIN(ts)
+FROM (
+    SELECT product_id, ts,
+           amazon_cents IS NOT LAG(amazon_cents) OVER (PARTITION BY product_id ORDER BY ts)
+           AND LAG(ts) OVER (PARTITION BY product_id ORDER BY ts) IS NOT NULL AS changed
+    FROM price_history
+    WHERE product_id IN ({placeholders})
+)
+GROUP BY product_id
+'''
+
+UNLISTED_PRODUCTS_PAGE_SQL = '''
+SELECT id, asin, title, amazon_price, ebay_price, profit_margin,
+       category, image_url, description
+FROM products
+WHERE is_listed = 0 AND duplicate_of IS NULL
+  AND profit_margin <= ? AND (profit_margin < ? OR id > ?)
+ORDER BY profit_margin DESC, id
+LIMIT ?
+'''
+
+PENDING_ORDERS_PAGE_SQL = '''
+SELECT o.id, o.ebay_order_id, o.ebay_item_id, o.buyer_name,
+       o.shipping_address, p.asin, p.amazon_price, o.date_ordered
+FROM orders o
+JOIN ebay_listings e ON o.ebay_item_id = e.ebay_item_id
+JOIN products p ON e.product_id = p.id
+WHERE o.order_status = 'new'
+  AND (o.date_ordered, o.id) > (?, ?)
+ORDER BY o.date_ordered, o.id
+LIMIT ?
+'''
+
+# Aggregates straight from the raw rows, used to build and verify the rollup.
+# {schema} is main or an attached monthly archive.
+PROFIT_ROLLUP_SOURCE_SQL = '''
+SELECT
+    date(date) as day,
+    COUNT(id) as order_count,
+    SUM(amazon_cost) as total_cost,
+    SUM(ebay_revenue) as total_revenue,
+    SUM(ebay_fees) as total_ebay_fees,
+    SUM(paypal_fees) as total_paypal_fees,
+    SUM(net_profit) as total_profit
+FROM {schema}.profit_tracking
+GROUP BY day
+'''
+
+PROFIT_BY_DAY_SQL = '''
+SELECT day, order_count, total_cost, total_revenue,
+       total_ebay_fees, total_paypal_fees, total_profit
+FROM daily_profit_rollup
+WHERE day >= date('now', ?)
+ORDER BY day DESC
+'''
+
+PROFIT_TOTALS_SQL = '''
+SELECT
+    COALESCE(SUM(order_count), 0),
+    COALESCE(SUM(total_cost), 0),
+    COALESCE(SUM(total_revenue), 0),
+    COALESCE(SUM(total_ebay_fees), 0),
+    COALESCE(SUM(total_paypal_fees), 0),
+    COALESCE(SUM(total_profit), 0)
+FROM daily_profit_rollup
+WHERE day >= date('now', ?)
+'''
+
+ROLLUP_COLUMNS = ('order_count', 'total_cost', 'total_revenue',
+                  'total_ebay_fees', 'total_paypal_fees', 'total_profit')
+
+# Bucket widths in seconds for compacted price history
+HOURLY = 3600
+DAILY = 86400
+
+# One product's price history across all tiers. Compaction moves data out
+# of the finer tier as it folds it in, so the tiers never overlap in time.
+PRICE_HISTORY_SQL = '''
+SELECT ts, amazon_cents, ebay_cents
+FROM price_history
+WHERE product_id = (SELECT id FROM products WHERE asin = ?)
+  AND ts BETWEEN ? AND ?
+UNION ALL
+SELECT bucket_ts, amazon_avg, ebay_avg
+FROM price_history_buckets
+WHERE product_id = (SELECT id FROM products WHERE asin = ?)
+  AND resolution IN (3600, 86400)
+  AND bucket_ts BETWEEN ? AND ?
+ORDER BY 1
+'''
+
+# Source table, key column and JSON payload for each change_log entity.
+# Payloads are built in SQL from the row as written, inside the same
+# transaction as the change itself.
+CHANGE_SOURCES = {
+    'product': ('products', 'asin', "json_object('id', id, 'asin', asin, 'title', title, "
+                "'amazon_price', amazon_price, 'ebay_price', ebay_price, "
+                "'profit_margin', profit_margin, 'category', category, 'is_listed', is_listed)"),
+    'listing': ('ebay_listings', 'ebay_item_id', "json_object('id', id, 'product_id', product_id, "
+                "'ebay_item_id', ebay_item_id, 'listing_title', listing_title, "
+                "'current_price', current_price, 'quantity', quantity, 'status', status)"),
+    'order': ('orders', 'ebay_order_id', "json_object('id', id, 'ebay_order_id', ebay_order_id, "
+              "'ebay_item_id', ebay_item_id, 'amazon_order_id', amazon_order_id, "
+              "'order_total', order_total, 'order_status', order_status, "
+              "'tracking_number', tracking_number, 'date_fulfilled', date_fulfilled)"),
+    'profit': ('profit_tracking', 'order_id', "json_object('id', id, 'order_id', order_id, "
+               "'amazon_cost', amazon_cost, 'ebay_revenue', ebay_revenue, "
+               "'ebay_fees', ebay_fees, 'paypal_fees', paypal_fees, 'net_profit', net_profit)")
+}
+
+CHANGES_SINCE_SQL = '''
+SELECT seq, entity, entity_key, op, payload, changed_at
+FROM change_log
+WHERE seq > ?
+ORDER BY seq
+LIMIT ?
+'''
+
+# Queries on the scheduler's hot paths, with representative parameters.
+# check_query_plans() flags any of these that fall back to a table scan.
+HOT_QUERIES = {
+    'unlisted_products': (UNLISTED_PRODUCTS_SQL, (50,)),
+    'pending_orders': (PENDING_ORDERS_SQL, ()),
+    'unlisted_products_page': (UNLISTED_PRODUCTS_PAGE_SQL, (0.5, 0.5, 0, 500)),
+    'pending_orders_page': (PENDING_ORDERS_PAGE_SQL, ('', 0, 500)),
+    'profit_by_day': (PROFIT_BY_DAY_SQL, ('-30 days',)),
+    'profit_totals': (PROFIT_TOTALS_SQL, ('-30 days',)),
+    'price_history': (PRICE_HISTORY_SQL, ('B000000000', 0, 2 ** 31, 'B000000000', 0, 2 ** 31)),
+    'changes_since': (CHANGES_SINCE_SQL, (0, 100)),
+    'revision_candidates_page': (REVISION_CANDIDATES_PAGE_SQL, (0, 500)),
+    'listing_revisions_since': (LISTING_REVISIONS_SINCE_SQL, (0,))
+}
+
+class _SnapshotAbandoned(Exception):
+    """Raised from the backup progress callback to give up on a stepped copy"""
+
+class _ConnectionHolder:
+    """Thread-local owner of a pooled connection
+    
+    Thread-local values are dropped when their thread exits, so the
+    connection is closed and leaves the pool with the thread.
+    """
+    __slots__ = ('release', '__weakref__')
+
+def _close_pooled_connection(pool, lock, conn):
+    """Remove a pooled connection from the pool and close it"""
+    with lock:
+        if conn in pool:
+            pool.remove(conn)
+    conn.close()
+
 class ArbitrageDatabase:
     """Database handler for the arbitrage system"""
     
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, pooled=None, snapshot_path=None, archive_dir=None):
         """Initialize the database connection"""
         if db_path is None:
             db_path = DATABASE_CONFIG['filename']
+            if snapshot_path is None:
+                snapshot_path = SNAPSHOT_CONFIG['filename']
+                
+        # The production database keeps its archives where configured,
+        # however its path was given
+        if archive_dir is None and os.path.abspath(db_path) == os.path.abspath(DATABASE_CONFIG['filename']):
+            archive_dir = ARCHIVE_CONFIG['archive_dir']
+            
+        # Databases opened by explicit path keep their replica and order
+        # archives alongside them. An in-memory database has neither.
+        if db_path != ':memory:':
+            root, ext = os.path.splitext(db_path)
+            if snapshot_path is None:
+                snapshot_path = f"{root}_snapshot{ext or '.sqlite'}"
+            if archive_dir is None:
+                archive_dir = f"{root}_archive"
             
         # Ensure directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
         self.db_path = db_path
-        self.conn = None
-        self.cursor = None
+        self.snapshot_path = snapshot_path
+        self.archive_dir = archive_dir
+        
+        # In pooled mode every thread gets its own connection and cursor.
+        # An in-memory database cannot be shared that way, so it always
+        # uses a single connection.
+        if pooled is None:
+            pooled = DATABASE_CONFIG.get('pooled', True)
+        self.pooled = pooled and db_path != ':memory:'
+        
+        self._conn = None
+        self._cursor = None
+        self._local = threading.local()
+        # Reentrant, since a connection finalizer may run while it is held
+        self._pool_lock = threading.RLock()
+        self._pool = []
+        self._pool_open = False
+        
+    @property
+    def conn(self):
+        """Connection for the calling thread"""
+        if not self.pooled:
+            return self._conn
+            
+        conn = getattr(self._local, 'conn', None)
+        if conn is None and self._pool_open:
+            conn = self._open_thread_connection()
+        return conn
+        
+    @conn.setter
+    def conn(self, value):
+        if self.pooled:
+            self._local.conn = value
+        else:
+            self._conn = value
+            
+    @property
+    def cursor(self):
+        """Cursor for the calling thread"""
+        if not self.pooled:
+            return self._cursor
+            
+        if self.conn is None:
+            return None
+        return self._local.cursor
+        
+    @cursor.setter
+    def cursor(self, value):
+        if self.pooled:
+            self._local.cursor = value
+        else:
+            self._cursor = value
+            
+    def _create_connection(self):
+        """Open a new sqlite3 connection with the configured pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=DATABASE_CONFIG.get('busy_timeout', 5000) / 1000.0,
+            check_same_thread=not self.pooled
+        )
+        
+        conn.execute(f"PRAGMA busy_timeout = {int(DATABASE_CONFIG.get('busy_timeout', 5000))}")
+        if self.db_path != ':memory:':
+            conn.execute(f"PRAGMA journal_mode = {DATABASE_CONFIG.get('journal_mode', 'WAL')}")
+        conn.execute(f"PRAGMA synchronous = {DATABASE_CONFIG.get('synchronous', 'NORMAL')}")
+        conn.execute(f"PRAGMA cache_size = {int(DATABASE_CONFIG.get('cache_size', -2000))}")
+        conn.execute(f"PRAGMA mmap_size = {int(DATABASE_CONFIG.get('mmap_size', 0))}")
+        conn.create_function('product_content_hash', 3, product_content_hash, deterministic=True)
+        return conn
+        
+    def _open_thread_connection(self):
+        """Open and register the calling thread's pooled connection"""
+        conn = self._create_connection()
+        self._local.conn = conn
+        self._local.cursor = conn.cursor()
+        self._local.depth = 0
+        
+        holder = _ConnectionHolder()
+        holder.release = weakref.finalize(holder, _close_pooled_connection, self._pool, self._pool_lock, conn)
+        self._local.holder = holder
+        
+        with self._pool_lock:
+            self._pool.append(conn)
+            
+        logger.debug(f"Opened pooled connection for thread {threading.current_thread().name}")
+        return conn
+        
+    def release_thread_connection(self):
+        """Close the calling thread's pooled connection now rather than at thread exit
+        
+        For worker threads that are done with the database; the thread
+        gets a fresh connection if it uses the database again.
+        """
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            return
+            
+        self._local.holder = None
+        self._local.conn = None
+        self._local.cursor = None
+        holder.release()
         
     def connect(self):
         """Connect to the database"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.cursor = self.conn.cursor()
-            logger.info(f"Connected to database at {self.db_path}")
+            if self.pooled:
+                self._pool_open = True
+                if getattr(self._local, 'conn', None) is None:
+                    self._open_thread_connection()
+                logger.info(f"Connected to database at {self.db_path} (pooled)")
+            else:
+                self.conn = self._create_connection()
+                self.cursor = self.conn.cursor()
+                logger.info(f"Connected to database at {self.db_path}")
             return True
         except sqlite3.Error as e:
             logger.error(f"Database connection error: {e}")
@@ -37,10 +461,63 @@ class ArbitrageDatabase:
             
     def close(self):
         """Close the database connection"""
-        if self.conn:
+        if self.pooled:
+            with self._pool_lock:
+                # Cleared in place: connection finalizers hold this list
+                connections = list(self._pool)
+                self._pool.clear()
+                self._pool_open = False
+                
+            # Drop every thread's reference to its (now closed) connection.
+            # Outside the lock: this runs the dropped holders' finalizers.
+            self._local = threading.local()
+            for conn in connections:
+                conn.close()
+                
+            if connections:
+                logger.info(f"Closed {len(connections)} pooled database connections")
+        elif self.conn:
             self.conn.close()
+            self.conn = None
+            self.cursor = None
             logger.info("Database connection closed")
             
+    @contextmanager
+    def transaction(self):
+        """Run a block in a single write transaction on this thread's connection
+        
+        Yields a cursor. The transaction is committed when the block exits
+        and rolled back if it raises. Nested calls join the outer transaction.
+        """
+        if not self.conn:
+            self.connect()
+            
+        conn = self.conn
+        depth = getattr(self._local, 'depth', 0)
+        
+        if depth > 0:
+            self._local.depth = depth + 1
+            try:
+                yield conn.cursor()
+            finally:
+                self._local.depth = depth
+            return
+            
+        # BEGIN IMMEDIATE takes the write lock up front so busy_timeout
+        # applies here rather than failing mid-transaction on lock upgrade
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn.cursor()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.depth = 0
+            
     def setup_database(self):
         """Create database tables if they don't exist"""
         if not self.conn:
@@ -60,7 +537,11 @@ class ArbitrageDatabase:
                 image_url TEXT,
                 description TEXT,
                 is_listed BOOLEAN DEFAULT 0,
-                date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                content_hash TEXT,
+                price_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                duplicate_of INTEGER,
+                last_checked TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
             ''')
             
@@ -72,6 +553,7 @@ class ArbitrageDatabase:
                 ebay_item_id TEXT UNIQUE,
                 listing_title TEXT,
                 current_price REAL,
+                target_price REAL,
                 quantity INTEGER DEFAULT 1,
                 date_listed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -114,13 +596,187 @@ class ArbitrageDatabase:
             )
             ''')
             
+            # Per-day profit totals, kept current by record_profit
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_profit_rollup (
+                day TEXT PRIMARY KEY,
+                order_count INTEGER NOT NULL DEFAULT 0,
+                total_cost REAL NOT NULL DEFAULT 0,
+                total_revenue REAL NOT NULL DEFAULT 0,
+                total_ebay_fees REAL NOT NULL DEFAULT 0,
+                total_paypal_fees REAL NOT NULL DEFAULT 0,
+                total_profit REAL NOT NULL DEFAULT 0
+            )
+            ''')
+
+            # Raw price observations: integer cents at epoch-second timestamps,
+            # clustered by product so one product's history is a range seek
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_history (
+                product_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                amazon_cents INTEGER,
+                ebay_cents INTEGER,
+                PRIMARY KEY (product_id, ts)
+            ) WITHOUT ROWID
+            ''')
+
+            # Hourly and daily buckets that compaction folds old observations into
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_history_buckets (
+                product_id INTEGER NOT NULL,
+                resolution INTEGER NOT NULL,
+                bucket_ts INTEGER NOT NULL,
+                samples INTEGER NOT NULL,
+                amazon_min INTEGER,
+                amazon_max INTEGER,
+                amazon_avg INTEGER,
+                ebay_min INTEGER,
+                ebay_max INTEGER,
+                ebay_avg INTEGER,
+                PRIMARY KEY (product_id, resolution, bucket_ts)
+            ) WITHOUT ROWID
+            ''')
+
+            # MinHash signatures of product titles for the title index
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS title_signatures (
+                product_id INTEGER PRIMARY KEY,
+                signature BLOB NOT NULL,
+                FOREIGN KEY (product_id) REFERENCES products (id)
+            )
+            ''')
+
+            # Per-product price volatility and next refresh time for the
+            # refresh planner; change_events and exposure_seconds are
+            # exponentially decayed totals
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS refresh_stats (
+                product_id INTEGER PRIMARY KEY,
+                next_due INTEGER NOT NULL,
+                last_checked INTEGER,
+                change_events REAL NOT NULL DEFAULT 0,
+                exposure_seconds REAL NOT NULL DEFAULT 0,
+                FOREIGN KEY (product_id) REFERENCES products (id)
+            )
+            ''')
+
+            # One row per ReviseItem price change, for the daily revision budget
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS listing_revisions (
+                ebay_item_id TEXT NOT NULL,
+                revised_at INTEGER NOT NULL,
+                old_price REAL,
+                new_price REAL
+            )
+            ''')
+
+            # Append-only outbox of changes for downstream consumers.
+            # AUTOINCREMENT keeps seq monotonic even after pruning.
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                entity TEXT NOT NULL,
+                entity_key TEXT,
+                op TEXT NOT NULL,
+                payload TEXT,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+
+            self._migrate_columns()
+            self._sync_indexes()
+
             self.conn.commit()
             logger.info("Database tables created successfully")
+
+            # Databases created before the rollup existed need one backfill
+            rollup_empty = self.conn.execute("SELECT 1 FROM daily_profit_rollup LIMIT 1").fetchone() is None
+            has_profits = self.conn.execute("SELECT 1 FROM profit_tracking LIMIT 1").fetchone() is not None
+            if rollup_empty and has_profits:
+                self.backfill_profit_rollup()
+
             return True
         except sqlite3.Error as e:
             logger.error(f"Database setup error: {e}")
             return False
-    
+
+    def _migrate_columns(self):
+        """Add columns introduced after a database was first created"""
+        self.cursor.execute("PRAGMA table_info(products)")
+        columns = {row[1] for row in self.cursor.fetchall()}
+        
+        if 'content_hash' not in columns:
+            self.cursor.execute("ALTER TABLE products ADD COLUMN content_hash TEXT")
+            self.cursor.execute('''
+            UPDATE products
+            SET content_hash = product_content_hash(amazon_price, ebay_price, profit_margin)
+            ''')
+            logger.info("Added products.content_hash column")
+            
+        if 'price_updated' not in columns:
+            # ALTER TABLE cannot add a CURRENT_TIMESTAMP default, so seed it
+            self.cursor.execute("ALTER TABLE products ADD COLUMN price_updated TIMESTAMP")
+            self.cursor.execute("UPDATE products SET price_updated = date_added")
+            logger.info("Added products.price_updated column")
+            
+        if 'duplicate_of' not in columns:
+            self.cursor.execute("ALTER TABLE products ADD COLUMN duplicate_of INTEGER")
+            logger.info("Added products.duplicate_of column")
+            
+        if 'last_checked' not in columns:
+            # Inserts set it explicitly, since the column has no default here
+            self.cursor.execute("ALTER TABLE products ADD COLUMN last_checked TIMESTAMP")
+            self.cursor.execute("UPDATE products SET last_checked = price_updated")
+            logger.info("Added products.last_checked column")
+            
+        self.cursor.execute("PRAGMA table_info(ebay_listings)")
+        columns = {row[1] for row in self.cursor.fetchall()}
+        
+        if 'target_price' not in columns:
+            # Until the next repricing run the listed price is the target
+            self.cursor.execute("ALTER TABLE ebay_listings ADD COLUMN target_price REAL")
+            self.cursor.execute("UPDATE ebay_listings SET target_price = current_price")
+            logger.info("Added ebay_listings.target_price column")
+            
+    def _sync_indexes(self):
+        """Create missing managed indexes and drop retired ones"""
+        for name in RETIRED_INDEXES:
+            exists = self.cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+            ).fetchone()
+            if exists:
+                self.cursor.execute(f"DROP INDEX {name}")
+                logger.info(f"Dropped retired index {name}")
+
+        for name, definition in INDEXES.items():
+            self.cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+
+    def explain_query(self, sql, params=()):
+        """Return the EXPLAIN QUERY PLAN detail lines for a query"""
+        if not self.conn:
+            self.connect()
+
+        cursor = self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[3] for row in cursor.fetchall()]
+
+    def check_query_plans(self):
+        """Find hot queries whose plan includes a full table scan
+
+        Returns a dict mapping query name to the offending plan lines, so an
+        empty dict means every hot query is served by an index. Walking an
+        index (SCAN ... USING INDEX) does not count as a table scan.
+        """
+        offenders = {}
+
+        for name, (sql, params) in HOT_QUERIES.items():
+            plan = self.explain_query(sql, params)
+            scans = [line for line in plan if line.startswith('SCAN') and 'USING' not in line]
+            if scans:
+                offenders[name] = scans
+
+        return offenders
+
     def add_product(self, asin, title, amazon_price, ebay_price, profit_margin, 
                    category, image_url, description):
         """Add a new product to the database"""
@@ -128,67 +784,520 @@ class ArbitrageDatabase:
             self.connect()
             
         try:
-            self.cursor.execute('''
-            INSERT OR IGNORE INTO products 
-            (asin, title, amazon_price, ebay_price, profit_margin, category, image_url, description)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (asin, title, amazon_price, ebay_price, profit_margin, 
-                 category, image_url, description))
-            
-            self.conn.commit()
-            return self.cursor.lastrowid
+            with self.transaction() as cursor:
+                cursor.execute('''
+                INSERT OR IGNORE INTO products 
+                (asin, title, amazon_price, ebay_price, profit_margin, category, image_url, description, content_hash, last_checked)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (asin, title, amazon_price, ebay_price, profit_margin, 
+                     category, image_url, description,
+                     product_content_hash(amazon_price, ebay_price, profit_margin)))
+                product_id = cursor.lastrowid
+                
+                if cursor.rowcount:
+                    self._log_change(cursor, 'product', 'insert', 'id = ?', (product_id,))
+                    
+            return product_id
         except sqlite3.Error as e:
             logger.error(f"Error adding product: {e}")
             return None
+
+    def add_products_bulk(self, products, chunk_size=None, update_existing=False):
+        """Add many products in a single transaction
+
+        products is any iterable of Product records; it is consumed lazily
+        in chunks of chunk_size rows, each written with one executemany.
+        Existing ASINs are ignored, or have their prices refreshed when
+        update_existing is set.
+
+        Returns a dict with inserted, ignored and updated counts, or None if
+        the transaction failed and was rolled back.
+        """
+        if chunk_size is None:
+            chunk_size = DATABASE_CONFIG.get('bulk_chunk_size', 1000)
+
+        counts = {'inserted': 0, 'ignored': 0, 'updated': 0}
+        rows = self._product_rows(products)
+
+        try:
+            with self.transaction() as cursor:
+                last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM products").fetchone()[0]
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+
+                    cursor.executemany('''
+                    INSERT OR IGNORE INTO products
+                    (asin, title, amazon_price, ebay_price, profit_margin, category, image_url, description, content_hash, last_checked)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ''', chunk)
+                    inserted = cursor.rowcount
+                    if inserted:
+                        # New rows take ids above everything already present
+                        self._log_change(cursor, 'product', 'insert', 'id > ?', (last_id,))
+                        last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM products").fetchone()[0]
+
+                    # Rows just inserted already hold this hash, so only
+                    # pre-existing rows with different prices are touched
+                    updated = 0
+                    if update_existing and inserted < len(chunk):
+                        placeholders = ', '.join('?' * len(chunk))
+                        cursor.execute(
+                            f"SELECT asin, content_hash FROM products WHERE asin IN ({placeholders})",
+                            [r[0] for r in chunk]
+                        )
+                        known = dict(cursor.fetchall())
+                        stale = [r for r in chunk if known.get(r[0]) != r[8]]
+                        
+                        cursor.executemany('''
+                        UPDATE products
+                        SET amazon_price = ?, ebay_price = ?, profit_margin = ?,
+                            content_hash = ?, price_updated = CURRENT_TIMESTAMP,
+                            last_checked = CURRENT_TIMESTAMP
+                        WHERE asin = ? AND content_hash IS NOT ?
+                        ''', [(r[2], r[3], r[4], r[8], r[0], r[8]) for r in stale])
+                        updated = cursor.rowcount
+                        self._log_changes(cursor, 'product', 'update', 'asin = ?', [(r[0],) for r in stale])
+                        self._touch_products(cursor, [r[0] for r in chunk if known.get(r[0]) == r[8]])
+
+                    counts['inserted'] += inserted
+                    counts['updated'] += updated
+                    counts['ignored'] += len(chunk) - inserted - updated
+
+            return counts
+        except sqlite3.Error as e:
+            logger.error(f"Error adding products in bulk: {e}")
+            return None
+
+    def _product_rows(self, products):
+        """Turn Product records into products table rows ending in content_hash"""
+        for p in products:
+            amazon_price, ebay_price = p.amazon_price, p.ebay_price
+            yield (p.asin, p.title, amazon_price, ebay_price, p.profit_margin,
+                   p.category, p.image_url, p.description,
+                   product_content_hash(amazon_price, ebay_price, p.profit_margin))
+
+    def upsert_products(self, products, chunk_size=None):
+        """Insert new products and reprice existing ones whose prices changed
+
+        Existing rows are only repriced when their content_hash differs
+        from the incoming prices; re-sighting an unchanged product only
+        stamps its last_checked time. Returns a dict with inserted, updated and unchanged counts
+        plus changed_asins, the existing ASINs whose prices moved, or None
+        if the transaction failed and was rolled back.
+        """
+        if chunk_size is None:
+            chunk_size = DATABASE_CONFIG.get('bulk_chunk_size', 1000)
+
+        result = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'changed_asins': []}
+        rows = self._product_rows(products)
+
+        try:
+            with self.transaction() as cursor:
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+
+                    # Compare hashes up front so the caller learns which
+                    # ASINs moved without a RETURNING round trip per row
+                    placeholders = ', '.join('?' * len(chunk))
+                    cursor.execute(
+                        f"SELECT asin, content_hash FROM products WHERE asin IN ({placeholders})",
+                        [r[0] for r in chunk]
+                    )
+                    known = dict(cursor.fetchall())
+
+                    cursor.executemany('''
+                    INSERT INTO products
+                    (asin, title, amazon_price, ebay_price, profit_margin, category, image_url, description, content_hash, last_checked)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT (asin) DO UPDATE SET
+                        amazon_price = excluded.amazon_price,
+                        ebay_price = excluded.ebay_price,
+                        profit_margin = excluded.profit_margin,
+                        content_hash = excluded.content_hash,
+                        price_updated = CURRENT_TIMESTAMP,
+                        last_checked = CURRENT_TIMESTAMP
+                    WHERE products.content_hash IS NOT excluded.content_hash
+                    ''', chunk)
+
+                    chunk_inserted = []
+                    chunk_changed = []
+                    chunk_unchanged = []
+                    for r in chunk:
+                        if r[0] not in known:
+                            result['inserted'] += 1
+                            chunk_inserted.append(r[0])
+                            # Later duplicates within the batch compare against this row
+                            known[r[0]] = r[8]
+                        elif known[r[0]] != r[8]:
+                            result['updated'] += 1
+                            result['changed_asins'].append(r[0])
+                            chunk_changed.append(r[0])
+                            known[r[0]] = r[8]
+                        else:
+                            result['unchanged'] += 1
+                            chunk_unchanged.append(r[0])
+                            
+                    self._touch_products(cursor, chunk_unchanged)
+                    self._log_changes(cursor, 'product', 'insert', 'asin = ?',
+                                      [(asin,) for asin in chunk_inserted])
+                    self._log_changes(cursor, 'product', 'update', 'asin = ?',
+                                      [(asin,) for asin in chunk_changed])
+
+            return result
+        except sqlite3.Error as e:
+            logger.error(f"Error upserting products: {e}")
+            return None
+
+    def _touch_products(self, cursor, asins):
+        """Stamp last_checked on products seen again with unchanged prices"""
+        if asins:
+            cursor.executemany("UPDATE products SET last_checked = CURRENT_TIMESTAMP WHERE asin = ?",
+                               [(asin,) for asin in asins])
+            
+    def get_known_asins(self, asins, fresh_within_hours=None, chunk_size=None):
+        """Return the subset of asins that are already in the products table
+        
+        With fresh_within_hours, only products whose prices were checked
+        within that many hours count as known, whether or not they changed.
+        """
+        if chunk_size is None:
+            chunk_size = DATABASE_CONFIG.get('bulk_chunk_size', 1000)
+            
+        if not self.conn:
+            self.connect()
+            
+        asins = iter(asins)
+        known = set()
+        
+        try:
+            while True:
+                chunk = list(islice(asins, chunk_size))
+                if not chunk:
+                    break
+                    
+                placeholders = ', '.join('?' * len(chunk))
+                sql = f"SELECT asin FROM products WHERE asin IN ({placeholders})"
+                params = chunk
+                if fresh_within_hours is not None:
+                    sql += " AND last_checked >= datetime('now', ?)"
+                    params = chunk + [f'-{fresh_within_hours} hours']
+                    
+                known.update(row[0] for row in self.conn.execute(sql, params))
+                
+            return known
+        except sqlite3.Error as e:
+            logger.error(f"Error looking up known ASINs: {e}")
+            return known
+            
+    def iter_product_asins(self, after_id=0, page_size=None):
+        """Iterate over (id, asin) for products with id above after_id, in id order"""
+        return self._iter_keyset(PRODUCT_ASINS_PAGE_SQL, (after_id,), lambda row: (row[0],), page_size)
+        
+    def iter_title_signatures(self, listed_only=False, page_size=None):
+        """Iterate over (product_id, signature) for stored title signatures"""
+        sql = TITLE_SIGNATURES_PAGE_SQL.format(listed_filter='AND p.is_listed = 1' if listed_only else '')
+        return self._iter_keyset(sql, (0,), lambda row: (row[0],), page_size)
+        
+    def iter_products_missing_title_signature(self, signature_bytes, page_size=None):
+        """Iterate over (id, title) for products with no signature of signature_bytes length"""
+        rows = self._iter_keyset(
+            MISSING_TITLE_SIGNATURES_PAGE_SQL,
+            (0, signature_bytes),
+            lambda row: (row[0], signature_bytes),
+            page_size
+        )
+        return rows
+        
+    def save_title_signatures(self, rows):
+        """Store (product_id, signature) pairs, replacing existing ones"""
+        try:
+            with self.transaction() as cursor:
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO title_signatures (product_id, signature) VALUES (?, ?)",
+                    rows
+                )
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error saving title signatures: {e}")
+            return False
+            
+    def iter_refresh_schedule(self, after_id=0, page_size=None):
+        """Iterate over (product_id, next_due, last_priced) for products with id above after_id
+        
+        next_due is None for products the refresh planner has not
+        scheduled yet; last_priced is the epoch second the product's price
+        was last updated.
+        """
+        return self._iter_keyset(REFRESH_SCHEDULE_PAGE_SQL, (after_id,), lambda row: (row[0],), page_size)
+        
+    def get_refresh_state(self, product_ids, chunk_size=None):
+        """Current row and refresh statistics for each product id
+        
+        Returns a dict of product id to (product, is_listed, last_checked,
+        change_events, exposure_seconds); the statistics are None for
+        products the planner has not checked yet.
+        """
+        if chunk_size is None:
+            chunk_size = DATABASE_CONFIG.get('bulk_chunk_size', 1000)
+            
+        if not self.conn:
+            self.connect()
+            
+        product_ids = list(product_ids)
+        state = {}
+        try:
+            for i in range(0, len(product_ids), chunk_size):
+                chunk = product_ids[i:i + chunk_size]
+                sql = REFRESH_STATE_SQL.format(placeholders=', '.join('?' * len(chunk)))
+                for row in self.conn.execute(sql, chunk):
+                    state[row[0]] = (Product.from_row(row[:9]),) + tuple(row[9:])
+            return state
+        except sqlite3.Error as e:
+            logger.error(f"Error getting refresh state: {e}")
+            return {}
+            
+    def get_price_change_counts(self, product_ids, chunk_size=None):
+        """Amazon price changes seen in the raw price history of each product
+        
+        Returns a dict of product id to (changes, span_seconds) for products
+        with any raw history.
+        """
+        if chunk_size is None:
+            chunk_size = DATABASE_CONFIG.get('bulk_chunk_size', 1000)
+            
+        if not self.conn:
+            self.connect()
+            
+        product_ids = list(product_ids)
+        counts = {}
+        try:
+            for i in range(0, len(product_ids), chunk_size):
+                chunk = product_ids[i:i + chunk_size]
+                sql = PRICE_CHANGE_COUNTS_SQL.format(placeholders=', '.join('?' * len(chunk)))
+                for product_id, changes, span in self.conn.execute(sql, chunk):
+                    counts[product_id] = (changes or 0, span or 0)
+            return counts
+        except sqlite3.Error as e:
+            logger.error(f"Error counting price changes: {e}")
+            return {}
+            
+    def save_refresh_stats(self, rows):
+        """Store (product_id, next_due, last_checked, change_events, exposure_seconds) rows"""
+        try:
+            with self.transaction() as cursor:
+                cursor.executemany('''
+                INSERT INTO refresh_stats (product_id, next_due, last_checked, change_events, exposure_seconds)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (product_id) DO UPDATE SET
+                    next_due = excluded.next_due,
+                    last_checked = excluded.last_checked,
+                    change_events = excluded.change_events,
+                    exposure_seconds = excluded.exposure_seconds
+                ''', rows)
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error saving refresh statistics: {e}")
+            return False
+            
+    def iter_revision_candidates(self, page_size=None):
+        """Iterate over active listings whose target price differs from the listed price
+        
+        Rows are (ebay_item_id, current_price, quantity, last_updated,
+        amazon_price, target_price, category), with last_updated in epoch
+        seconds.
+        """
+        rows = self._iter_keyset(
+            REVISION_CANDIDATES_PAGE_SQL,
+            (-1,),
+            lambda row: (row[0],),
+            page_size
+        )
+        for row in rows:
+            # Drop the leading listing id sort key
+            yield row[1:]
+            
+    def record_listing_revision(self, ebay_item_id, old_price, new_price, now=None):
+        """Save a revised listing price and log the revision against the daily budget
+        
+        The change_log entry is written and revisions older than a week are
+        pruned in the same transaction.
+        """
+        now = int(now if now is not None else time.time())
+        try:
+            with self.transaction() as cursor:
+                cursor.execute('''
+                UPDATE ebay_listings
+                SET current_price = ?, last_updated = CURRENT_TIMESTAMP
+                WHERE ebay_item_id = ?
+                ''', (new_price, ebay_item_id))
+                self._log_change(cursor, 'listing', 'update', 'ebay_item_id = ?', (ebay_item_id,))
+                cursor.execute(
+                    "INSERT INTO listing_revisions (ebay_item_id, revised_at, old_price, new_price) VALUES (?, ?, ?, ?)",
+                    (ebay_item_id, now, old_price, new_price)
+                )
+                cursor.execute("DELETE FROM listing_revisions WHERE revised_at < ?", (now - 7 * 86400,))
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error recording revision of eBay item {ebay_item_id}: {e}")
+            return False
+            
+    def count_listing_revisions_since(self, since):
+        """Number of listing revisions made at or after since (epoch seconds), or None on error"""
+        if not self.conn:
+            self.connect()
+            
+        try:
+            return self.conn.execute(LISTING_REVISIONS_SINCE_SQL, (int(since),)).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Error counting listing revisions: {e}")
+            return None
+            
+    def get_listed_price_history(self, since):
+        """Raw (product_id, category, ts, amazon_cents) observations of listed products since since"""
+        if not self.conn:
+            self.connect()
+            
+        try:
+            return self.conn.execute(LISTED_PRICE_HISTORY_SQL, (int(since),)).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error getting listed price history: {e}")
+            return []
+            
+    def iter_repricing_chunks(self, chunk_size=None):
+        """Yield lists of (listing_id, amazon_price, ebay_price, category, target_price) rows
+        
+        One row per active listing. All chunks come from one read
+        statement, so the repricer sees one consistent snapshot.
+        """
+        if chunk_size is None:
+            chunk_size = DATABASE_CONFIG.get('bulk_chunk_size', 1000)
+            
+        if not self.conn:
+            self.connect()
+            
+        try:
+            cursor = self.conn.execute(REPRICING_SQL)
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        except sqlite3.Error as e:
+            logger.error(f"Error loading listings for repricing: {e}")
+            
+    def save_listing_targets(self, rows):
+        """Store (target_price, listing_id) rows in one transaction
+        
+        Only the repricing target changes; the listed price moves when the
+        listing is revised. Returns the number of listings updated, or
+        None if the transaction was rolled back.
+        """
+        try:
+            with self.transaction() as cursor:
+                cursor.executemany("UPDATE ebay_listings SET target_price = ? WHERE id = ?", rows)
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Error saving listing target prices: {e}")
+            return None
             
     def get_unlisted_products(self, limit=50):
-        """Get products that haven't been listed on eBay yet"""
+        """Get Product records that haven't been listed on eBay yet"""
         if not self.conn:
             self.connect()
             
         try:
-            self.cursor.execute('''
-            SELECT id, asin, title, amazon_price, ebay_price, profit_margin, 
-                   category, image_url, description
-            FROM products
-            WHERE is_listed = 0
-            ORDER BY profit_margin DESC
-            LIMIT ?
-            ''', (limit,))
+            self.cursor.execute(UNLISTED_PRODUCTS_SQL, (limit,))
             
-            return self.cursor.fetchall()
+            return [Product.from_row(row) for row in self.cursor.fetchall()]
         except sqlite3.Error as e:
             logger.error(f"Error getting unlisted products: {e}")
             return []
             
-    def update_product_listed_status(self, product_id, ebay_item_id, listing_title, price):
-        """Update product as listed and add to ebay_listings table"""
+    def _iter_keyset(self, sql, start_key, next_key, page_size=None):
+        """Yield rows of a keyset-paginated query one bounded page at a time
+        
+        sql takes the current key values followed by the page size. Each
+        page is fetched completely before any row is yielded, so no read
+        statement (and no WAL snapshot) is held open while the caller works
+        through the rows.
+        """
+        if page_size is None:
+            page_size = DATABASE_CONFIG.get('page_size', 500)
+            
         if not self.conn:
             self.connect()
             
-        try:
-            # Begin transaction
-            self.conn.execute("BEGIN TRANSACTION")
+        key = start_key
+        while True:
+            try:
+                page = self.conn.execute(sql, key + (page_size,)).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Error paging query results: {e}")
+                return
+                
+            for row in page:
+                yield row
+                
+            if len(page) < page_size:
+                return
+            key = next_key(page[-1])
             
-            # Update product status
-            self.cursor.execute('''
-            UPDATE products
-            SET is_listed = 1
-            WHERE id = ?
-            ''', (product_id,))
+    def iter_unlisted_products(self, page_size=None):
+        """Iterate over unlisted Product records, highest profit margin first
+        
+        Products suppressed as near-duplicates of a listed product are left out.
+        """
+        # profit_margin <= +inf with id > -1 admits every row on the first page
+        rows = self._iter_keyset(
+            UNLISTED_PRODUCTS_PAGE_SQL,
+            (float('inf'), float('inf'), -1),
+            lambda row: (row[5], row[5], row[0]),
+            page_size
+        )
+        for row in rows:
+            yield Product.from_row(row)
             
-            # Add to ebay_listings
-            self.cursor.execute('''
-            INSERT INTO ebay_listings
-            (product_id, ebay_item_id, listing_title, current_price)
-            VALUES (?, ?, ?, ?)
-            ''', (product_id, ebay_item_id, listing_title, price))
+    def mark_duplicate(self, product_id, duplicate_of):
+        """Keep a product out of the unlisted queue as a near-duplicate of a listed one"""
+        try:
+            with self.transaction() as cursor:
+                cursor.execute("UPDATE products SET duplicate_of = ? WHERE id = ?", (duplicate_of, product_id))
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error marking product {product_id} as a duplicate: {e}")
+            return False
             
-            # Commit transaction
-            self.conn.commit()
+    def update_product_listed_status(self, product_id, ebay_item_id, listing_title, price):
+        """Update product as listed and add to ebay_listings table"""
+        if not self.conn:
+            self.connect()
+            
+        try:
+            with self.transaction() as cursor:
+                # Update product status
+                cursor.execute('''
+                UPDATE products
+                SET is_listed = 1
+                WHERE id = ?
+                ''', (product_id,))
+                
+                # Add to ebay_listings
+                cursor.execute('''
+                INSERT INTO ebay_listings
+                (product_id, ebay_item_id, listing_title, current_price, target_price)
+                VALUES (?, ?, ?, ?, ?)
+                ''', (product_id, ebay_item_id, listing_title, price, price))
+                listing_id = cursor.lastrowid
+                
+                self._log_change(cursor, 'product', 'update', 'id = ?', (product_id,))
+                self._log_change(cursor, 'listing', 'insert', 'id = ?', (listing_id,))
+                
             return True
         except sqlite3.Error as e:
-            self.conn.rollback()
             logger.error(f"Error updating product listing status: {e}")
             return False
             
@@ -199,16 +1308,19 @@ class ArbitrageDatabase:
             self.connect()
             
         try:
-            self.cursor.execute('''
-            INSERT INTO orders
-            (ebay_order_id, ebay_item_id, buyer_name, buyer_email, 
-             shipping_address, order_total, order_status)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (ebay_order_id, ebay_item_id, buyer_name, buyer_email, 
-                 shipping_address, order_total, order_status))
-            
-            self.conn.commit()
-            return self.cursor.lastrowid
+            with self.transaction() as cursor:
+                cursor.execute('''
+                INSERT INTO orders
+                (ebay_order_id, ebay_item_id, buyer_name, buyer_email, 
+                 shipping_address, order_total, order_status)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (ebay_order_id, ebay_item_id, buyer_name, buyer_email, 
+                     shipping_address, order_total, order_status))
+                order_id = cursor.lastrowid
+                
+                self._log_change(cursor, 'order', 'insert', 'id = ?', (order_id,))
+                
+            return order_id
         except sqlite3.Error as e:
             logger.error(f"Error adding order: {e}")
             return None
@@ -219,15 +1331,19 @@ class ArbitrageDatabase:
             self.connect()
             
         try:
-            self.cursor.execute('''
-            UPDATE orders
-            SET amazon_order_id = ?, tracking_number = ?, 
-                order_status = 'fulfilled', date_fulfilled = CURRENT_TIMESTAMP
-            WHERE ebay_order_id = ?
-            ''', (amazon_order_id, tracking_number, ebay_order_id))
-            
-            self.conn.commit()
-            return self.cursor.rowcount > 0
+            with self.transaction() as cursor:
+                cursor.execute('''
+                UPDATE orders
+                SET amazon_order_id = ?, tracking_number = ?, 
+                    order_status = 'fulfilled', date_fulfilled = CURRENT_TIMESTAMP
+                WHERE ebay_order_id = ?
+                ''', (amazon_order_id, tracking_number, ebay_order_id))
+                fulfilled = cursor.rowcount > 0
+                
+                if fulfilled:
+                    self._log_change(cursor, 'order', 'update', 'ebay_order_id = ?', (ebay_order_id,))
+                    
+            return fulfilled
         except sqlite3.Error as e:
             logger.error(f"Error updating order fulfillment: {e}")
             return False
@@ -238,21 +1354,25 @@ class ArbitrageDatabase:
             self.connect()
             
         try:
-            self.cursor.execute('''
-            SELECT o.id, o.ebay_order_id, o.ebay_item_id, o.buyer_name, 
-                   o.shipping_address, p.asin, p.amazon_price
-            FROM orders o
-            JOIN ebay_listings e ON o.ebay_item_id = e.ebay_item_id
-            JOIN products p ON e.product_id = p.id
-            WHERE o.order_status = 'new'
-            ORDER BY o.date_ordered
-            ''')
-            
+            self.cursor.execute(PENDING_ORDERS_SQL)
+
             return self.cursor.fetchall()
         except sqlite3.Error as e:
             logger.error(f"Error getting pending orders: {e}")
             return []
             
+    def iter_pending_orders(self, page_size=None):
+        """Iterate over orders that need to be fulfilled, oldest first"""
+        rows = self._iter_keyset(
+            PENDING_ORDERS_PAGE_SQL,
+            ('', -1),
+            lambda row: (row[7], row[0]),
+            page_size
+        )
+        for row in rows:
+            # Drop the trailing date_ordered sort key
+            yield row[:7]
+
     def record_profit(self, order_id, amazon_cost, ebay_revenue, ebay_fees, paypal_fees):
         """Record profit details for an order"""
         if not self.conn:
@@ -261,14 +1381,666 @@ class ArbitrageDatabase:
         try:
             net_profit = ebay_revenue - amazon_cost - ebay_fees - paypal_fees
             
-            self.cursor.execute('''
-            INSERT INTO profit_tracking
-            (order_id, amazon_cost, ebay_revenue, ebay_fees, paypal_fees, net_profit)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', (order_id, amazon_cost, ebay_revenue, ebay_fees, paypal_fees, net_profit))
-            
-            self.conn.commit()
+            with self.transaction() as cursor:
+                cursor.execute('''
+                INSERT INTO profit_tracking
+                (order_id, amazon_cost, ebay_revenue, ebay_fees, paypal_fees, net_profit)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', (order_id, amazon_cost, ebay_revenue, ebay_fees, paypal_fees, net_profit))
+                profit_id = cursor.lastrowid
+                
+                # Fold the new row into its day's rollup in the same transaction.
+                # Reading the day back from the row keeps it identical to date(date).
+                cursor.execute('''
+                INSERT INTO daily_profit_rollup
+                (day, order_count, total_cost, total_revenue, total_ebay_fees, total_paypal_fees, total_profit)
+                SELECT date(date), 1, amazon_cost, ebay_revenue, ebay_fees, paypal_fees, net_profit
+                FROM profit_tracking
+                WHERE id = ?
+                ON CONFLICT (day) DO UPDATE SET
+                    order_count = order_count + excluded.order_count,
+                    total_cost = total_cost + excluded.total_cost,
+                    total_revenue = total_revenue + excluded.total_revenue,
+                    total_ebay_fees = total_ebay_fees + excluded.total_ebay_fees,
+                    total_paypal_fees = total_paypal_fees + excluded.total_paypal_fees,
+                    total_profit = total_profit + excluded.total_profit
+                ''', (profit_id,))
+                
+                self._log_change(cursor, 'profit', 'insert', 'id = ?', (profit_id,))
+                
             return True
         except sqlite3.Error as e:
             logger.error(f"Error recording profit: {e}")
             return False
+            
+    def _log_change(self, cursor, entity, op, where, params):
+        """Append change_log rows for the entity rows matching where
+        
+        Must be called with the transaction's cursor so the outbox entry
+        commits or rolls back together with the change it describes.
+        """
+        table, key, payload = CHANGE_SOURCES[entity]
+        cursor.execute(
+            f"INSERT INTO change_log (entity, entity_key, op, payload) "
+            f"SELECT ?, {key}, ?, {payload} FROM {table} WHERE {where}",
+            (entity, op, *params)
+        )
+        
+    def _log_changes(self, cursor, entity, op, where, param_rows):
+        """executemany form of _log_change for bulk writes"""
+        if not param_rows:
+            return
+            
+        table, key, payload = CHANGE_SOURCES[entity]
+        cursor.executemany(
+            f"INSERT INTO change_log (entity, entity_key, op, payload) "
+            f"SELECT ?, {key}, ?, {payload} FROM {table} WHERE {where}",
+            [(entity, op, *params) for params in param_rows]
+        )
+        
+    def changes_since(self, seq=0, limit=None):
+        """Get change_log entries with a sequence number above seq
+        
+        Returns up to limit dicts with seq, entity, entity_key, op, payload
+        (decoded) and changed_at, in sequence order. Consumers pass the last
+        seq they processed to resume. Returns [] on error.
+        """
+        if limit is None:
+            limit = CHANGE_LOG_CONFIG['batch_size']
+            
+        if not self.conn:
+            self.connect()
+            
+        try:
+            rows = self.conn.execute(CHANGES_SINCE_SQL, (seq, limit)).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading change log: {e}")
+            return []
+            
+        return [
+            {
+                'seq': row[0],
+                'entity': row[1],
+                'entity_key': row[2],
+                'op': row[3],
+                'payload': json.loads(row[4]) if row[4] else None,
+                'changed_at': row[5]
+            }
+            for row in rows
+        ]
+        
+    def prune_change_log(self, retention_days=None):
+        """Delete change_log entries older than retention_days
+        
+        Entries are removed from the head of the log only, so sequence
+        numbers stay contiguous from the oldest retained entry onwards.
+        Returns the number of entries deleted, or None on error.
+        """
+        if retention_days is None:
+            retention_days = CHANGE_LOG_CONFIG['retention_days']
+            
+        try:
+            with self.transaction() as cursor:
+                # Walks the log from the oldest entry and stops at the first
+                # one inside the retention window
+                cursor.execute('''
+                DELETE FROM change_log
+                WHERE seq < COALESCE(
+                    (SELECT seq FROM change_log
+                     WHERE changed_at >= datetime('now', ?)
+                     ORDER BY seq LIMIT 1),
+                    (SELECT MAX(seq) + 1 FROM change_log)
+                )
+                ''', (f'-{retention_days} days',))
+                deleted = cursor.rowcount
+                
+            logger.info(f"Pruned {deleted} change log entries")
+            return deleted
+        except sqlite3.Error as e:
+            logger.error(f"Error pruning change log: {e}")
+            return None
+            
+    def get_profit_report(self, days=30, use_snapshot=True):
+        """Get per-day and total profit figures for the last N days
+        
+        Reads only the pre-aggregated daily_profit_rollup rows, from the
+        reporting snapshot unless use_snapshot is False. Returns a
+        (daily_profits, totals) tuple, or None on error.
+        """
+        try:
+            with self.report_connection(use_snapshot) as conn:
+                daily_profits = conn.execute(PROFIT_BY_DAY_SQL, (f'-{days} days',)).fetchall()
+                totals = conn.execute(PROFIT_TOTALS_SQL, (f'-{days} days',)).fetchone()
+            return daily_profits, totals
+        except sqlite3.Error as e:
+            logger.error(f"Error getting profit report: {e}")
+            return None
+            
+    def _raw_profit_by_day(self):
+        """Aggregate profit_tracking per day across the hot database and all archives"""
+        totals = {}
+        
+        def add(rows):
+            for day, *values in rows:
+                current = totals.setdefault(day, [0] * len(ROLLUP_COLUMNS))
+                for i, value in enumerate(values):
+                    current[i] += value or 0
+                    
+        add(self.conn.execute(PROFIT_ROLLUP_SOURCE_SQL.format(schema='main')))
+        for schemas in self._archive_batches():
+            for schema in schemas:
+                add(self.conn.execute(PROFIT_ROLLUP_SOURCE_SQL.format(schema=schema)))
+                
+        return totals
+        
+    def backfill_profit_rollup(self):
+        """Rebuild daily_profit_rollup from the raw profit_tracking rows
+        
+        Archived profit rows are included, so the rollup keeps covering
+        history that has moved out of the hot database.
+        Returns the number of days written, or None on error.
+        """
+        if not self.conn:
+            self.connect()
+            
+        try:
+            # Archives must be attached outside the write transaction
+            totals = self._raw_profit_by_day()
+            
+            with self.transaction() as cursor:
+                cursor.execute("DELETE FROM daily_profit_rollup")
+                cursor.executemany(
+                    f"INSERT INTO daily_profit_rollup (day, {', '.join(ROLLUP_COLUMNS)}) "
+                    f"VALUES (?, {', '.join('?' * len(ROLLUP_COLUMNS))})",
+                    [(day, *values) for day, values in totals.items()]
+                )
+                
+            logger.info(f"Backfilled profit rollup for {len(totals)} days")
+            return len(totals)
+        except sqlite3.Error as e:
+            logger.error(f"Error backfilling profit rollup: {e}")
+            return None
+            
+    def check_profit_rollup(self, tolerance=0.005):
+        """Compare daily_profit_rollup against aggregates of the raw rows
+        
+        Raw rows are read from the hot database and every monthly archive.
+        Returns a list of (day, column, expected, actual) tuples for every
+        value that differs by more than tolerance; an empty list means the
+        rollup is consistent. Returns None on error.
+        """
+        if not self.conn:
+            self.connect()
+            
+        try:
+            expected = self._raw_profit_by_day()
+            actual = {row[0]: row[1:] for row in self.conn.execute(
+                f"SELECT day, {', '.join(ROLLUP_COLUMNS)} FROM daily_profit_rollup"
+            )}
+        except sqlite3.Error as e:
+            logger.error(f"Error checking profit rollup: {e}")
+            return None
+            
+        missing = (0,) * len(ROLLUP_COLUMNS)
+        mismatches = []
+        
+        for day in sorted(set(expected) | set(actual)):
+            for column, want, got in zip(ROLLUP_COLUMNS, expected.get(day, missing), actual.get(day, missing)):
+                if abs((want or 0) - (got or 0)) > tolerance:
+                    mismatches.append((day, column, want, got))
+                    
+        return mismatches
+        
+    def record_price_observations(self, observations, ts=None):
+        """Append price observations to the price history
+        
+        observations is an iterable of (asin, amazon_price, ebay_price)
+        tuples; either price may be None when only one side was observed.
+        Prices are stored as integer cents at epoch second ts (default now).
+        Observations of the same product in the same second are merged.
+        Returns the number of rows written, or None on error.
+        """
+        if ts is None:
+            ts = int(time.time())
+            
+        def cents(price):
+            return None if price is None else int(round(price * 100))
+            
+        rows = ((ts, cents(amazon_price), cents(ebay_price), asin)
+                for asin, amazon_price, ebay_price in observations)
+        
+        try:
+            with self.transaction() as cursor:
+                cursor.executemany('''
+                INSERT INTO price_history (product_id, ts, amazon_cents, ebay_cents)
+                SELECT id, ?, ?, ? FROM products WHERE asin = ?
+                ON CONFLICT (product_id, ts) DO UPDATE SET
+                    amazon_cents = COALESCE(excluded.amazon_cents, amazon_cents),
+                    ebay_cents = COALESCE(excluded.ebay_cents, ebay_cents)
+                ''', rows)
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Error recording price observations: {e}")
+            return None
+            
+    def get_price_history(self, asin, start_ts=0, end_ts=None):
+        """Get one product's price history between two epoch timestamps
+        
+        Returns (ts, amazon_cents, ebay_cents) tuples in time order. Recent
+        data comes back at full resolution; compacted periods come back as
+        one averaged point per hourly or daily bucket.
+        """
+        if end_ts is None:
+            end_ts = int(time.time())
+            
+        if not self.conn:
+            self.connect()
+            
+        try:
+            cursor = self.conn.execute(PRICE_HISTORY_SQL, (asin, start_ts, end_ts, asin, start_ts, end_ts))
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error getting price history for {asin}: {e}")
+            return []
+            
+    def compact_price_history(self, now=None):
+        """Downsample old price observations and enforce retention
+        
+        Raw observations older than raw_retention_days are folded into
+        hourly buckets, hourly buckets older than hourly_retention_days into
+        daily buckets, and daily buckets older than daily_retention_days
+        are dropped (0 keeps them forever). Cutoffs are aligned to bucket
+        boundaries so a bucket is always compacted in one pass.
+        Returns a dict of rows folded or removed per tier, or None on error.
+        """
+        if now is None:
+            now = int(time.time())
+            
+        raw_cutoff = now - PRICE_HISTORY_CONFIG['raw_retention_days'] * DAILY
+        raw_cutoff -= raw_cutoff % HOURLY
+        hourly_cutoff = now - PRICE_HISTORY_CONFIG['hourly_retention_days'] * DAILY
+        hourly_cutoff -= hourly_cutoff % DAILY
+        
+        if not self.conn:
+            self.connect()
+            
+        merge_on_conflict = '''
+        ON CONFLICT (product_id, resolution, bucket_ts) DO UPDATE SET
+            samples = samples + excluded.samples,
+            amazon_min = MIN(COALESCE(amazon_min, excluded.amazon_min), COALESCE(excluded.amazon_min, amazon_min)),
+            amazon_max = MAX(COALESCE(amazon_max, excluded.amazon_max), COALESCE(excluded.amazon_max, amazon_max)),
+            amazon_avg = COALESCE((amazon_avg * samples + excluded.amazon_avg * excluded.samples) / (samples + excluded.samples),
+                                  amazon_avg, excluded.amazon_avg),
+            ebay_min = MIN(COALESCE(ebay_min, excluded.ebay_min), COALESCE(excluded.ebay_min, ebay_min)),
+            ebay_max = MAX(COALESCE(ebay_max, excluded.ebay_max), COALESCE(excluded.ebay_max, ebay_max)),
+            ebay_avg = COALESCE((ebay_avg * samples + excluded.ebay_avg * excluded.samples) / (samples + excluded.samples),
+                                ebay_avg, excluded.ebay_avg)
+        '''
+        result = {}
+        
+        try:
+            # Raw observations -> hourly buckets
+            with self.transaction() as cursor:
+                cursor.execute(f'''
+                INSERT INTO price_history_buckets
+                (product_id, resolution, bucket_ts, samples,
+                 amazon_min, amazon_max, amazon_avg, ebay_min, ebay_max, ebay_avg)
+                SELECT product_id, {HOURLY}, ts - ts % {HOURLY}, COUNT(*),
+                       MIN(amazon_cents), MAX(amazon_cents), CAST(ROUND(AVG(amazon_cents)) AS INTEGER),
+                       MIN(ebay_cents), MAX(ebay_cents), CAST(ROUND(AVG(ebay_cents)) AS INTEGER)
+                FROM price_history
+                WHERE ts < ?
+                GROUP BY product_id, ts - ts % {HOURLY}
+                {merge_on_conflict}
+                ''', (raw_cutoff,))
+                cursor.execute("DELETE FROM price_history WHERE ts < ?", (raw_cutoff,))
+                result['raw_folded'] = cursor.rowcount
+                
+            # Hourly buckets -> daily buckets, averages weighted by sample count
+            with self.transaction() as cursor:
+                cursor.execute(f'''
+                INSERT INTO price_history_buckets
+                (product_id, resolution, bucket_ts, samples,
+                 amazon_min, amazon_max, amazon_avg, ebay_min, ebay_max, ebay_avg)
+                SELECT product_id, {DAILY}, bucket_ts - bucket_ts % {DAILY}, SUM(samples),
+                       MIN(amazon_min), MAX(amazon_max),
+                       CAST(ROUND(SUM(amazon_avg * samples) * 1.0 /
+                                  SUM(CASE WHEN amazon_avg IS NOT NULL THEN samples END)) AS INTEGER),
+                       MIN(ebay_min), MAX(ebay_max),
+                       CAST(ROUND(SUM(ebay_avg * samples) * 1.0 /
+                                  SUM(CASE WHEN ebay_avg IS NOT NULL THEN samples END)) AS INTEGER)
+                FROM price_history_buckets
+                WHERE resolution = {HOURLY} AND bucket_ts < ?
+                GROUP BY product_id, bucket_ts - bucket_ts % {DAILY}
+                {merge_on_conflict}
+                ''', (hourly_cutoff,))
+                cursor.execute(f'''
+                DELETE FROM price_history_buckets
+                WHERE resolution = {HOURLY} AND bucket_ts < ?
+                ''', (hourly_cutoff,))
+                result['hourly_folded'] = cursor.rowcount
+                
+            # Daily buckets past retention
+            result['daily_dropped'] = 0
+            if PRICE_HISTORY_CONFIG['daily_retention_days']:
+                daily_cutoff = now - PRICE_HISTORY_CONFIG['daily_retention_days'] * DAILY
+                with self.transaction() as cursor:
+                    cursor.execute(f'''
+                    DELETE FROM price_history_buckets
+                    WHERE resolution = {DAILY} AND bucket_ts < ?
+                    ''', (daily_cutoff,))
+                    result['daily_dropped'] = cursor.rowcount
+                    
+            logger.info(
+                f"Compacted price history: {result['raw_folded']} raw rows folded, "
+                f"{result['hourly_folded']} hourly buckets folded, {result['daily_dropped']} daily buckets dropped"
+            )
+            return result
+        except sqlite3.Error as e:
+            logger.error(f"Error compacting price history: {e}")
+            return None
+
+    def list_archives(self):
+        """List this database's monthly order archives as (month, path) pairs, oldest first"""
+        if not self.archive_dir:
+            return []
+            
+        pattern = os.path.join(self.archive_dir, 'orders_*.sqlite')
+        archives = []
+        
+        for path in sorted(glob.glob(pattern)):
+            month = os.path.basename(path)[len('orders_'):-len('.sqlite')]
+            archives.append((month, path))
+            
+        return archives
+        
+    def _archive_batches(self, since_month=None):
+        """Attach monthly archives in batches that fit SQLite's attach limit
+        
+        Yields the list of attached schema names for each batch and detaches
+        them before attaching the next. Must not be used inside a transaction.
+        """
+        archives = [(month, path) for month, path in self.list_archives()
+                    if since_month is None or month >= since_month]
+        if not archives:
+            return
+            
+        try:
+            batch_size = self.conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        except AttributeError:
+            batch_size = 10
+        # Leave one slot free for archival and snapshot jobs
+        batch_size = max(batch_size - 1, 1)
+        
+        for i in range(0, len(archives), batch_size):
+            schemas = []
+            try:
+                for month, path in archives[i:i + batch_size]:
+                    schema = f"archive_{month}"
+                    self.conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+                    schemas.append(schema)
+                yield schemas
+            finally:
+                for schema in schemas:
+                    self.conn.execute(f"DETACH DATABASE {schema}")
+                    
+    def archive_fulfilled_orders(self, older_than_days=None):
+        """Move fulfilled orders and their profit rows into monthly archives
+        
+        Orders fulfilled more than older_than_days ago are copied, together
+        with their profit_tracking rows, into orders_YYYY_MM.sqlite under
+        the database's archive_dir (by fulfilment month), then deleted
+        from the hot database. Copies use INSERT OR IGNORE so a run
+        interrupted between the archive and hot commits is safe to repeat.
+        The daily profit rollup is left untouched and keeps covering
+        archived days. Returns the number of orders archived, or None on error.
+        """
+        if older_than_days is None:
+            older_than_days = ARCHIVE_CONFIG['archive_after_days']
+            
+        if not self.archive_dir:
+            logger.error("Archiving needs an archive directory, which an in-memory database does not have")
+            return None
+            
+        if not self.conn:
+            self.connect()
+            
+        os.makedirs(self.archive_dir, exist_ok=True)
+        cutoff = f'-{older_than_days} days'
+        conn = self.conn
+        archived = 0
+        
+        try:
+            months = [row[0] for row in conn.execute('''
+            SELECT DISTINCT strftime('%Y_%m', date_fulfilled)
+            FROM orders
+            WHERE order_status = 'fulfilled' AND date_fulfilled < datetime('now', ?)
+            ''', (cutoff,))]
+            
+            table_sql = dict(conn.execute('''
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'table' AND name IN ('orders', 'profit_tracking')
+            ''').fetchall())
+            
+            for month in months:
+                path = os.path.join(self.archive_dir, f"orders_{month}.sqlite")
+                conn.execute("ATTACH DATABASE ? AS archive", (path,))
+                
+                try:
+                    with self.transaction() as cursor:
+                        for table, sql in table_sql.items():
+                            cursor.execute(sql.replace(f"CREATE TABLE {table}",
+                                                       f"CREATE TABLE IF NOT EXISTS archive.{table}", 1))
+                            self._add_missing_archive_columns(cursor, table)
+                            
+                        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)")
+                        cursor.execute("DELETE FROM temp.archive_batch")
+                        cursor.execute('''
+                        INSERT INTO temp.archive_batch
+                        SELECT id FROM main.orders
+                        WHERE order_status = 'fulfilled' AND date_fulfilled < datetime('now', ?)
+                          AND strftime('%Y_%m', date_fulfilled) = ?
+                        ''', (cutoff, month))
+                        
+                        for table, key in (('orders', 'id'), ('profit_tracking', 'order_id')):
+                            columns = ', '.join(self._table_columns(cursor, 'main', table))
+                            cursor.execute(f"INSERT OR IGNORE INTO archive.{table} ({columns}) "
+                                           f"SELECT {columns} FROM main.{table} "
+                                           f"WHERE {key} IN (SELECT id FROM temp.archive_batch)")
+                                           
+                        cursor.execute("DELETE FROM main.profit_tracking WHERE order_id IN (SELECT id FROM temp.archive_batch)")
+                        cursor.execute("DELETE FROM main.orders WHERE id IN (SELECT id FROM temp.archive_batch)")
+                        archived += cursor.rowcount
+                finally:
+                    conn.execute("DETACH DATABASE archive")
+                    
+            logger.info(f"Archived {archived} fulfilled orders into {len(months)} monthly archives")
+            return archived
+        except sqlite3.Error as e:
+            logger.error(f"Error archiving fulfilled orders: {e}")
+            return None
+            
+    def _table_columns(self, cursor, schema, table):
+        """Column names of a table in the given schema"""
+        cursor.execute(f"PRAGMA {schema}.table_info({table})")
+        return [row[1] for row in cursor.fetchall()]
+        
+    def _add_missing_archive_columns(self, cursor, table):
+        """Bring an older archive table up to the hot table's columns"""
+        archive_columns = set(self._table_columns(cursor, 'archive', table))
+        cursor.execute(f"PRAGMA main.table_info({table})")
+        
+        for _, name, column_type, *_ in cursor.fetchall():
+            if name not in archive_columns:
+                cursor.execute(f"ALTER TABLE archive.{table} ADD COLUMN {name} {column_type}")
+                
+    def get_order_history(self, start_date, end_date):
+        """Get orders placed in [start_date, end_date) from the hot database and archives
+        
+        Archives are attached transparently, so historical reports see
+        fulfilled orders that have been moved out of the hot database.
+        Returns (ebay_order_id, ebay_item_id, amazon_order_id, order_total,
+        order_status, date_ordered, date_fulfilled, net_profit) tuples
+        ordered by date_ordered.
+        """
+        if not self.conn:
+            self.connect()
+            
+        query = '''
+        SELECT o.ebay_order_id, o.ebay_item_id, o.amazon_order_id, o.order_total,
+               o.order_status, o.date_ordered, o.date_fulfilled, pt.net_profit
+        FROM {schema}.orders o
+        LEFT JOIN {schema}.profit_tracking pt ON pt.order_id = o.id
+        WHERE o.date_ordered >= ? AND o.date_ordered < ?
+        '''
+        
+        try:
+            rows = self.conn.execute(query.format(schema='main'), (start_date, end_date)).fetchall()
+            
+            # An order lands in the archive of the month it was fulfilled,
+            # which is never earlier than the month it was placed
+            for schemas in self._archive_batches(since_month=start_date[:7].replace('-', '_')):
+                union = ' UNION ALL '.join(query.format(schema=schema) for schema in schemas)
+                rows.extend(self.conn.execute(union, (start_date, end_date) * len(schemas)).fetchall())
+                
+            rows.sort(key=lambda row: row[5] or '')
+            return rows
+        except sqlite3.Error as e:
+            logger.error(f"Error getting order history: {e}")
+            return []
+
+    def take_snapshot(self, pages=None, sleep=None):
+        """Copy the live database into the read-only reporting snapshot
+        
+        Uses the SQLite online backup API, copying pages at a time and
+        sleeping between steps so writers are never blocked for long. A
+        write from another connection restarts a stepped copy, so under
+        steady ingestion it may never finish; after max_restarts restarts
+        or max_step_seconds the copy is redone in a single step, which
+        holds the read lock for its duration but always completes. The
+        copy is built in a temporary file and atomically renamed over the
+        previous snapshot, so readers always see a complete replica.
+        Returns True on success, False otherwise.
+        """
+        if not self.snapshot_path:
+            logger.error("Snapshots are not available for this database")
+            return False
+            
+        if pages is None:
+            pages = SNAPSHOT_CONFIG['pages_per_step']
+        if sleep is None:
+            sleep = SNAPSHOT_CONFIG['step_sleep']
+            
+        if not self.conn:
+            self.connect()
+            
+        tmp_path = f"{self.snapshot_path}.tmp"
+        start = time.time()
+        
+        try:
+            if os.path.dirname(self.snapshot_path):
+                os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+                
+            target = sqlite3.connect(tmp_path)
+            try:
+                method = 'stepped'
+                try:
+                    self.conn.backup(target, pages=pages, sleep=sleep, progress=self._snapshot_progress(start))
+                except _SnapshotAbandoned as e:
+                    logger.warning(f"Stepped snapshot copy {e}, copying in a single step")
+                    method = 'single-step'
+                    start = time.time()
+                    self.conn.backup(target, pages=-1)
+                    
+                # The replica must be a single self-contained file
+                target.execute("PRAGMA journal_mode = DELETE")
+                target.execute("CREATE TABLE IF NOT EXISTS snapshot_info (taken_at REAL NOT NULL)")
+                target.execute("DELETE FROM snapshot_info")
+                target.execute("INSERT INTO snapshot_info (taken_at) VALUES (?)", (start,))
+                target.commit()
+            finally:
+                target.close()
+                
+            os.replace(tmp_path, self.snapshot_path)
+            logger.info(f"Took {method} reporting snapshot in {time.time() - start:.2f}s")
+            return True
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Error taking reporting snapshot: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+            
+    def _snapshot_progress(self, start):
+        """Backup progress callback that abandons a stepped copy which keeps restarting"""
+        max_restarts = SNAPSHOT_CONFIG['max_restarts']
+        max_seconds = SNAPSHOT_CONFIG['max_step_seconds']
+        state = {'remaining': None, 'restarts': 0}
+        
+        def progress(status, remaining, total):
+            # Remaining pages only go up when the copy started over
+            if state['remaining'] is not None and remaining > state['remaining']:
+                state['restarts'] += 1
+            state['remaining'] = remaining
+            
+            if state['restarts'] > max_restarts:
+                raise _SnapshotAbandoned(f"restarted {state['restarts']} times")
+            if remaining and time.time() - start > max_seconds:
+                raise _SnapshotAbandoned(f"still running after {max_seconds}s")
+                
+        return progress
+        
+    def _open_snapshot(self):
+        """Open a read-only connection to the reporting snapshot, or None if there is none"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+            
+        uri = f"file:{os.path.abspath(self.snapshot_path)}?mode=ro"
+        return sqlite3.connect(uri, uri=True)
+        
+    def snapshot_age(self):
+        """Seconds since the reporting snapshot was taken, or None if there is none"""
+        try:
+            conn = self._open_snapshot()
+            if conn is None:
+                return None
+                
+            try:
+                row = conn.execute("SELECT taken_at FROM snapshot_info").fetchone()
+            finally:
+                conn.close()
+                
+            return time.time() - row[0] if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Error reading snapshot age: {e}")
+            return None
+            
+    def snapshot_is_stale(self, max_age=None):
+        """Whether the reporting snapshot is missing or older than max_age seconds"""
+        if max_age is None:
+            max_age = SNAPSHOT_CONFIG['max_age']
+            
+        age = self.snapshot_age()
+        return age is None or age > max_age
+        
+    @contextmanager
+    def report_connection(self, use_snapshot=True):
+        """Yield a connection for read-only reporting queries
+        
+        Uses the reporting snapshot when one exists so long analytic reads
+        never contend with writers, and falls back to the live database
+        otherwise or when use_snapshot is False.
+        """
+        conn = self._open_snapshot() if use_snapshot else None
+        
+        if conn is None:
+            if use_snapshot:
+                logger.debug("No reporting snapshot available, reading live database")
+            if not self.conn:
+                self.connect()
+            yield self.conn
+            return
+            
+        try:
+            yield conn
+        finally:
+            conn.close()
@@ -0,0 +1,151 @@
+"""
+Database maintenance commands for Amazon to eBay Arbitrage System
+"""
+
+import sys
+import argparse
+import logging
+
+from database import ArbitrageDatabase
+
+logger = logging.getLogger('db_maintenance')
+
+def check_plans(db):
+    """Verify that no hot query falls back to a full table scan"""
+    offenders = db.check_query_plans()
+
+    if not offenders:
+        print("All hot queries are served by indexes")
+        return True
+
+    for name, scans in offenders.items():
+        print(f"FAIL {name}: {'; '.join(scans)}")
+    return False
+
+def backfill_rollup(db):
+    """Rebuild the daily profit rollup from profit_tracking"""
+    days = db.backfill_profit_rollup()
+    if days is None:
+        return False
+
+    print(f"Rebuilt daily profit rollup for {days} days")
+    return True
+
+def check_rollup(db):
+    """Verify the daily profit rollup against the raw profit rows"""
+    mismatches = db.check_profit_rollup()
+    if mismatches is None:
+        return False
+
+    if not mismatches:
+        print("Daily profit rollup is consistent with profit_tracking")
+        return True
+
+    for day, column, expected, actual in mismatches:
+        print(f"MISMATCH {day} {column}: expected {expected}, rollup has {actual}")
+    return False
+
+def compact_history(db):
+    """Downsample old price history and apply retention"""
+    result = db.compact_price_history()
+    if result is None:
+        return False
+
+    print(f"Compacted price history: {result}")
+    return True
+
+def archive_orders(db, older_than_days):
+    """Move old fulfilled orders into monthly archive databases"""
+    archived = db.archive_fulfilled_orders(older_than_days)
+    if archived is None:
+        return False
+
+    print(f"Archived {archived} fulfilled orders")
+    for month, path in db.list_archives():
+        print(f"  {month}: {path}")
+    return True
+
+def snapshot(db):
+    """Refresh the read-only reporting snapshot"""
+    if not db.take_snapshot():
+        return False
+
+    print(f"Reporting snapshot written to {db.snapshot_path}")
+    return True
+
+def snapshot_status(db, max_age):
+    """Report the age of the reporting snapshot, failing if it is stale"""
+    age = db.snapshot_age()
+    if age is None:
+        print(f"No reporting snapshot at {db.snapshot_path}")
+        return False
+
+    print(f"Reporting snapshot is {age:.0f}s old")
+    return not db.snapshot_is_stale(max_age)
+
+def prune_changes(db, retention_days):
+    """Delete change log entries past their retention window"""
+    deleted = db.prune_change_log(retention_days)
+    if deleted is None:
+        return False
+
+    print(f"Pruned {deleted} change log entries")
+    return True
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Amazon to eBay Arbitrage System database maintenance')
+    parser.add_argument('--db', help='Path to the SQLite database (defaults to DATABASE_CONFIG)')
+    parser.add_argument('--archive-dir', help='Monthly order archive directory (defaults to one beside the database)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('check-plans', help='Fail if a hot query does a full table scan')
+    subparsers.add_parser('backfill-rollup', help='Rebuild the daily profit rollup from raw rows')
+    subparsers.add_parser('check-rollup', help='Fail if the daily profit rollup disagrees with raw rows')
+    subparsers.add_parser('compact-history', help='Downsample old price history into hourly/daily buckets')
+    archive = subparsers.add_parser('archive', help='Move old fulfilled orders into monthly archive databases')
+    archive.add_argument('--older-than-days', type=int, default=None,
+                         help='Archive orders fulfilled longer ago than this (defaults to ARCHIVE_CONFIG)')
+    subparsers.add_parser('snapshot', help='Refresh the read-only reporting snapshot')
+    status = subparsers.add_parser('snapshot-status', help='Fail if the reporting snapshot is missing or stale')
+    status.add_argument('--max-age', type=float, default=None,
+                        help='Maximum snapshot age in seconds (defaults to SNAPSHOT_CONFIG)')
+    prune = subparsers.add_parser('prune-changes', help='Delete change log entries past their retention window')
+    prune.add_argument('--retention-days', type=int, default=None,
+                       help='Days of change log to keep (defaults to CHANGE_LOG_CONFIG)')
+
+    return parser.parse_args()
+
+def main():
+    """Run the requested maintenance command"""
+    args = parse_arguments()
+
+    db = ArbitrageDatabase(args.db, archive_dir=args.archive_dir)
+    if not db.connect() or not db.setup_database():
+        return 1
+
+    try:
+        if args.command == 'check-plans':
+            ok = check_plans(db)
+        elif args.command == 'backfill-rollup':
+            ok = backfill_rollup(db)
+        elif args.command == 'check-rollup':
+            ok = check_rollup(db)
+        elif args.command == 'compact-history':
+            ok = compact_history(db)
+        elif args.command == 'archive':
+            ok = archive_orders(db, args.older_than_days)
+        elif args.command == 'snapshot':
+            ok = snapshot(db)
+        elif args.command == 'snapshot-status':
+            ok = snapshot_status(db, args.max_age)
+        elif args.command == 'prune-changes':
+            ok = prune_changes(db, args.retention_days)
+    finally:
+        db.close()
+
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
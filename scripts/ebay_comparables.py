@@ -0,0 +1,233 @@
+"""
+eBay comparables engine for Amazon to eBay Arbitrage System
+
+Estimates what a product sells for on eBay from sold and active listings
+that match its UPC or normalized title.
+"""
+
+import logging
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import EBAY_CONFIG, EBAY_COMPARABLES_CONFIG
+from rate_limiter import TokenBucket
+from api_cache import ResponseCache
+from title_index import title_tokens
+
+logger = logging.getLogger(__name__)
+
+def normalize_title(title, max_tokens=None):
+    """Canonical search keywords for a title
+
+    Keeps the first max_tokens distinct tokens in their original order, which
+    is where brand and model usually are.
+    """
+    if max_tokens is None:
+        max_tokens = EBAY_COMPARABLES_CONFIG['max_query_tokens']
+    return ' '.join(list(dict.fromkeys(title_tokens(title)))[:max_tokens])
+
+def title_similarity(a_tokens, b_tokens):
+    """Jaccard similarity of two token collections"""
+    a, b = set(a_tokens), set(b_tokens)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def trimmed_median(values, trim=0.2):
+    """Median after dropping the lowest and highest trim fraction of values"""
+    values = sorted(values)
+    cut = int(len(values) * trim)
+    if cut and len(values) - 2 * cut > 0:
+        values = values[cut:len(values) - cut]
+    return statistics.median(values)
+
+class FindingApiBackend:
+    """Comparable listings from the eBay Finding API
+
+    All requests share one pooled HTTP session and one rate limiter, and
+    at most pool_size are in flight at once however many threads call in,
+    so concurrent lookups never overflow the connection pool. The endpoint
+    comes from EBAY_COMPARABLES_CONFIG, so it can point at a local stand-in
+    server.
+    """
+
+    def __init__(self, endpoint=None, app_id=None, pool_size=None, timeout=None, rate_limiter=None):
+        """Create the pooled session"""
+        self.endpoint = endpoint or EBAY_COMPARABLES_CONFIG['endpoint']
+        self.app_id = app_id or EBAY_CONFIG['app_id']
+        self.timeout = timeout or EBAY_COMPARABLES_CONFIG['timeout']
+        self.rate_limiter = rate_limiter or TokenBucket(EBAY_COMPARABLES_CONFIG['requests_per_second'])
+
+        pool_size = pool_size or EBAY_COMPARABLES_CONFIG['pool_size']
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def search(self, keywords=None, upc=None, sold=True, limit=50):
+        """Return [{'title', 'price'}] for sold (completed) or active listings
+
+        Prices include the listed shipping cost. Matches by UPC when one is
+        given, otherwise by keywords.
+        """
+        if upc:
+            params = {'productId.@type': 'UPC', 'productId': upc}
+        else:
+            params = {'keywords': keywords}
+
+        filters = [('Condition', 'New'), ('ListingType', 'FixedPrice')]
+        if sold:
+            operation = 'findCompletedItems'
+            filters.append(('SoldItemsOnly', 'true'))
+        else:
+            operation = 'findItemsByProduct' if upc else 'findItemsAdvanced'
+
+        params.update({
+            'OPERATION-NAME': operation,
+            'SERVICE-VERSION': '1.13.0',
+            'SECURITY-APPNAME': self.app_id,
+            'RESPONSE-DATA-FORMAT': 'JSON',
+            'GLOBAL-ID': EBAY_COMPARABLES_CONFIG['global_id'],
+            'paginationInput.entriesPerPage': limit
+        })
+        for i, (name, value) in enumerate(filters):
+            params[f'itemFilter({i}).name'] = name
+            params[f'itemFilter({i}).value'] = value
+
+        self.rate_limiter.acquire()
+        with self._slots:
+            response = self.session.get(self.endpoint, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        return self._parse(data, operation)
+
+    def _parse(self, data, operation):
+        """Pull title and total price out of a Finding API JSON response"""
+        listings = []
+        try:
+            result = data[f'{operation}Response'][0]['searchResult'][0]
+        except (KeyError, IndexError, TypeError):
+            return listings
+
+        for item in result.get('item', []):
+            try:
+                price = float(item['sellingStatus'][0]['currentPrice'][0]['__value__'])
+                shipping = item.get('shippingInfo', [{}])[0].get('shippingServiceCost', [{'__value__': 0}])
+                price += float(shipping[0]['__value__'])
+                listings.append({'title': item['title'][0], 'price': price})
+            except (KeyError, IndexError, TypeError, ValueError):
+                continue
+
+        return listings
+
+class EbayComparables:
+    """Robust eBay price estimates from comparable listings
+
+    For each product the backend is queried for sold listings (and active
+    ones when too few sold), the nearest comps by title similarity are kept,
+    and their trimmed median price is the estimate. Backend results are
+    cached per normalized query. Any object with the FindingApiBackend
+    search() signature can serve as the backend.
+    """
+
+    def __init__(self, backend=None, cache=None):
+        """Initialize the engine with a backend and a comps cache"""
+        self.backend = backend or FindingApiBackend()
+        if cache is None:
+            cache = ResponseCache(
+                path=EBAY_COMPARABLES_CONFIG['cache_file'],
+                ttls={},
+                default_ttl=EBAY_COMPARABLES_CONFIG['cache_ttl'],
+                stale_while_revalidate=0
+            )
+        self.cache = cache
+
+    def _listings(self, keywords, upc, sold):
+        """Backend listings for a query, through the cache"""
+        query = {'keywords': keywords, 'upc': upc, 'sold': sold}
+        limit = EBAY_COMPARABLES_CONFIG['entries_per_query']
+        fetch = lambda: self.backend.search(keywords=keywords, upc=upc, sold=sold, limit=limit)
+
+        if self.cache is None:
+            return fetch()
+        return self.cache.get_or_fetch('ebay_comparables', query, fetch)
+
+    def estimate(self, title, upc=None):
+        """Estimate the eBay price for a product, or None without enough comps
+
+        Returns a dict with price, comps (the number used) and source
+        ('sold' or 'sold+active').
+        """
+        keywords = normalize_title(title)
+        if not keywords and not upc:
+            return None
+
+        tokens = title_tokens(title)
+        min_comps = EBAY_COMPARABLES_CONFIG['min_comps']
+
+        # A UPC match is the same product whatever its listing title says
+        min_similarity = 0.0 if upc else EBAY_COMPARABLES_CONFIG['min_similarity']
+
+        comps = self._nearest(tokens, self._listings(keywords, upc, sold=True), min_similarity)
+        source = 'sold'
+        if len(comps) < min_comps:
+            comps += self._nearest(tokens, self._listings(keywords, upc, sold=False), min_similarity)
+            comps = sorted(comps, reverse=True)[:EBAY_COMPARABLES_CONFIG['nearest']]
+            source = 'sold+active'
+
+        if len(comps) < min_comps:
+            return None
+
+        prices = [price for _, price in comps]
+        return {
+            'price': round(trimmed_median(prices, EBAY_COMPARABLES_CONFIG['trim']), 2),
+            'comps': len(prices),
+            'source': source
+        }
+
+    def _nearest(self, tokens, listings, min_similarity):
+        """The most similar listings as (similarity, price), best first"""
+        scored = [
+            (title_similarity(tokens, title_tokens(listing['title'])), listing['price'])
+            for listing in listings
+        ]
+        scored = [s for s in scored if s[0] >= min_similarity]
+        return sorted(scored, reverse=True)[:EBAY_COMPARABLES_CONFIG['nearest']]
+
+    def estimate_prices(self, products, max_workers=None):
+        """Estimate eBay prices for many products concurrently
+
+        Products sharing a UPC or normalized title are looked up once.
+        Returns a dict of ASIN to estimated price, None where there were not
+        enough comps or the lookup failed.
+        """
+        if max_workers is None:
+            max_workers = EBAY_COMPARABLES_CONFIG['max_workers']
+
+        queries = {}
+        for product in products:
+            key = product.upc or normalize_title(product.title)
+            queries.setdefault(key, (product.title, product.upc))
+
+        def lookup(query):
+            title, upc = query
+            try:
+                result = self.estimate(title, upc)
+                return result['price'] if result else None
+            except Exception as e:
+                logger.warning(f"Comparables lookup failed for '{title}': {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queries) or 1)),
+                                thread_name_prefix='EbayComps') as executor:
+            estimates = dict(zip(queries, executor.map(lookup, queries.values())))
+
+        return {
+            product.asin: estimates[product.upc or normalize_title(product.title)]
+            for product in products
+        }
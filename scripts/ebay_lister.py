@@ -9,7 +9,10 @@ import json
 from datetime import datetime, timedelta
 from ebaysdk.trading import Connection as Trading
 from ebaysdk.exception import ConnectionError
-from config import EBAY_CONFIG, EBAY_LISTING_CONFIG
+from config import EBAY_CONFIG, EBAY_LISTING_CONFIG, TITLE_INDEX_CONFIG, REPRICING_POLICY_CONFIG
+from title_index import TitleIndex
+from fees import round_to_price_point
+from repricing_policy import RepricingPolicy
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +29,9 @@ class EbayLister:
         # Initialize eBay API connection
         self.api = self._initialize_ebay_api()
         
+        # Decides which listing prices are worth revising
+        self.repricing_policy = RepricingPolicy(db)
+        
         # Template for eBay listing description
         self.description_template = """
         <div style="font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto;">
@@ -78,7 +84,12 @@ class EbayLister:
             return None
             
     def list_products(self, limit=10):
-        """List unlisted products on eBay"""
+        """List up to limit unlisted products on eBay
+        
+        Near-duplicates of listed products are marked as such and skipped,
+        so they stop holding the top of the unlisted queue. At most limit
+        listings are attempted per run.
+        """
         if not self.api:
             logger.error("eBay API connection not available")
             return False
@@ -88,35 +99,50 @@ class EbayLister:
             return False
             
         try:
-            # Get unlisted products from database
-            unlisted_products = self.db.get_unlisted_products(limit)
-            logger.info(f"Found {len(unlisted_products)} unlisted products")
+            # Titles of everything already listed, to suppress near-duplicate listings
+            listed_titles = TitleIndex.from_database(self.db, listed_only=True)
+            attempted = 0
+            listed = 0
             
-            for product in unlisted_products:
-                product_id, asin, title, amazon_price, ebay_price, profit_margin, category, image_url, description = product
-                
-                # Create eBay listing
+            # Page through unlisted products, best margin first, until enough are attempted
+            for product in self.db.iter_unlisted_products():
+                if attempted >= limit:
+                    break
+                    
+                duplicates = listed_titles.query(product.title, k=1, min_similarity=TITLE_INDEX_CONFIG['duplicate_threshold'])
+                if duplicates:
+                    logger.info(f"Skipping product {product.asin}: near-duplicate of listed product {duplicates[0][0]} "
+                                f"(similarity {duplicates[0][1]:.2f})")
+                    self.db.mark_duplicate(product.id, duplicates[0][0])
+                    continue
+                    
+                # Create eBay listing at the price point revisions would use
+                price = float(round_to_price_point(product.ebay_price, REPRICING_POLICY_CONFIG['price_point_endings']))
+                attempted += 1
                 item_id = self._create_ebay_listing(
-                    title=title,
-                    description=description,
-                    price=ebay_price,
-                    image_url=image_url,
-                    category=category
+                    title=product.title,
+                    description=product.description,
+                    price=price,
+                    image_url=product.image_url,
+                    category=product.category
                 )
                 
                 if item_id:
                     # Update product as listed in database
                     self.db.update_product_listed_status(
-                        product_id=product_id,
+                        product_id=product.id,
                         ebay_item_id=item_id,
-                        listing_title=title,
-                        price=ebay_price
+                        listing_title=product.title,
+                        price=price
                     )
-                    logger.info(f"Successfully listed product {asin} on eBay with item ID {item_id}")
+                    listed_titles.add(product.id, product.title)
+                    listed += 1
+                    logger.info(f"Successfully listed product {product.asin} on eBay with item ID {item_id}")
                     
                     # Avoid rate limiting
                     time.sleep(random.uniform(1, 3))
                     
+            logger.info(f"Listed {listed} products on eBay")
             return True
             
         except Exception as e:
@@ -225,7 +251,12 @@ class EbayLister:
         return default_category
         
     def update_listings(self):
-        """Update existing eBay listings with current prices"""
+        """Revise eBay listing prices the repricing policy queues
+        
+        Small moves, recently revised listings and anything past the daily
+        revision budget wait for a later run; listings selling at a loss go
+        first.
+        """
         if not self.api:
             logger.error("eBay API connection not available")
             return False
@@ -235,37 +266,21 @@ class EbayLister:
             return False
             
         try:
-            # Get active eBay listings from database
-            self.db.cursor.execute('''
-            SELECT e.ebay_item_id, e.current_price, p.ebay_price
-            FROM ebay_listings e
-            JOIN products p ON e.product_id = p.id
-            WHERE e.status = 'active' AND p.ebay_price != e.current_price
-            ''')
-            
-            listings = self.db.cursor.fetchall()
-            logger.info(f"Found {len(listings)} listings that need price updates")
-            
-            for listing in listings:
-                ebay_item_id, current_price, new_price = listing
-                
+            updated = 0
+            for ebay_item_id, current_price, new_price in self.repricing_policy.plan():
                 # Update eBay listing price
                 success = self._update_listing_price(ebay_item_id, new_price)
                 
                 if success:
-                    # Update price in database
-                    self.db.cursor.execute('''
-                    UPDATE ebay_listings
-                    SET current_price = ?, last_updated = CURRENT_TIMESTAMP
-                    WHERE ebay_item_id = ?
-                    ''', (new_price, ebay_item_id))
-                    
-                    self.db.conn.commit()
+                    # Update price in database and count it against the budget
+                    self.db.record_listing_revision(ebay_item_id, current_price, new_price)
+                    updated += 1
                     logger.info(f"Updated price for eBay item {ebay_item_id} from ${current_price} to ${new_price}")
                     
                     # Avoid rate limiting
                     time.sleep(random.uniform(1, 3))
                     
+            logger.info(f"Updated prices for {updated} eBay listings")
             return True
             
         except Exception as e:
@@ -0,0 +1,73 @@
+"""
+Fee model for Amazon to eBay Arbitrage System
+
+Every function works on plain floats and on NumPy arrays or pandas columns
+alike, so per-product and batch code share exactly the same arithmetic.
+"""
+
+import numpy as np
+
+from config import FEE_CONFIG
+
+def ebay_fees(ebay_price, fees=None, fee_rate=None):
+    """eBay final value fee for a sale at ebay_price
+
+    fee_rate defaults to the flat eBay rate and may be an array of
+    per-category rates from category_fee_rates.
+    """
+    fees = fees or FEE_CONFIG
+    if fee_rate is None:
+        fee_rate = fees['ebay_fee_rate']
+    return ebay_price * fee_rate
+
+def paypal_fees(ebay_price, fees=None):
+    """Payment processing fee for a sale at ebay_price"""
+    fees = fees or FEE_CONFIG
+    return ebay_price * fees['paypal_fee_rate'] + fees['paypal_fixed_fee']
+
+def total_costs(amazon_price, ebay_price, fees=None, fee_rate=None):
+    """Everything a sale costs: the Amazon purchase, fees and shipping"""
+    fees = fees or FEE_CONFIG
+    return (amazon_price + ebay_fees(ebay_price, fees, fee_rate) + paypal_fees(ebay_price, fees) +
+            fees['shipping_cost'])
+
+def net_profit(amazon_price, ebay_price, fees=None, fee_rate=None):
+    """Profit left from selling at ebay_price after buying at amazon_price"""
+    return ebay_price - total_costs(amazon_price, ebay_price, fees, fee_rate)
+
+def estimated_ebay_price(amazon_price, fees=None):
+    """Placeholder eBay price used when no market data is available"""
+    fees = fees or FEE_CONFIG
+    return amazon_price * fees['ebay_price_multiplier']
+
+def category_fee_rates(categories, fees=None):
+    """eBay final value fee rate for each category, as an array
+
+    Categories without an entry in category_fee_rates pay ebay_fee_rate.
+    """
+    fees = fees or FEE_CONFIG
+    by_category = fees.get('category_fee_rates', {})
+    default = fees['ebay_fee_rate']
+    return np.fromiter((by_category.get(c, default) for c in categories), dtype=float, count=len(categories))
+
+def target_price(amazon_price, markup, fee_rate=None, fees=None):
+    """eBay price that leaves markup x amazon_price after fees and shipping
+
+    Solves p - amazon - fee_rate * p - (paypal_rate * p + paypal_fixed) - shipping
+    = markup * amazon for p. fee_rate defaults to the flat eBay rate and
+    may be an array of per-category rates.
+    """
+    fees = fees or FEE_CONFIG
+    if fee_rate is None:
+        fee_rate = fees['ebay_fee_rate']
+    return ((amazon_price * (1 + markup) + fees['paypal_fixed_fee'] + fees['shipping_cost']) /
+            (1 - fee_rate - fees['paypal_fee_rate']))
+
+def round_to_price_point(price, endings):
+    """Smallest price at or above price whose cents are one of endings
+
+    Rounding up keeps the markup intact.
+    """
+    cents = np.ceil(np.round(np.asarray(price, dtype=float) * 100, 4))
+    candidates = [np.ceil((cents - e) / 100) * 100 + e for e in np.round(np.asarray(endings) * 100)]
+    return np.minimum.reduce(candidates) / 100
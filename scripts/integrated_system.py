@@ -10,13 +10,11 @@ import json
 import os
 from datetime import datetime
 
+from startup import PROFILER, lazy_component, built, deferred
 from logger import setup_logger
 from database import ArbitrageDatabase
-from product_finder import ProductFinder
-from price_calculator import PriceCalculator
-from ebay_lister import EbayLister
-from order_fulfiller import OrderFulfiller
 from error_handler import ErrorHandler
+from config import PRICE_HISTORY_CONFIG, ARCHIVE_CONFIG, SNAPSHOT_CONFIG, CHANGE_LOG_CONFIG, REFRESH_CONFIG
 
 logger = setup_logger()
 
@@ -167,39 +165,68 @@ class IntegratedArbitrageSystem:
         self.db.connect()
         self.db.setup_database()
         
-        # Initialize components
-        self.product_finder = ProductFinder(self.db)
-        self.price_calculator = PriceCalculator(self.db)
-        self.ebay_lister = EbayLister(self.db)
-        self.order_fulfiller = OrderFulfiller(self.db)
+        # Components are built on first use (see the lazy_component
+        # properties below), so startup does not pay for their imports,
+        # API clients or browser
         
         # Initialize task scheduler
         self.scheduler = TaskScheduler(self.error_handler)
         
-        # Set Amazon credentials if provided
-        if self.config.get('amazon_credentials'):
-            creds = self.config['amazon_credentials']
-            self.order_fulfiller.set_amazon_credentials(
-                creds.get('email'),
-                creds.get('password')
-            )
-            
         # System state
         self.running = False
         
         logger.info("Integrated Amazon to eBay Arbitrage System initialized")
         
+    @lazy_component
+    def product_finder(self):
+        """Product finder, with its PA-API client"""
+        from product_finder import ProductFinder
+        return ProductFinder(self.db)
+        
+    @lazy_component
+    def refresh_planner(self):
+        """Adaptive refresh planner for tracked products' prices"""
+        from refresh_planner import RefreshPlanner
+        return RefreshPlanner(self.db, self.product_finder)
+        
+    @lazy_component
+    def price_calculator(self):
+        """Price calculator"""
+        from price_calculator import PriceCalculator
+        return PriceCalculator(self.db)
+        
+    @lazy_component
+    def ebay_lister(self):
+        """eBay lister, with its Trading API connection"""
+        from ebay_lister import EbayLister
+        return EbayLister(self.db)
+        
+    @lazy_component
+    def order_fulfiller(self):
+        """Order fulfiller, with its headless browser and configured Amazon credentials"""
+        from order_fulfiller import OrderFulfiller
+        fulfiller = OrderFulfiller(self.db)
+        creds = self.config.get('amazon_credentials')
+        if creds:
+            fulfiller.set_amazon_credentials(creds.get('email'), creds.get('password'))
+        return fulfiller
+        
     def _load_config(self, config_file):
         """Load configuration from file"""
         config = {
             'task_intervals': {
                 'find_products': 720,  # 12 hours
+                'refresh_prices': REFRESH_CONFIG['interval'],
                 'update_prices': 240,  # 4 hours
                 'list_products': 120,  # 2 hours
                 'update_listings': 120,  # 2 hours
                 'check_orders': 15,    # 15 minutes
                 'process_orders': 30,   # 30 minutes
-                'update_tracking': 360  # 6 hours
+                'update_tracking': 360,  # 6 hours
+                'compact_price_history': PRICE_HISTORY_CONFIG['compaction_interval'],
+                'archive_orders': ARCHIVE_CONFIG['archive_interval'],
+                'take_snapshot': SNAPSHOT_CONFIG['interval'],
+                'prune_change_log': CHANGE_LOG_CONFIG['prune_interval']
             },
             'amazon_credentials': {
                 'email': None,
@@ -228,69 +255,115 @@ class IntegratedArbitrageSystem:
         return config
         
     def setup_tasks(self):
-        """Set up scheduled tasks"""
+        """Set up scheduled tasks
+        
+        Component tasks are registered through deferred(), or through
+        methods that reach components via their lazy attributes, so each
+        component is built by the first run of one of its tasks.
+        """
         intervals = self.config['task_intervals']
         
         # Add tasks to scheduler
         self.scheduler.add_task(
             'find_products',
-            self.product_finder.find_products,
+            self.find_products,
             intervals['find_products']
         )
         
+        self.scheduler.add_task(
+            'refresh_prices',
+            self.refresh_prices,
+            intervals['refresh_prices']
+        )
+        
         self.scheduler.add_task(
             'update_prices',
-            self.price_calculator.update_prices,
+            deferred(self, 'price_calculator', 'update_prices'),
             intervals['update_prices']
         )
         
         self.scheduler.add_task(
             'list_products',
-            self.ebay_lister.list_products,
+            deferred(self, 'ebay_lister', 'list_products'),
             intervals['list_products'],
             kwargs={'limit': 20}
         )
         
         self.scheduler.add_task(
             'update_listings',
-            self.ebay_lister.update_listings,
+            deferred(self, 'ebay_lister', 'update_listings'),
             intervals['update_listings']
         )
         
         self.scheduler.add_task(
             'check_orders',
-            self.ebay_lister.process_new_orders,
+            deferred(self, 'ebay_lister', 'process_new_orders'),
             intervals['check_orders']
         )
         
         self.scheduler.add_task(
             'process_orders',
-            self.order_fulfiller.process_orders,
+            deferred(self, 'order_fulfiller', 'process_orders'),
             intervals['process_orders']
         )
         
         self.scheduler.add_task(
             'update_tracking',
-            self.order_fulfiller.update_tracking_numbers,
+            deferred(self, 'order_fulfiller', 'update_tracking_numbers'),
             intervals['update_tracking']
         )
         
+        self.scheduler.add_task(
+            'compact_price_history',
+            self.db.compact_price_history,
+            intervals['compact_price_history']
+        )
+        
+        self.scheduler.add_task(
+            'archive_orders',
+            self.db.archive_fulfilled_orders,
+            intervals['archive_orders']
+        )
+        
+        self.scheduler.add_task(
+            'take_snapshot',
+            self.db.take_snapshot,
+            intervals['take_snapshot']
+        )
+        
+        self.scheduler.add_task(
+            'prune_change_log',
+            self.db.prune_change_log,
+            intervals['prune_change_log']
+        )
+        
         logger.info("Scheduled tasks set up")
         
+    def find_products(self):
+        """Run product discovery, repricing straight away if known products changed price"""
+        return self.price_calculator.reprice_changed(self.product_finder.find_products())
+        
+    def refresh_prices(self):
+        """Refresh due product prices, repricing straight away if any changed"""
+        return self.price_calculator.reprice_changed(self.refresh_planner.refresh_due())
+        
     def start(self):
-        """Start the integrated arbitrage system"""
+        """Start the integrated arbitrage system
+        
+        The Amazon login happens when orders are first processed, which is
+        also when the browser is started.
+        """
         logger.info("Starting Integrated Amazon to eBay Arbitrage System")
         self.running = True
         
-        # Login to Amazon if credentials are set
-        if self.order_fulfiller.amazon_email and self.order_fulfiller.amazon_password:
-            self.order_fulfiller.login_to_amazon()
-        
         # Set up tasks
         self.setup_tasks()
         
         # Start task scheduler
         self.scheduler.start(num_workers=self.config.get('num_workers', 3))
+        PROFILER.mark('scheduler started')
+        if PROFILER.enabled:
+            logger.info(PROFILER.report())
         
         try:
             # Keep main thread alive
@@ -311,9 +384,10 @@ class IntegratedArbitrageSystem:
         # Stop task scheduler
         self.scheduler.stop()
         
-        # Close browser
-        if self.order_fulfiller:
-            self.order_fulfiller.close()
+        # Close browser, if one was ever started
+        order_fulfiller = built(self, 'order_fulfiller')
+        if order_fulfiller:
+            order_fulfiller.close()
         
         # Close database connection
         if self.db:
@@ -329,46 +403,20 @@ class IntegratedArbitrageSystem:
             return None
             
         try:
-            # Get profit data from database
-            self.db.cursor.execute('''
-            SELECT 
-                date(pt.date) as day,
-                COUNT(pt.id) as order_count,
-                SUM(pt.amazon_cost) as total_cost,
-                SUM(pt.ebay_revenue) as total_revenue,
-                SUM(pt.ebay_fees) as total_ebay_fees,
-                SUM(pt.paypal_fees) as total_paypal_fees,
-                SUM(pt.net_profit) as total_profit
-            FROM profit_tracking pt
-            WHERE pt.date >= date('now', ?)
-            GROUP BY day
-            ORDER BY day DESC
-            ''', (f'-{days} days',))
-            
-            daily_profits = self.db.cursor.fetchall()
-            
-            # Calculate totals
-            self.db.cursor.execute('''
-            SELECT 
-                COUNT(pt.id) as order_count,
-                SUM(pt.amazon_cost) as total_cost,
-                SUM(pt.ebay_revenue) as total_revenue,
-                SUM(pt.ebay_fees) as total_ebay_fees,
-                SUM(pt.paypal_fees) as total_paypal_fees,
-                SUM(pt.net_profit) as total_profit
-            FROM profit_tracking pt
-            WHERE pt.date >= date('now', ?)
-            ''', (f'-{days} days',))
-            
-            totals = self.db.cursor.fetchone()
+            # Get pre-aggregated profit data from the daily rollup
+            result = self.db.get_profit_report(days)
+            if result is None:
+                return None
+                
+            daily_profits, totals = result
+            order_count, total_cost, total_revenue, total_ebay_fees, total_paypal_fees, total_profit = totals
             
             # Format report
             report = f"Profit Report for Last {days} Days\n"
             report += "=" * 80 + "\n\n"
             
-            if totals:
-                order_count, total_cost, total_revenue, total_ebay_fees, total_paypal_fees, total_profit = totals
-                
+            # Totals always come back as one row, zeroed when there were no orders
+            if order_count > 0:
                 report += f"Total Orders: {order_count or 0}\n"
                 report += f"Total Cost: ${total_cost or 0:.2f}\n"
                 report += f"Total Revenue: ${total_revenue or 0:.2f}\n"
@@ -9,14 +9,12 @@ import os
 import sys
 from datetime import datetime, timedelta
 
-# Import modules
+# Import modules; component modules are imported when first used
+from startup import PROFILER, lazy_component, built
 from logger import setup_logger
 from database import ArbitrageDatabase
-from product_finder import ProductFinder
-from price_calculator import PriceCalculator
-from ebay_lister import EbayLister
-from order_fulfiller import OrderFulfiller
-from config import ORDER_FULFILLMENT_CONFIG
+from config import (ORDER_FULFILLMENT_CONFIG, PRICE_HISTORY_CONFIG, ARCHIVE_CONFIG, SNAPSHOT_CONFIG,
+                    CHANGE_LOG_CONFIG, REFRESH_CONFIG)
 
 # Set up logger
 logger = setup_logger()
@@ -33,35 +31,72 @@ class ArbitrageSystem:
         self.db.connect()
         self.db.setup_database()
         
-        # Initialize components
-        self.product_finder = ProductFinder(self.db)
-        self.price_calculator = PriceCalculator(self.db)
-        self.ebay_lister = EbayLister(self.db)
-        self.order_fulfiller = OrderFulfiller(self.db)
-        
-        # Set Amazon credentials if provided
-        if amazon_email and amazon_password:
-            self.order_fulfiller.set_amazon_credentials(amazon_email, amazon_password)
+        # Components are built on first use; the order fulfiller picks up
+        # these credentials when it is built
+        self.amazon_email = amazon_email
+        self.amazon_password = amazon_password
             
         # System state
         self.running = False
         self.last_product_search = None
+        self.last_price_refresh = None
         self.last_price_update = None
         self.last_listing_update = None
         self.last_order_check = None
         self.last_tracking_update = None
+        self.last_history_compaction = None
+        self.last_order_archive = None
+        self.last_snapshot = None
+        self.last_change_log_prune = None
         
         logger.info("Amazon to eBay Arbitrage System initialized")
         
+    @lazy_component
+    def product_finder(self):
+        """Product finder, with its PA-API client"""
+        from product_finder import ProductFinder
+        return ProductFinder(self.db)
+        
+    @lazy_component
+    def refresh_planner(self):
+        """Adaptive refresh planner for tracked products' prices"""
+        from refresh_planner import RefreshPlanner
+        return RefreshPlanner(self.db, self.product_finder)
+        
+    @lazy_component
+    def price_calculator(self):
+        """Price calculator"""
+        from price_calculator import PriceCalculator
+        return PriceCalculator(self.db)
+        
+    @lazy_component
+    def ebay_lister(self):
+        """eBay lister, with its Trading API connection"""
+        from ebay_lister import EbayLister
+        return EbayLister(self.db)
+        
+    @lazy_component
+    def order_fulfiller(self):
+        """Order fulfiller, with its headless browser"""
+        from order_fulfiller import OrderFulfiller
+        fulfiller = OrderFulfiller(self.db)
+        if self.amazon_email and self.amazon_password:
+            fulfiller.set_amazon_credentials(self.amazon_email, self.amazon_password)
+        return fulfiller
+        
     def start(self):
-        """Start the arbitrage system"""
+        """Start the arbitrage system
+        
+        The Amazon login happens when orders are first processed, which is
+        also when the browser is started.
+        """
         logger.info("Starting Amazon to eBay Arbitrage System")
         self.running = True
         
-        # Login to Amazon if credentials are set
-        if self.order_fulfiller.amazon_email and self.order_fulfiller.amazon_password:
-            self.order_fulfiller.login_to_amazon()
-        
+        PROFILER.mark('scheduler started')
+        if PROFILER.enabled:
+            print(PROFILER.report(), file=sys.stderr)
+            
         try:
             # Main loop
             while self.running:
@@ -79,12 +114,18 @@ class ArbitrageSystem:
         """Run a single cycle of the arbitrage system"""
         current_time = datetime.now()
         
-        # Find profitable products (every 12 hours)
+        # Find profitable products (every 12 hours), repricing if known ones moved
         if not self.last_product_search or (current_time - self.last_product_search) > timedelta(hours=12):
             logger.info("Running product finder")
-            self.product_finder.find_products()
+            self.price_calculator.reprice_changed(self.product_finder.find_products())
             self.last_product_search = current_time
             
+        # Re-check the tracked products whose prices are due for a look
+        if not self.last_price_refresh or (current_time - self.last_price_refresh) > timedelta(minutes=REFRESH_CONFIG['interval']):
+            logger.info("Refreshing due product prices")
+            self.price_calculator.reprice_changed(self.refresh_planner.refresh_due())
+            self.last_price_refresh = current_time
+            
         # Update prices (every 4 hours)
         if not self.last_price_update or (current_time - self.last_price_update) > timedelta(hours=4):
             logger.info("Running price calculator")
@@ -114,14 +155,39 @@ class ArbitrageSystem:
             logger.info("Updating tracking numbers")
             self.order_fulfiller.update_tracking_numbers()
             self.last_tracking_update = current_time
+            
+        # Downsample old price history
+        if not self.last_history_compaction or (current_time - self.last_history_compaction) > timedelta(minutes=PRICE_HISTORY_CONFIG['compaction_interval']):
+            logger.info("Compacting price history")
+            self.db.compact_price_history()
+            self.last_history_compaction = current_time
+            
+        # Move old fulfilled orders out of the hot database
+        if not self.last_order_archive or (current_time - self.last_order_archive) > timedelta(minutes=ARCHIVE_CONFIG['archive_interval']):
+            logger.info("Archiving fulfilled orders")
+            self.db.archive_fulfilled_orders()
+            self.last_order_archive = current_time
+            
+        # Refresh the read-only replica that reports run against
+        if not self.last_snapshot or (current_time - self.last_snapshot) > timedelta(minutes=SNAPSHOT_CONFIG['interval']):
+            logger.info("Taking reporting snapshot")
+            self.db.take_snapshot()
+            self.last_snapshot = current_time
+            
+        # Drop change log entries consumers have had time to read
+        if not self.last_change_log_prune or (current_time - self.last_change_log_prune) > timedelta(minutes=CHANGE_LOG_CONFIG['prune_interval']):
+            logger.info("Pruning change log")
+            self.db.prune_change_log()
+            self.last_change_log_prune = current_time
     
     def shutdown(self):
         """Shutdown the arbitrage system"""
         logger.info("Shutting down Amazon to eBay Arbitrage System")
         
-        # Close browser
-        if self.order_fulfiller:
-            self.order_fulfiller.close()
+        # Close browser, if one was ever started
+        order_fulfiller = built(self, 'order_fulfiller')
+        if order_fulfiller:
+            order_fulfiller.close()
         
         # Close database connection
         if self.db:
@@ -137,46 +203,20 @@ class ArbitrageSystem:
             return None
             
         try:
-            # Get profit data from database
-            self.db.cursor.execute('''
-            SELECT 
-                date(pt.date) as day,
-                COUNT(pt.id) as order_count,
-                SUM(pt.amazon_cost) as total_cost,
-                SUM(pt.ebay_revenue) as total_revenue,
-                SUM(pt.ebay_fees) as total_ebay_fees,
-                SUM(pt.paypal_fees) as total_paypal_fees,
-                SUM(pt.net_profit) as total_profit
-            FROM profit_tracking pt
-            WHERE pt.date >= date('now', ?)
-            GROUP BY day
-            ORDER BY day DESC
-            ''', (f'-{days} days',))
-            
-            daily_profits = self.db.cursor.fetchall()
-            
-            # Calculate totals
-            self.db.cursor.execute('''
-            SELECT 
-                COUNT(pt.id) as order_count,
-                SUM(pt.amazon_cost) as total_cost,
-                SUM(pt.ebay_revenue) as total_revenue,
-                SUM(pt.ebay_fees) as total_ebay_fees,
-                SUM(pt.paypal_fees) as total_paypal_fees,
-                SUM(pt.net_profit) as total_profit
-            FROM profit_tracking pt
-            WHERE pt.date >= date('now', ?)
-            ''', (f'-{days} days',))
-            
-            totals = self.db.cursor.fetchone()
+            # Get pre-aggregated profit data from the daily rollup
+            result = self.db.get_profit_report(days)
+            if result is None:
+                return None
+                
+            daily_profits, totals = result
+            order_count, total_cost, total_revenue, total_ebay_fees, total_paypal_fees, total_profit = totals
             
             # Format report
             report = f"Profit Report for Last {days} Days\n"
             report += "=" * 80 + "\n\n"
             
-            if totals:
-                order_count, total_cost, total_revenue, total_ebay_fees, total_paypal_fees, total_profit = totals
-                
+            # Totals always come back as one row, zeroed when there were no orders
+            if order_count > 0:
                 report += f"Total Orders: {order_count}\n"
                 report += f"Total Cost: ${total_cost:.2f}\n"
                 report += f"Total Revenue: ${total_revenue:.2f}\n"
@@ -215,6 +255,8 @@ def parse_arguments():
     parser.add_argument('--amazon-email', help='Amazon account email')
     parser.add_argument('--amazon-password', help='Amazon account password')
     parser.add_argument('--report', type=int, help='Generate profit report for specified number of days')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Print import and construction time breakdowns once the scheduler starts')
     
     return parser.parse_args()
 
@@ -223,10 +265,11 @@ if __name__ == "__main__":
     args = parse_arguments()
     
     # Create arbitrage system
-    system = ArbitrageSystem(
-        amazon_email=args.amazon_email,
-        amazon_password=args.amazon_password
-    )
+    with PROFILER.timed('ArbitrageSystem'):
+        system = ArbitrageSystem(
+            amazon_email=args.amazon_email,
+            amazon_password=args.amazon_password
+        )
     
     # Generate report if requested
     if args.report:
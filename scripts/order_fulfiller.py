@@ -138,12 +138,8 @@ class OrderFulfiller:
                 return False
                 
         try:
-            # Get pending orders from database
-            pending_orders = self.db.get_pending_orders()
-            logger.info(f"Found {len(pending_orders)} pending orders to process")
-            
-            # Process each order
-            for order in pending_orders:
+            # Page through pending orders from database
+            for order in self.db.iter_pending_orders():
                 order_id, ebay_order_id, ebay_item_id, buyer_name, shipping_address, asin, amazon_price = order
                 
                 # Purchase product on Amazon
@@ -0,0 +1,223 @@
+"""
+Streaming staged pipeline for Amazon to eBay Arbitrage System
+
+Stages run in their own worker threads and are connected by bounded
+queues, so a slow stage makes the ones before it wait instead of letting
+work pile up in memory, and I/O-bound stages overlap with each other.
+"""
+
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input; one is sent per downstream worker
+_DONE = object()
+
+class Stage:
+    """One step of a pipeline
+
+    func takes one input item, or a list of up to batch_size items when
+    batch_size is set, and returns an iterable of output items (empty to
+    drop, several to fan out). A batch is handed over early once no new
+    item has arrived for flush_interval seconds.
+    """
+
+    def __init__(self, name, func, workers=1, batch_size=None, flush_interval=1.0):
+        """Describe a stage; it runs once added to a Pipeline"""
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+class StageMetrics:
+    """Thread-safe throughput and queue-depth counters for one stage"""
+
+    def __init__(self, name, workers):
+        """Start all counters at zero"""
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.depth_max = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+        self._lock = threading.Lock()
+
+    def sample_depth(self, depth):
+        """Record the input queue depth seen by a worker"""
+        with self._lock:
+            self.depth_max = max(self.depth_max, depth)
+            self._depth_total += depth
+            self._depth_samples += 1
+
+    def record(self, items_in, items_out, busy, failed=False):
+        """Record one call of the stage function"""
+        with self._lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.busy += busy
+            self.errors += failed
+
+    def as_dict(self, elapsed):
+        """Counters plus rates over elapsed seconds of pipeline wall time"""
+        with self._lock:
+            return {
+                'stage': self.name,
+                'workers': self.workers,
+                'items_in': self.items_in,
+                'items_out': self.items_out,
+                'errors': self.errors,
+                'busy_seconds': round(self.busy, 3),
+                'items_per_second': round(self.items_in / elapsed, 1) if elapsed > 0 else 0.0,
+                'utilization': round(self.busy / (elapsed * self.workers), 3) if elapsed > 0 else 0.0,
+                'queue_depth_max': self.depth_max,
+                'queue_depth_avg': round(self._depth_total / self._depth_samples, 2) if self._depth_samples else 0.0
+            }
+
+class Pipeline:
+    """Runs stages concurrently over bounded queues
+
+    Each stage reads from a queue of queue_size items. Output of the last
+    stage is discarded, so it should be the one with side effects (saving,
+    for instance). A failing call is logged and counted, and its input
+    dropped; the pipeline keeps going. on_worker_exit, if given, is called
+    on each worker thread just before it ends, to release per-thread
+    resources such as database connections.
+    """
+
+    def __init__(self, stages, queue_size=8, on_worker_exit=None):
+        """Wire stages in order; run() starts them"""
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.on_worker_exit = on_worker_exit
+        self.metrics = [StageMetrics(stage.name, stage.workers) for stage in self.stages]
+        self._queues = []
+        self._started = None
+        self._finished = None
+
+    def run(self, source):
+        """Feed every item of source through the stages and wait for them to drain
+
+        Returns the per-stage metrics.
+        """
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._started = time.monotonic()
+        self._finished = None
+        threads = []
+
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for worker in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(index, remaining, lock),
+                    name=f"Pipeline-{stage.name}-{worker}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        try:
+            for item in source:
+                self._queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                self._queues[0].put(_DONE)
+
+            for thread in threads:
+                thread.join()
+            self._finished = time.monotonic()
+
+        return self.report()
+
+    def _worker(self, index, remaining, lock):
+        """Pull items for stage index until its input is done, then pass the end on"""
+        stage = self.stages[index]
+        metrics = self.metrics[index]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self.stages) else None
+
+        try:
+            if stage.batch_size:
+                self._run_batched(stage, metrics, inbox, outbox)
+            else:
+                while True:
+                    metrics.sample_depth(inbox.qsize())
+                    item = inbox.get()
+                    if item is _DONE:
+                        break
+                    self._call(stage, metrics, item, 1, outbox)
+        finally:
+            # The last worker of a stage to finish tells every downstream worker
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and outbox is not None:
+                for _ in range(self.stages[index + 1].workers):
+                    outbox.put(_DONE)
+
+            if self.on_worker_exit is not None:
+                try:
+                    self.on_worker_exit()
+                except Exception as e:
+                    logger.error(f"Error releasing {stage.name} worker resources: {e}")
+
+    def _run_batched(self, stage, metrics, inbox, outbox):
+        """Collect items into batches of batch_size and hand each to the stage"""
+        batch = []
+        while True:
+            metrics.sample_depth(inbox.qsize())
+            try:
+                item = inbox.get(timeout=stage.flush_interval if batch else None)
+            except queue.Empty:
+                self._call(stage, metrics, batch, len(batch), outbox)
+                batch = []
+                continue
+
+            if item is _DONE:
+                if batch:
+                    self._call(stage, metrics, batch, len(batch), outbox)
+                return
+
+            batch.append(item)
+            if len(batch) >= stage.batch_size:
+                self._call(stage, metrics, batch, len(batch), outbox)
+                batch = []
+
+    def _call(self, stage, metrics, item, count, outbox):
+        """Run the stage function on one input and forward its outputs"""
+        start = time.monotonic()
+        produced = 0
+        failed = False
+        try:
+            # Time spent blocked on a full outbox is backpressure, not work
+            for output in stage.func(item) or ():
+                produced += 1
+                if outbox is not None:
+                    blocked = time.monotonic()
+                    outbox.put(output)
+                    start += time.monotonic() - blocked
+        except Exception as e:
+            failed = True
+            logger.error(f"Pipeline stage {stage.name} failed: {e}")
+        metrics.record(count, produced, time.monotonic() - start, failed)
+
+    def report(self):
+        """Per-stage metrics so far, in stage order"""
+        if self._started is None:
+            return []
+        elapsed = (self._finished or time.monotonic()) - self._started
+        return [m.as_dict(elapsed) for m in self.metrics]
+
+    def queue_depths(self):
+        """Current number of items waiting in front of each stage"""
+        return {stage.name: q.qsize() for stage, q in zip(self.stages, self._queues)}
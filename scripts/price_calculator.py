@@ -0,0 +1,137 @@
+"""
+Price Calculator module for Amazon to eBay Arbitrage System
+
+Batch repricing engine: loads every active listing into NumPy arrays,
+computes each one's target eBay price from the fee model in one pass of
+vector operations, and writes back only the targets that changed.
+"""
+
+import time
+import logging
+
+import numpy as np
+
+import fees
+from config import EBAY_LISTING_CONFIG, FEE_CONFIG, REPRICING_CONFIG, REPRICING_POLICY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class PriceCalculator:
+    """Class for repricing eBay listings
+
+    A listing's target price is the product's market estimate from eBay
+    comparables, but never less than the floor: the eBay price that
+    still leaves markup_percentage of the Amazon cost after the category's
+    final value fee, payment fees and shipping, rounded up to a price
+    point. Targets are stored on the listing, so the discovery estimate on
+    the product is left alone.
+    Listings move to their targets through EbayLister.update_listings.
+    """
+
+    def __init__(self, db=None, fee_config=None, markup=None):
+        """Initialize the price calculator"""
+        logger.info("Initializing Price Calculator")
+        self.db = db
+        self.fee_config = fee_config or FEE_CONFIG
+        self.markup = EBAY_LISTING_CONFIG['markup_percentage'] if markup is None else markup
+        self.price_point_endings = REPRICING_POLICY_CONFIG['price_point_endings']
+        self.last_run = {}
+        logger.info("Price Calculator initialized")
+
+    def load_arrays(self, chunk_size=None):
+        """Load active listings as columns
+
+        Returns a dict of arrays: id (listing id), amazon_price, ebay_price
+        (the product's estimate), target_price (NaN where unset) and fee_rate.
+        """
+        chunk_size = chunk_size or REPRICING_CONFIG['chunk_size']
+        columns = {'id': [], 'amazon_price': [], 'ebay_price': [], 'target_price': [], 'fee_rate': []}
+
+        for chunk in self.db.iter_repricing_chunks(chunk_size):
+            ids, amazon, ebay, categories, target = zip(*chunk)
+            columns['id'].append(np.array(ids, dtype=np.int64))
+            columns['amazon_price'].append(np.array(amazon, dtype=float))
+            # None becomes NaN when the column is built as float
+            columns['ebay_price'].append(np.array(ebay, dtype=float))
+            columns['target_price'].append(np.array(target, dtype=float))
+            columns['fee_rate'].append(fees.category_fee_rates(categories, self.fee_config))
+
+        return {
+            name: np.concatenate(parts) if parts else np.empty(0, dtype=np.int64 if name == 'id' else float)
+            for name, parts in columns.items()
+        }
+
+    def compute_floors(self, arrays):
+        """Lowest eBay price in cents that keeps the markup, for every loaded listing"""
+        floor = fees.target_price(arrays['amazon_price'], self.markup, arrays['fee_rate'], self.fee_config)
+        # Round up so the markup is always met; the rounding absorbs float noise first
+        return np.ceil(np.round(floor * 100, 4)).astype(np.int64)
+
+    def compute_targets(self, arrays):
+        """Target eBay price in cents for every loaded listing"""
+        floor = self.compute_floors(arrays)
+        estimate = arrays['ebay_price']
+        estimate_cents = np.where(np.isnan(estimate), 0, np.round(np.nan_to_num(estimate) * 100)).astype(np.int64)
+        target = np.maximum(estimate_cents, floor) / 100
+        return np.round(fees.round_to_price_point(target, self.price_point_endings) * 100).astype(np.int64)
+
+    def update_prices(self):
+        """Recompute every active listing's target price and save the ones that changed
+
+        Returns the number of listings retargeted, or None on error.
+        """
+        if not self.db:
+            logger.error("Database connection not available")
+            return None
+
+        try:
+            start = time.perf_counter()
+            arrays = self.load_arrays()
+            loaded = time.perf_counter()
+
+            target_cents = self.compute_targets(arrays)
+            current = arrays['target_price']
+            current_cents = np.where(np.isnan(current), -1, np.round(np.nan_to_num(current) * 100)).astype(np.int64)
+            changed = np.flatnonzero(target_cents != current_cents)
+            computed = time.perf_counter()
+
+            updated = 0
+            if len(changed):
+                updated = self.db.save_listing_targets(zip(
+                    (target_cents[changed] / 100).tolist(),
+                    arrays['id'][changed].tolist()
+                ))
+                if updated is None:
+                    return None
+            written = time.perf_counter()
+
+            self.last_run = {
+                'listings': len(target_cents),
+                'retargeted': updated,
+                'load_seconds': round(loaded - start, 3),
+                'compute_seconds': round(computed - loaded, 3),
+                'write_seconds': round(written - computed, 3)
+            }
+            logger.info(
+                f"Retargeted {updated} of {len(target_cents)} listings "
+                f"in {written - start:.2f}s: load {loaded - start:.2f}s, compute {computed - loaded:.2f}s, "
+                f"write {written - computed:.2f}s"
+            )
+            return updated
+
+        except Exception as e:
+            logger.error(f"Error updating prices: {e}")
+            return None
+
+    def reprice_changed(self, changed_asins):
+        """Reprice straight away if discovery or a refresh saw known products change price
+
+        changed_asins is what ProductFinder.find_products or
+        RefreshPlanner.refresh_due returned. Returns the number of listings
+        retargeted, 0 when nothing changed, or None on error.
+        """
+        if not changed_asins:
+            return 0
+
+        logger.info(f"{len(changed_asins)} known products changed price, repricing now")
+        return self.update_prices()
@@ -0,0 +1,86 @@
+"""
+Product record for Amazon to eBay Arbitrage System
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+def to_cents(price):
+    """Dollar amount as integer cents, or None"""
+    if price is None:
+        return None
+    return int(round(price * 100))
+
+def to_dollars(cents):
+    """Integer cents as a dollar float, or None"""
+    if cents is None:
+        return None
+    return cents / 100
+
+@dataclass(slots=True)
+class Product:
+    """A product candidate or catalog row
+
+    Prices are held as integer cents so they compare and hash exactly;
+    amazon_price and ebay_price expose them as dollars for display and for
+    the REAL columns of the products table. Fields past description are
+    filled in as the product moves through scoring and the database.
+    """
+
+    asin: str
+    title: str
+    amazon_cents: int
+    ebay_cents: Optional[int] = None
+    category: str = 'Unknown'
+    image_url: str = ''
+    description: str = ''
+    upc: Optional[str] = None
+    profit_margin: Optional[float] = None
+    net_profit_cents: Optional[int] = None
+    id: Optional[int] = None
+
+    @property
+    def amazon_price(self):
+        """Amazon price in dollars"""
+        return to_dollars(self.amazon_cents)
+
+    @property
+    def ebay_price(self):
+        """eBay price in dollars, or None if not yet known"""
+        return to_dollars(self.ebay_cents)
+
+    @property
+    def net_profit(self):
+        """Net profit after fees in dollars, or None if not yet scored"""
+        return to_dollars(self.net_profit_cents)
+
+    def as_dict(self):
+        """Plain dict with prices in dollars, for JSON responses"""
+        return {
+            'asin': self.asin,
+            'title': self.title,
+            'amazon_price': self.amazon_price,
+            'ebay_price': self.ebay_price,
+            'net_profit': self.net_profit,
+            'profit_margin': self.profit_margin,
+            'category': self.category,
+            'image_url': self.image_url,
+            'description': self.description,
+            'upc': self.upc
+        }
+
+    @classmethod
+    def from_prices(cls, asin, title, amazon_price, ebay_price=None, **fields):
+        """Build a product from dollar prices"""
+        return cls(asin, title, to_cents(amazon_price), to_cents(ebay_price), **fields)
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a product from a products row of (id, asin, title, amazon_price,
+        ebay_price, profit_margin, category, image_url, description)"""
+        product_id, asin, title, amazon_price, ebay_price, profit_margin, category, image_url, description = row
+        return cls(
+            asin, title, to_cents(amazon_price), to_cents(ebay_price),
+            category=category, image_url=image_url, description=description,
+            profit_margin=profit_margin, id=product_id
+        )
@@ -3,12 +3,7 @@ Product Finder module for Amazon to eBay Arbitrage System
 """
 
 import logging
-import time
-import random
-from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from amazon.paapi5.api.get_items_request import GetItemsRequest
 from amazon.paapi5.api.get_items_resource import GetItemsResource
 from amazon.paapi5.api.partner_type import PartnerType
@@ -24,11 +19,33 @@ from amazon.paapi5.api.get_items_operation import GetItemsOperation
 from amazon.paapi5.api.partner_context import PartnerContext
 from amazon.paapi5.api.client import Client
 
-from config import AMAZON_CONFIG, PRODUCT_SEARCH_CONFIG
+from config import (AMAZON_CONFIG, PRODUCT_SEARCH_CONFIG, API_CACHE_CONFIG, ASIN_FILTER_CONFIG,
+                    EBAY_COMPARABLES_CONFIG, PIPELINE_CONFIG)
 from database import ArbitrageDatabase
+from rate_limiter import SharedTokenBucket
+from api_cache import ResponseCache
+from asin_filter import BloomFilter
+from scoring import filter_profitable
+from ebay_comparables import EbayComparables
+from product import Product, to_cents
+from pipeline import Pipeline, Stage
 
 logger = logging.getLogger(__name__)
 
+# The PA-API quota applies to the account, so every ProductFinder, worker
+# thread and process (the scheduler and the search daemon) draws from the
+# same tokens, kept in a file they all open
+AMAZON_RATE_LIMITER = SharedTokenBucket(
+    AMAZON_CONFIG['rate_limit_file'], AMAZON_CONFIG['requests_per_second'], AMAZON_CONFIG.get('burst', 1), name='paapi'
+)
+
+# Most item IDs PA-API accepts in one GetItems request
+GET_ITEMS_BATCH_SIZE = 10
+
+# SearchItems returns at most 10 items per page and serves at most 10 pages
+SEARCH_ITEMS_PAGE_SIZE = 10
+SEARCH_ITEMS_MAX_PAGES = 10
+
 class ProductFinder:
     """Class for finding profitable products on Amazon for eBay arbitrage"""
     
@@ -44,11 +61,67 @@ class ProductFinder:
         # Initialize Amazon API client
         self.amazon_client = self._initialize_amazon_client()
         
-        # Initialize eBay price checker (will be implemented separately)
-        self.ebay_price_checker = None
+        # Responses are cached on disk so repeat lookups skip the network
+        self.response_cache = ResponseCache() if API_CACHE_CONFIG.get('enabled', True) else None
+        
+        # eBay price estimates from comparable listings
+        self.ebay_price_checker = EbayComparables() if EBAY_COMPARABLES_CONFIG.get('enabled', True) else None
+        
+        # Per-page yield of the latest crawl of each category, and per-stage
+        # metrics of the latest discovery pipeline run
+        self.page_stats = {}
+        self.pipeline_metrics = []
+        self._exhausted_categories = set()
+        
+        # Membership filter over every ASIN in products, so items we already
+        # track can be dropped before extraction and scoring
+        self.known_asins = self._load_known_asins()
         
         logger.info("Product Finder initialized")
         
+    def _load_known_asins(self):
+        """Load the known-ASIN filter snapshot and catch it up with products"""
+        known = BloomFilter.load(ASIN_FILTER_CONFIG['snapshot_file'])
+        
+        # A saturated filter stops filtering, so start over with more room
+        if known is None or len(known) > known.capacity:
+            capacity = ASIN_FILTER_CONFIG['capacity']
+            if known is not None:
+                capacity = max(capacity, len(known) * 2)
+            known = BloomFilter(capacity, ASIN_FILTER_CONFIG['error_rate'])
+            
+        self._sync_known_asins(known)
+        logger.info(f"Known-ASIN filter holds {len(known)} ASINs")
+        return known
+        
+    def _sync_known_asins(self, known=None):
+        """Add products inserted since the filter's last sync and save its snapshot"""
+        known = known if known is not None else self.known_asins
+        last_id = known.meta.get('last_product_id', 0)
+        
+        for product_id, asin in self.db.iter_product_asins(last_id):
+            known.add(asin)
+            last_id = product_id
+            
+        known.meta['last_product_id'] = last_id
+        try:
+            known.save(ASIN_FILTER_CONFIG['snapshot_file'])
+        except OSError as e:
+            logger.warning(f"Could not save known-ASIN filter snapshot: {e}")
+            
+    def _drop_known_items(self, items):
+        """Drop search results for products we track that were checked recently
+        
+        The filter answers most lookups in memory; only its hits are checked
+        against the database, which also weeds out false positives.
+        """
+        maybe_known = [item.asin for item in items if item.asin and item.asin in self.known_asins]
+        if not maybe_known:
+            return items
+            
+        fresh = self.db.get_known_asins(maybe_known, fresh_within_hours=PRODUCT_SEARCH_CONFIG['price_refresh_hours'])
+        return [item for item in items if item.asin not in fresh]
+        
     def _initialize_amazon_client(self):
         """Initialize Amazon Product Advertising API client"""
         try:
@@ -69,33 +142,166 @@ class ProductFinder:
             return None
             
     def find_products(self):
-        """Main method to find profitable products"""
+        """Main method to find profitable products
+        
+        Runs discovery as a streaming pipeline: search pages, extract,
+        eBay comparables, score and save are separate stages joined by
+        bounded queues, so each page flows through while later pages are
+        still being fetched and memory stays flat however many categories
+        are crawled. Per-stage metrics are logged and kept in
+        self.pipeline_metrics.
+        
+        Returns the ASINs of already-known products whose prices changed,
+        which are the only ones that need repricing.
+        """
         logger.info("Starting product search")
+        categories = PRODUCT_SEARCH_CONFIG['categories_to_search']
+        changed_asins = []
         
-        # Search in each configured category
-        for category in PRODUCT_SEARCH_CONFIG['categories_to_search']:
-            try:
-                logger.info(f"Searching in category: {category}")
-                
-                # Search for products in the category
-                products = self._search_amazon_category(category)
-                
-                # Filter products based on profitability
-                profitable_products = self._filter_profitable_products(products)
-                
-                # Save profitable products to database
-                self._save_products_to_database(profitable_products)
+        self.page_stats = {category: [] for category in categories}
+        self._exhausted_categories = set()
+        
+        def save(products):
+            changed_asins.extend(self.save_products(products))
+            return ()
+            
+        # The shared rate limiter, not the worker count, bounds how fast
+        # requests reach Amazon
+        search_workers = 1
+        if PRODUCT_SEARCH_CONFIG.get('concurrent_search') and len(categories) > 1:
+            search_workers = min(PRODUCT_SEARCH_CONFIG.get('max_workers', 4), len(categories))
+            
+        pipeline = Pipeline([
+            Stage('search', self._search_category_pages, workers=search_workers),
+            Stage('extract', self._extract_page, workers=PIPELINE_CONFIG['extract_workers']),
+            Stage('comparables', self._price_page, workers=PIPELINE_CONFIG['comparables_workers']),
+            Stage('score', self._score_page),
+            Stage('save', save, batch_size=PIPELINE_CONFIG['save_batch_size'],
+                  flush_interval=PIPELINE_CONFIG['flush_interval'])
+        ], queue_size=PIPELINE_CONFIG['queue_size'], on_worker_exit=self.db.release_thread_connection)
+        
+        self.pipeline_metrics = pipeline.run(categories)
+        for stage in self.pipeline_metrics:
+            logger.info(
+                f"Stage {stage['stage']}: {stage['items_in']} in, {stage['items_out']} out, "
+                f"{stage['items_per_second']}/s, {stage['utilization']:.0%} busy, {stage['errors']} errors, "
+                f"queue depth avg {stage['queue_depth_avg']} max {stage['queue_depth_max']}"
+            )
+            
+        for category, stats in self.page_stats.items():
+            for stat in sorted(stats, key=lambda s: s['page']):
+                logger.info(
+                    f"{category} page {stat['page']}: {stat['items']} items, {stat['skipped']} skipped, "
+                    f"{stat['new']} new, {stat['profitable']} profitable"
+                )
                 
-                # Avoid rate limiting
-                time.sleep(random.uniform(1, 3))
+        self._sync_known_asins()
+        
+        if self.response_cache is not None:
+            logger.info(f"PA-API response cache: {self.response_cache.stats()}")
+            
+        logger.info(f"Product search completed, {len(changed_asins)} known products changed price")
+        return changed_asins
+        
+    def _search_category_pages(self, category):
+        """Pipeline search stage: yield a category's result pages as they arrive
+        
+        Pages are requested page_concurrency at a time, up to the page count
+        implied by max_results_per_search (capped at the API's page limit).
+        The crawl stops after a short page, or once a later stage has marked
+        the category exhausted because a page's products had no profitable
+        candidates or every item on it was a product checked recently. Those verdicts arrive while the
+        next pages are in flight, so up to a queue's worth of extra pages
+        may be fetched.
+        """
+        logger.info(f"Searching in category: {category}")
+        
+        per_page = SEARCH_ITEMS_PAGE_SIZE
+        max_pages = min(SEARCH_ITEMS_MAX_PAGES, -(-PRODUCT_SEARCH_CONFIG['max_results_per_search'] // per_page))
+        concurrency = max(1, PRODUCT_SEARCH_CONFIG.get('page_concurrency', 1))
+        page = 1
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='SearchPage') as executor:
+            while page <= max_pages and category not in self._exhausted_categories:
+                wave = range(page, min(page + concurrency, max_pages + 1))
+                page += len(wave)
+                short = False
                 
-            except Exception as e:
-                logger.error(f"Error searching category {category}: {e}")
+                for item_page, items in zip(wave, executor.map(
+                        lambda p: self._search_amazon_category(category, p), wave)):
+                    stat = {'page': item_page, 'items': len(items), 'skipped': 0, 'new': 0, 'profitable': 0}
+                    self.page_stats[category].append(stat)
+                    short = short or len(items) < per_page
+                    yield {'category': category, 'stat': stat, 'items': items, 'products': []}
+                    
+                if short:
+                    break
+                    
+    def _extract_page(self, page):
+        """Pipeline extract stage: drop known, fresh items and extract the rest"""
+        items = page['items']
+        unseen = self._drop_known_items(items)
+        products = []
+        for item in unseen:
+            product = self._extract_product_data(item)
+            if product:
+                products.append(product)
                 
-        logger.info("Product search completed")
+        known = self.db.get_known_asins(product.asin for product in products)
+        page['stat']['skipped'] = len(items) - len(products)
+        page['stat']['new'] = len(products) - len(known)
+        # Only a page made up entirely of recently checked products ends
+        # the crawl; an empty or unextractable page says nothing about
+        # what comes after it
+        if items and not unseen:
+            self._exhausted_categories.add(page['category'])
+            
+        page['items'] = None
+        page['products'] = products
+        logger.debug(f"Found {len(products)} products in category {page['category']} page {page['stat']['page']}")
+        yield page
+        
+    def _price_page(self, page):
+        """Pipeline comparables stage: price a page's products from eBay listings"""
+        if self.ebay_price_checker is not None and page['products']:
+            page['products'] = self._apply_ebay_comparables(page['products'])
+        yield page
+        
+    def _score_page(self, page):
+        """Pipeline score stage: yield a page's profitable products one by one
+        
+        Scores the whole page with column operations (see scoring.py):
+        estimated eBay price, fees, shipping, net profit and margin, then
+        keeps products inside the configured price band and margin floor
+        that still make a profit after fees.
+        """
+        candidates = filter_profitable(page['products'])
+        page['stat']['profitable'] = len(candidates)
+        if page['products'] and not candidates:
+            self._exhausted_categories.add(page['category'])
+        return candidates
         
-    def _search_amazon_category(self, category):
-        """Search for products in a specific Amazon category"""
+    def _call_amazon(self, operation, request):
+        """Call a PA-API client operation, served from the response cache when possible
+        
+        Only cache misses and background refreshes reach the network, and
+        each of those waits on the shared rate limiter first.
+        """
+        def fetch():
+            AMAZON_RATE_LIMITER.acquire()
+            return getattr(self.amazon_client, operation)(request)
+            
+        if self.response_cache is None:
+            return fetch()
+        return self.response_cache.get_or_fetch(operation, request, fetch)
+        
+    def _search_amazon_category(self, category, item_page=1, keywords=None, max_price=None):
+        """Search one page of products in a specific Amazon category
+        
+        keywords narrows the search and max_price lowers the configured
+        price ceiling. Returns the items Amazon returned, or an empty list
+        on error.
+        """
         try:
             # Create search request
             request = SearchItemsRequest()
@@ -104,9 +310,13 @@ class ProductFinder:
             
             # Set search parameters
             request.search_index = category
-            request.item_count = PRODUCT_SEARCH_CONFIG['max_results_per_search']
+            if keywords:
+                request.keywords = keywords
+            request.item_count = SEARCH_ITEMS_PAGE_SIZE
+            request.item_page = item_page
             request.resources = [
                 SearchItemsResource.ITEM_INFO,
+                SearchItemsResource.ITEMINFO_EXTERNALIDS,
                 SearchItemsResource.OFFERS,
                 SearchItemsResource.IMAGES,
                 SearchItemsResource.BROWSE_NODE_INFO
@@ -114,28 +324,22 @@ class ProductFinder:
             
             # Set filters
             request.min_price = PRODUCT_SEARCH_CONFIG['min_price']
-            request.max_price = PRODUCT_SEARCH_CONFIG['max_price']
+            request.max_price = min(max_price or PRODUCT_SEARCH_CONFIG['max_price'], PRODUCT_SEARCH_CONFIG['max_price'])
             request.merchant = Merchant.AMAZON
             request.availability = Availability.AVAILABLE
             request.delivery_flag = DeliveryFlag.PRIME
             request.sort_by = SortBy.PRICE_HIGH_TO_LOW
             
             # Execute search
-            response = self.amazon_client.search_items(request)
+            response = self._call_amazon('search_items', request)
             
             # Process response
-            products = []
             if response and response.search_result and response.search_result.items:
-                for item in response.search_result.items:
-                    product = self._extract_product_data(item)
-                    if product:
-                        products.append(product)
-                        
-            logger.info(f"Found {len(products)} products in category {category}")
-            return products
+                return response.search_result.items
+            return []
             
         except Exception as e:
-            logger.error(f"Error in Amazon search for category {category}: {e}")
+            logger.error(f"Error in Amazon search for category {category} page {item_page}: {e}")
             return []
             
     def _extract_product_data(self, item):
@@ -169,94 +373,153 @@ class ProductFinder:
             else:
                 image_url = ""
                 
+            # Extract UPC, which lets eBay comparables match the exact product
+            upc = None
+            external_ids = item.item_info.external_ids
+            if external_ids and external_ids.up_cs and external_ids.up_cs.display_values:
+                upc = external_ids.up_cs.display_values[0]
+                
             # Extract description (limited in API response)
             description = title  # Use title as fallback
             
-            return {
-                'asin': asin,
-                'title': title,
-                'amazon_price': amazon_price,
-                'category': category,
-                'image_url': image_url,
-                'description': description
-            }
+            return Product.from_prices(
+                asin, title, amazon_price,
+                category=category, image_url=image_url, description=description, upc=upc
+            )
             
         except Exception as e:
             logger.error(f"Error extracting product data: {e}")
             return None
             
-    def _filter_profitable_products(self, products):
-        """Filter products based on profitability criteria"""
-        profitable_products = []
+    def _apply_ebay_comparables(self, products):
+        """Fill in ebay_price from comparable eBay listings
+        
+        Products without enough comps are dropped when require_comps is set,
+        otherwise left for scoring to estimate.
+        """
+        estimates = self.ebay_price_checker.estimate_prices(products)
+        priced = []
         
         for product in products:
-            try:
-                # Check eBay prices for this product
-                ebay_price = self._check_ebay_price(product)
-                
-                if ebay_price:
-                    # Calculate potential profit
-                    amazon_price = product['amazon_price']
-                    potential_profit = ebay_price - amazon_price
-                    profit_margin = potential_profit / amazon_price
-                    
-                    # Check if meets minimum profit margin
-                    if profit_margin >= PRODUCT_SEARCH_CONFIG['min_profit_margin']:
-                        product['ebay_price'] = ebay_price
-                        product['profit_margin'] = profit_margin
-                        profitable_products.append(product)
-                        logger.info(f"Found profitable product: {product['title']} with margin {profit_margin:.2f}")
-                        
-            except Exception as e:
-                logger.error(f"Error checking profitability for product {product.get('asin')}: {e}")
-                
-        logger.info(f"Found {len(profitable_products)} profitable products")
-        return profitable_products
+            price = estimates.get(product.asin)
+            if price is not None:
+                product.ebay_cents = to_cents(price)
+            elif EBAY_COMPARABLES_CONFIG.get('require_comps', True):
+                continue
+            priced.append(product)
+            
+        logger.debug(f"Priced {len(priced)} of {len(products)} products from eBay comparables")
+        return priced
         
-    def _check_ebay_price(self, product):
-        """Check current prices for similar products on eBay"""
-        # This is a simplified implementation
-        # In a real system, this would use the eBay API to search for similar products
+    def save_products(self, products):
+        """Save products to the database and record the sighting in their price history
         
+        Returns the ASINs of already-known products whose prices changed.
+        """
+        if not products:
+            return []
+            
         try:
-            # For now, estimate eBay price as 1.3x Amazon price as a placeholder
-            # This will be replaced with actual eBay API integration in the price calculator module
-            estimated_ebay_price = product['amazon_price'] * 1.3
-            return estimated_ebay_price
+            result = self.db.upsert_products(products)
+            if result is None:
+                logger.error(f"Failed to save {len(products)} products to database")
+                return []
+                
+            logger.info(
+                f"Saved products to database: {result['inserted']} new, "
+                f"{result['updated']} repriced, {result['unchanged']} unchanged"
+            )
+            
+            # Append this sighting to each product's price history
+            self.db.record_price_observations(
+                (product.asin, product.amazon_price, product.ebay_price) for product in products
+            )
+            return result['changed_asins']
             
         except Exception as e:
-            logger.error(f"Error checking eBay price: {e}")
-            return None
+            logger.error(f"Error saving products to database: {e}")
+            return []
             
-    def _save_products_to_database(self, products):
-        """Save profitable products to the database"""
-        for product in products:
-            try:
-                self.db.add_product(
-                    asin=product['asin'],
-                    title=product['title'],
-                    amazon_price=product['amazon_price'],
-                    ebay_price=product['ebay_price'],
-                    profit_margin=product['profit_margin'],
-                    category=product['category'],
-                    image_url=product['image_url'],
-                    description=product['description']
-                )
-                logger.info(f"Saved product to database: {product['asin']}")
-                
-            except Exception as e:
-                logger.error(f"Error saving product to database: {e}")
+    def search_keywords(self, keywords, category=None, max_price=None, min_profit=None, limit=None):
+        """Search Amazon by keywords and return the profitable results, best first
+        
+        Nothing is saved; this serves interactive searches. Results are
+        priced from eBay comparables and scored like discovered products,
+        with max_price lowering the price ceiling and min_profit setting a
+        floor on net profit in dollars. At most limit products are returned.
+        """
+        limit = limit or SEARCH_ITEMS_PAGE_SIZE
+        pages = min(SEARCH_ITEMS_MAX_PAGES, -(-limit // SEARCH_ITEMS_PAGE_SIZE))
+        thresholds = {'max_price': max_price} if max_price else {}
+        products = []
+        
+        for item_page in range(1, pages + 1):
+            items = self._search_amazon_category(category or 'All', item_page, keywords=keywords, max_price=max_price)
+            products.extend(p for p in map(self._extract_product_data, items) if p)
+            if len(items) < SEARCH_ITEMS_PAGE_SIZE:
+                break
                 
+        if self.ebay_price_checker is not None and products:
+            products = self._apply_ebay_comparables(products)
+        profitable = filter_profitable(products, **thresholds)
+        
+        if min_profit:
+            profitable = [p for p in profitable if p.net_profit >= min_profit]
+        profitable.sort(key=lambda p: p.net_profit_cents, reverse=True)
+        
+        logger.info(f"Keyword search '{keywords}' found {len(profitable)} profitable of {len(products)} products")
+        return profitable[:limit]
+        
     def get_product_details(self, asin):
         """Get detailed information about a specific product by ASIN"""
+        product = self.get_products_details_batch([asin]).get(asin)
+        if product is None:
+            logger.warning(f"No details found for ASIN {asin}")
+        return product
+        
+    def get_products_details_batch(self, asins, max_workers=None):
+        """Get detailed information for many ASINs, GET_ITEMS_BATCH_SIZE per request
+        
+        Batches run concurrently under the shared Amazon rate limiter.
+        Returns a dict keyed by every requested ASIN, holding the product
+        data or None for ASINs that failed or were not returned.
+        """
+        asins = list(dict.fromkeys(asins))
+        results = dict.fromkeys(asins)
+        batches = [asins[i:i + GET_ITEMS_BATCH_SIZE] for i in range(0, len(asins), GET_ITEMS_BATCH_SIZE)]
+        
+        if not batches:
+            return results
+            
+        if max_workers is None:
+            max_workers = PRODUCT_SEARCH_CONFIG.get('max_workers', 4)
+            
+        if len(batches) == 1:
+            results.update(self._get_items_batch(batches[0]))
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(batches)), thread_name_prefix='GetItems') as executor:
+                for found in executor.map(self._get_items_batch, batches):
+                    results.update(found)
+                    
+        missing = sum(1 for product in results.values() if product is None)
+        logger.info(f"Fetched details for {len(asins) - missing} of {len(asins)} ASINs in {len(batches)} requests")
+        return results
+        
+    def _get_items_batch(self, asins):
+        """Run one GetItems request for up to GET_ITEMS_BATCH_SIZE ASINs
+        
+        Returns a dict of ASIN to product data for the items Amazon
+        returned; ASINs that errored are logged and left out.
+        """
         try:
-            # Create request for specific item
+            # Create request for the batch of items
             request = GetItemsRequest()
             request.partner_tag = AMAZON_CONFIG['partner_tag']
             request.partner_type = PartnerType[AMAZON_CONFIG['partner_type']]
-            request.item_ids = [asin]
+            request.item_ids = asins
             request.resources = [
                 GetItemsResource.ITEM_INFO,
+                GetItemsResource.ITEMINFO_EXTERNALIDS,
                 GetItemsResource.OFFERS,
                 GetItemsResource.IMAGES,
                 GetItemsResource.BROWSE_NODE_INFO,
@@ -264,16 +527,22 @@ class ProductFinder:
             ]
             
             # Execute request
-            response = self.amazon_client.get_items(request)
+            response = self._call_amazon('get_items', request)
             
-            # Process response
+            # Per-item failures come back alongside the items that succeeded
+            if response and response.errors:
+                for error in response.errors:
+                    logger.warning(f"GetItems error {error.code}: {error.message}")
+                    
+            found = {}
             if response and response.items_result and response.items_result.items:
-                item = response.items_result.items[0]
-                return self._extract_product_data(item)
-            else:
-                logger.warning(f"No details found for ASIN {asin}")
-                return None
-                
+                for item in response.items_result.items:
+                    product = self._extract_product_data(item)
+                    if product:
+                        found[item.asin] = product
+                        
+            return found
+            
         except Exception as e:
-            logger.error(f"Error getting product details for ASIN {asin}: {e}")
-            return None
+            logger.error(f"Error getting product details for ASINs {', '.join(asins)}: {e}")
+            return {}
@@ -0,0 +1,129 @@
+"""
+Rate limiting for Amazon to eBay Arbitrage System API calls
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Thread-safe token bucket limiting calls to a sustained rate
+
+    Tokens refill continuously at rate per second up to capacity, which
+    sets the largest burst allowed after an idle period. Every caller that
+    shares a bucket shares its quota.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """Initialize a full bucket refilling at rate tokens per second"""
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Add the tokens accrued since the last refill (caller holds the lock)"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self, tokens):
+        """Take tokens if available; returns 0, or the seconds until they will be"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if they are available right now, without waiting"""
+        return self._take(tokens) == 0
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are available and take them
+
+        Returns True once the tokens are taken, or False if they could not
+        be taken within timeout seconds.
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return True
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+
+            time.sleep(wait)
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket whose tokens live in a SQLite file shared across processes
+
+    Every process that opens the same file and bucket name draws from one
+    quota, so the scheduler and the search daemon together stay within it.
+    Each take is one short IMMEDIATE transaction; waiting happens outside it.
+    """
+
+    def __init__(self, path, rate, capacity=None, name='default'):
+        """Use the bucket called name in the file at path, created full on first use"""
+        super().__init__(rate, capacity)
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+
+    def _connection(self):
+        """This thread's connection to the bucket file, creating the table on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS token_buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+            ''')
+            self._local.conn = conn
+        return conn
+
+    def _take(self, tokens):
+        """Take tokens from the shared row; returns 0, or the seconds until they will be"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Wall-clock time, since monotonic clocks are not comparable across processes
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM token_buckets WHERE name = ?", (self.name,)).fetchone()
+            available = self.capacity if row is None else min(
+                self.capacity, row[0] + max(now - row[1], 0) * self.rate
+            )
+            wait = 0 if available >= tokens else (tokens - available) / self.rate
+            if not wait:
+                available -= tokens
+            conn.execute(
+                "INSERT OR REPLACE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                (self.name, available, now)
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
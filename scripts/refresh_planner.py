@@ -0,0 +1,173 @@
+"""
+Adaptive price refresh planner for Amazon to eBay Arbitrage System
+
+Decides which tracked products to re-check next. Each product's Amazon
+price is modelled as changing at its own rate, estimated from the changes
+seen on past checks, and products are checked more often the faster they
+change and the more money rides on them. Due products come off a priority
+queue keyed by next-due time and are refreshed in GetItems batches, so a
+fixed API quota goes where prices actually move.
+"""
+
+import time
+import heapq
+import logging
+import math
+
+from config import REFRESH_CONFIG
+from product_finder import GET_ITEMS_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+
+def change_rate(change_events, exposure_seconds, config=None):
+    """Estimated price changes per second from decayed counts
+
+    The prior acts as prior_changes changes already seen over prior_hours,
+    so products with little history start at the prior rate and move away
+    from it as evidence accumulates.
+    """
+    config = config or REFRESH_CONFIG
+    return ((change_events + config['prior_changes']) /
+            (exposure_seconds + config['prior_hours'] * HOUR))
+
+def exposure(product, is_listed, config=None):
+    """Dollars riding on a product's price being current"""
+    config = config or REFRESH_CONFIG
+    dollars = max(product.amazon_price or 0.0, product.ebay_price or 0.0, 1.0)
+    return dollars * (config['listed_weight'] if is_listed else 1.0)
+
+def refresh_interval(rate, exposure_dollars, config=None):
+    """Seconds until a product should be checked again
+
+    Scales as 1 / sqrt(rate * exposure), which spreads a fixed number of
+    checks so that expected stale exposure is smallest overall. A product
+    changing once per base interval with the reference exposure gets the
+    base interval.
+    """
+    config = config or REFRESH_CONFIG
+    base = config['base_interval_hours'] * HOUR
+    reference = (1.0 / base) * config['reference_exposure']
+    interval = base * math.sqrt(reference / max(rate * exposure_dollars, 1e-12))
+    return min(max(interval, config['min_interval_hours'] * HOUR), config['max_interval_hours'] * HOUR)
+
+def update_counts(change_events, exposure_seconds, elapsed, changed, config=None):
+    """Fold one check into decayed (change_events, exposure_seconds)"""
+    config = config or REFRESH_CONFIG
+    decay = 0.5 ** (elapsed / (config['half_life_days'] * 86400))
+    return change_events * decay + (1.0 if changed else 0.0), exposure_seconds * decay + elapsed
+
+class RefreshPlanner:
+    """Schedules and runs price refreshes for tracked products
+
+    The queue holds (next_due, product_id) for every product and is
+    rebuilt from refresh_stats on first use; products added since are
+    picked up at the start of each run. Statistics live in the database,
+    so schedules survive restarts.
+    """
+
+    def __init__(self, db, finder, config=None):
+        """Create a planner that refreshes through finder"""
+        self.db = db
+        self.finder = finder
+        self.config = config or REFRESH_CONFIG
+        self.queue = []
+        self.last_product_id = 0
+        self.last_run = {}
+
+    def _load_new_products(self, now):
+        """Queue products not yet in the queue"""
+        base = self.config['base_interval_hours'] * HOUR
+        added = 0
+        for product_id, next_due, last_priced in self.db.iter_refresh_schedule(self.last_product_id):
+            if next_due is None:
+                next_due = (last_priced or now) + base
+            heapq.heappush(self.queue, (next_due, product_id))
+            self.last_product_id = product_id
+            added += 1
+
+        if added:
+            logger.info(f"Refresh queue picked up {added} products, {len(self.queue)} queued")
+
+    def pop_due(self, now=None, limit=None):
+        """Take up to limit product ids whose refresh is due, most overdue first"""
+        now = now if now is not None else time.time()
+        if limit is None:
+            limit = self.config['requests_per_run'] * GET_ITEMS_BATCH_SIZE
+
+        due = []
+        while self.queue and self.queue[0][0] <= now and len(due) < limit:
+            due.append(heapq.heappop(self.queue)[1])
+        return due
+
+    def refresh_due(self, now=None):
+        """Re-check the products that are due, within the per-run request budget
+
+        Observed prices are saved like any other sighting and each checked
+        product is rescheduled from its updated statistics. Returns the
+        ASINs whose price changed.
+        """
+        now = int(now if now is not None else time.time())
+        self._load_new_products(now)
+
+        due = self.pop_due(now)
+        if not due:
+            logger.info("No product refreshes due")
+            return []
+
+        state = self.db.get_refresh_state(due)
+        unseen = [product_id for product_id in due if product_id in state and state[product_id][2] is None]
+        seeds = self.db.get_price_change_counts(unseen) if unseen else {}
+
+        asins = {state[product_id][0].asin: product_id for product_id in due if product_id in state}
+        observed = self.finder.get_products_details_batch(list(asins))
+
+        stats_rows = []
+        refreshed = []
+        changed = 0
+
+        for asin, product_id in asins.items():
+            product, is_listed, last_checked, change_events, exposure_seconds = state[product_id]
+            if last_checked is None:
+                change_events, exposure_seconds = seeds.get(product_id, (0.0, 0.0))
+                last_checked = now
+
+            current = observed.get(asin)
+            if current is not None:
+                price_changed = current.amazon_cents != product.amazon_cents
+                change_events, exposure_seconds = update_counts(
+                    change_events, exposure_seconds, max(0, now - last_checked), price_changed, self.config
+                )
+                last_checked = now
+                changed += price_changed
+
+                # Refresh the Amazon side only; the eBay price is kept
+                current.ebay_cents = product.ebay_cents
+                if product.ebay_cents is not None and current.amazon_cents:
+                    current.profit_margin = (current.ebay_cents - current.amazon_cents) / current.amazon_cents
+                refreshed.append(current)
+                product = current
+
+            rate = change_rate(change_events, exposure_seconds, self.config)
+            next_due = now + int(refresh_interval(rate, exposure(product, is_listed, self.config), self.config))
+            heapq.heappush(self.queue, (next_due, product_id))
+            stats_rows.append((product_id, next_due, last_checked, change_events, exposure_seconds))
+
+        # Products deleted since they were queued simply drop out
+        self.db.save_refresh_stats(stats_rows)
+        changed_asins = self.finder.save_products(refreshed) if refreshed else []
+
+        self.last_run = {
+            'checked': len(refreshed),
+            'changed': changed,
+            'missing': len(asins) - len(refreshed),
+            'queued': len(self.queue),
+            'next_due_in': round(self.queue[0][0] - now) if self.queue else None
+        }
+        logger.info(
+            f"Refreshed {len(refreshed)} products, {changed} changed price, "
+            f"{self.last_run['missing']} not returned; {len(self.queue)} queued, "
+            f"next due in {self.last_run['next_due_in']}s"
+        )
+        return changed_asins
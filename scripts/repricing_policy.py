@@ -0,0 +1,277 @@
+"""
+Repricing policy module for Amazon to eBay Arbitrage System
+
+Decides which listings are worth a ReviseItem call. A listing is revised
+when its new price, rounded up to a price point, differs from the listed
+price by at least max(min_change_absolute, min_change_percent of the
+listed price) and it has not been revised within the minimum interval.
+The deadband means small moves back and forth around the listed price
+cost no calls. Listings selling below break-even skip both checks. Due
+revisions are queued by profit impact, listings at a loss first, and
+capped at what is left of the rolling daily revision budget.
+
+Run as a script to replay recent price history and see how many calls a
+policy would save against revising on every change.
+"""
+
+import time
+import heapq
+import logging
+import argparse
+from collections import deque
+from itertools import islice
+
+import numpy as np
+
+import fees
+from config import DATABASE_CONFIG, EBAY_LISTING_CONFIG, FEE_CONFIG, REPRICING_POLICY_CONFIG
+from price_calculator import PriceCalculator
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+# Larger than any epoch timestamp, for packing (listing, ts) keys
+TIME_SPAN = 1 << 34
+
+def needs_revision(current, new_price, age_seconds, underwater, config=None):
+    """Mask of listings whose new price is worth a revision now"""
+    config = config or REPRICING_POLICY_CONFIG
+    change = np.abs(new_price - current)
+    threshold = np.maximum(config['min_change_absolute'], config['min_change_percent'] * current)
+    settled = age_seconds >= config['min_revision_interval_hours'] * 3600
+    moved = np.round(new_price * 100) != np.round(current * 100)
+    # Half a cent of slack so float noise does not hold back a change of exactly the threshold
+    return moved & (underwater | ((change >= threshold - 0.005) & settled))
+
+def profit_impact(current, new_price, fee_rate, quantity=1, fees_config=None):
+    """Dollars per unit sold that the revision moves, after percentage fees, times quantity"""
+    fees_config = fees_config or FEE_CONFIG
+    return np.abs(new_price - current) * (1 - fee_rate - fees_config['paypal_fee_rate']) * quantity
+
+def prioritize(due, underwater, impact, budget):
+    """Indices of due listings in revision order, at most budget of them
+
+    Listings selling at a loss come first, then the largest profit impact.
+    """
+    order = np.lexsort((-impact, ~underwater))
+    return order[due[order]][:max(int(budget), 0)]
+
+class RepricingPolicy:
+    """Turns repriced products into a budgeted queue of listing revisions"""
+
+    def __init__(self, db=None, config=None, fee_config=None, markup=None):
+        """Initialize the repricing policy"""
+        self.db = db
+        self.config = config or REPRICING_POLICY_CONFIG
+        self.fee_config = fee_config or FEE_CONFIG
+        self.markup = EBAY_LISTING_CONFIG['markup_percentage'] if markup is None else markup
+        self.last_plan = {}
+
+    def evaluate(self, current, target, amazon, fee_rate, age_seconds, quantity=1):
+        """Price point, due mask, underwater mask and profit impact for each listing"""
+        new_price = fees.round_to_price_point(target, self.config['price_point_endings'])
+        break_even = fees.target_price(amazon, 0.0, fee_rate, self.fee_config)
+        underwater = current < break_even
+        due = needs_revision(current, new_price, age_seconds, underwater, self.config)
+        impact = profit_impact(current, new_price, fee_rate, quantity, self.fee_config)
+        return new_price, due, underwater, impact
+
+    def remaining_budget(self, now=None):
+        """Revisions left in the rolling 24 hour budget, or None if unknown"""
+        now = now if now is not None else time.time()
+        used = self.db.count_listing_revisions_since(now - DAY)
+        if used is None:
+            return None
+        return max(self.config['daily_revision_budget'] - used, 0)
+
+    def plan(self, now=None, page_size=None):
+        """Listings to revise now as (ebay_item_id, current_price, new_price), in order
+
+        Candidates are evaluated a page at a time and only the best
+        budget-sized queue is kept, so memory stays flat however many
+        listings are off target.
+        """
+        if not self.db:
+            logger.error("Database connection not available")
+            return []
+
+        now = int(now if now is not None else time.time())
+        budget = self.remaining_budget(now)
+        if budget is None:
+            return []
+
+        page_size = page_size or DATABASE_CONFIG.get('page_size', 500)
+        candidates = self.db.iter_revision_candidates(page_size)
+        queue = []
+        seen = due_count = underwater_count = 0
+
+        while True:
+            page = list(islice(candidates, page_size))
+            if not page:
+                break
+            seen += len(page)
+
+            item_ids, current, quantity, last_updated, amazon, target, categories = zip(*page)
+            current = np.array(current, dtype=float)
+            last_updated = np.array([now if t is None else t for t in last_updated], dtype=float)
+            new_price, due, underwater, impact = self.evaluate(
+                current,
+                np.array(target, dtype=float),
+                np.array(amazon, dtype=float),
+                fees.category_fee_rates(categories, self.fee_config),
+                now - last_updated,
+                np.array([q or 1 for q in quantity], dtype=float)
+            )
+            due_count += int(due.sum())
+            underwater_count += int((due & underwater).sum())
+
+            # Min-heap of the best budget entries so far, worst on top
+            for i in prioritize(due, underwater, impact, budget):
+                entry = (bool(underwater[i]), float(impact[i]), -(seen - len(page) + int(i)),
+                         item_ids[i], float(current[i]), float(new_price[i]))
+                if len(queue) < budget:
+                    heapq.heappush(queue, entry)
+                elif entry > queue[0]:
+                    heapq.heapreplace(queue, entry)
+
+        queue.sort(reverse=True)
+        self.last_plan = {
+            'candidates': seen,
+            'due': due_count,
+            'underwater': underwater_count,
+            'queued': len(queue),
+            'over_budget': due_count - len(queue),
+            'budget_left': budget - len(queue)
+        }
+        logger.info(
+            f"Repricing plan: {len(queue)} of {seen} off-target listings queued, "
+            f"{underwater_count} below break-even, "
+            f"{seen - due_count} held by thresholds or interval, "
+            f"{self.last_plan['over_budget']} over budget"
+        )
+        return [entry[3:] for entry in queue]
+
+    def simulate(self, history, start, end, step_minutes=None):
+        """Replay Amazon price history and count the revisions this policy makes
+
+        history is (product_id, category, ts, amazon_cents) rows sorted by
+        product and time, one listing per product. Each step the baseline
+        revises every listing whose exact target moved, as the lister did
+        before this policy; the policy revises what plan would queue.
+        Returns a report of calls made, calls saved and pricing quality.
+        """
+        step = (step_minutes or self.config['simulation_step_minutes']) * 60
+        ticks = np.arange(start + step, end + 1, step)
+        calculator = PriceCalculator(fee_config=self.fee_config, markup=self.markup)
+
+        product_ids = np.array([row[0] for row in history], dtype=np.int64)
+        firsts = np.flatnonzero(np.r_[True, product_ids[1:] != product_ids[:-1]]) if len(history) else np.empty(0, int)
+        listing = np.cumsum(np.r_[False, product_ids[1:] != product_ids[:-1]]) if len(history) else product_ids
+        # (listing, ts) packed into one sorted key, so one searchsorted finds every listing's latest price
+        keys = listing * TIME_SPAN + np.array([row[2] for row in history], dtype=np.int64)
+        listing_keys = np.arange(len(firsts), dtype=np.int64) * TIME_SPAN
+        prices = np.array([row[3] for row in history], dtype=float) / 100
+        fee_rate = fees.category_fee_rates([history[i][1] for i in firsts], self.fee_config)
+
+        report = {'listings': len(firsts), 'steps': len(ticks), 'baseline_calls': 0, 'policy_calls': 0,
+                  'over_budget': 0, 'underwater_listing_hours': 0.0, 'mean_gap': 0.0}
+        if not len(firsts) or not len(ticks):
+            return report
+
+        baseline_price = np.full(len(firsts), np.nan)
+        policy_price = np.full(len(firsts), np.nan)
+        last_revised = np.zeros(len(firsts))
+        revisions = deque()
+        gap_total = 0.0
+        gap_count = 0
+
+        for tick in ticks:
+            # Latest observed Amazon price per listing; NaN until its first observation
+            latest = np.searchsorted(keys, listing_keys + tick, side='right') - 1
+            live = latest >= firsts
+            amazon = np.where(live, prices[np.maximum(latest, 0)], np.nan)
+            if not live.any():
+                continue
+
+            target = np.full(len(firsts), np.nan)
+            # History has no market estimates, so targets are the markup floors
+            target[live] = calculator.compute_floors({'amazon_price': amazon[live], 'fee_rate': fee_rate[live]}) / 100
+
+            # Listings appear at their first price point, as list_products creates them
+            new = live & np.isnan(policy_price)
+            baseline_price[new] = target[new]
+            policy_price[new] = fees.round_to_price_point(target[new], self.config['price_point_endings'])
+            last_revised[new] = tick
+
+            moved = live & (np.round(baseline_price * 100) != np.round(target * 100))
+            report['baseline_calls'] += int(moved.sum())
+            baseline_price[moved] = target[moved]
+
+            while revisions and revisions[0] <= tick - DAY:
+                revisions.popleft()
+            budget = max(self.config['daily_revision_budget'] - len(revisions), 0)
+
+            idx = np.flatnonzero(live)
+            new_price, due, underwater, impact = self.evaluate(
+                policy_price[idx], target[idx], amazon[idx], fee_rate[idx], tick - last_revised[idx]
+            )
+            queue = prioritize(due, underwater, impact, budget)
+            policy_price[idx[queue]] = new_price[queue]
+            last_revised[idx[queue]] = tick
+            revisions.extend([tick] * len(queue))
+            report['policy_calls'] += len(queue)
+            report['over_budget'] += int(due.sum()) - len(queue)
+
+            # Pricing quality after this step's revisions
+            break_even = fees.target_price(amazon[idx], 0.0, fee_rate[idx], self.fee_config)
+            report['underwater_listing_hours'] += float((policy_price[idx] < break_even).sum()) * step / 3600
+            gap_total += float(np.abs(policy_price[idx] - target[idx]).sum())
+            gap_count += len(idx)
+
+        saved = report['baseline_calls'] - report['policy_calls']
+        report['calls_saved'] = saved
+        report['saved_percent'] = round(100 * saved / report['baseline_calls'], 1) if report['baseline_calls'] else 0.0
+        report['underwater_listing_hours'] = round(report['underwater_listing_hours'], 1)
+        report['mean_gap'] = round(gap_total / gap_count, 2) if gap_count else 0.0
+        return report
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Simulate a repricing policy against recent price history')
+    parser.add_argument('--days', type=float, default=7, help='Days of raw price history to replay')
+    parser.add_argument('--min-change-absolute', type=float, default=None)
+    parser.add_argument('--min-change-percent', type=float, default=None)
+    parser.add_argument('--min-interval-hours', type=float, default=None)
+    parser.add_argument('--budget', type=int, default=None, help='Daily revision budget')
+    parser.add_argument('--step-minutes', type=int, default=None, help='Minutes between simulated lister runs')
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    from database import ArbitrageDatabase
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_arguments()
+
+    config = dict(REPRICING_POLICY_CONFIG)
+    overrides = {
+        'min_change_absolute': args.min_change_absolute,
+        'min_change_percent': args.min_change_percent,
+        'min_revision_interval_hours': args.min_interval_hours,
+        'daily_revision_budget': args.budget
+    }
+    config.update({key: value for key, value in overrides.items() if value is not None})
+
+    db = ArbitrageDatabase()
+    end = int(time.time())
+    start = end - int(args.days * DAY)
+    report = RepricingPolicy(db, config).simulate(db.get_listed_price_history(start), start, end, args.step_minutes)
+    db.close()
+
+    print(f"Replayed {report['listings']} listings over {report['steps']} lister runs")
+    print(f"  revise on every change:  {report['baseline_calls']:>8} calls")
+    print(f"  policy:                  {report['policy_calls']:>8} calls "
+          f"({report['calls_saved']} saved, {report['saved_percent']}%)")
+    print(f"  held over budget:        {report['over_budget']:>8}")
+    print(f"  below break-even:        {report['underwater_listing_hours']:>8} listing-hours")
+    print(f"  mean gap to target:      ${report['mean_gap']:>7}")
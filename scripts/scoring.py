@@ -0,0 +1,132 @@
+"""
+Batch profitability scoring for Amazon to eBay Arbitrage System
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+import fees
+from config import PRODUCT_SEARCH_CONFIG
+from product import to_cents
+
+logger = logging.getLogger(__name__)
+
+def score_frame(frame, fee_config=None):
+    """Add fee, profit and margin columns to a frame of candidates
+
+    frame needs an amazon_price column. An ebay_price column is used where
+    present and not NaN; missing prices are estimated from the Amazon price.
+    The final value fee is charged at the category rate, as repricing does,
+    when the frame has a category column. profit_margin keeps its stored meaning, the eBay markup over the Amazon
+    price, while net_profit is what is left after fees and shipping.
+    Returns the same frame.
+    """
+    amazon = frame['amazon_price'].to_numpy(dtype=float)
+
+    estimate = fees.estimated_ebay_price(amazon, fee_config)
+    if 'ebay_price' in frame:
+        ebay = frame['ebay_price'].to_numpy(dtype=float)
+        ebay = np.where(np.isnan(ebay), estimate, ebay)
+    else:
+        ebay = estimate
+
+    fee_rate = None
+    if 'category' in frame:
+        fee_rate = fees.category_fee_rates(frame['category'].tolist(), fee_config)
+
+    frame['ebay_price'] = ebay
+    frame['ebay_fees'] = fees.ebay_fees(ebay, fee_config, fee_rate)
+    frame['paypal_fees'] = fees.paypal_fees(ebay, fee_config)
+    frame['shipping_cost'] = (fee_config or fees.FEE_CONFIG)['shipping_cost']
+    frame['net_profit'] = fees.net_profit(amazon, ebay, fee_config, fee_rate)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frame['profit_margin'] = np.where(amazon > 0, (ebay - amazon) / amazon, -np.inf)
+    return frame
+
+def profitable_mask(frame, min_price=None, max_price=None, min_profit_margin=None):
+    """Boolean mask of scored rows inside the price band, above the margin floor and net profitable"""
+    if min_price is None:
+        min_price = PRODUCT_SEARCH_CONFIG['min_price']
+    if max_price is None:
+        max_price = PRODUCT_SEARCH_CONFIG['max_price']
+    if min_profit_margin is None:
+        min_profit_margin = PRODUCT_SEARCH_CONFIG['min_profit_margin']
+
+    amazon = frame['amazon_price'].to_numpy(dtype=float)
+    margin = frame['profit_margin'].to_numpy(dtype=float)
+    profit = frame['net_profit'].to_numpy(dtype=float)
+    return (amazon >= min_price) & (amazon <= max_price) & (margin >= min_profit_margin) & (profit > 0)
+
+def products_frame(products):
+    """Build a candidate frame in dollars from Product records"""
+    count = len(products)
+    return pd.DataFrame({
+        'amazon_price': np.fromiter((p.amazon_cents for p in products), dtype=float, count=count) / 100,
+        'ebay_price': np.fromiter(
+            (np.nan if p.ebay_cents is None else p.ebay_cents for p in products),
+            dtype=float, count=count
+        ) / 100,
+        'category': [p.category for p in products]
+    })
+
+def filter_profitable(products, fee_config=None, **thresholds):
+    """Score Product records as one batch and return the profitable ones
+
+    Survivors get ebay_cents, net_profit_cents and profit_margin filled in.
+    thresholds override the PRODUCT_SEARCH_CONFIG min_price, max_price and
+    min_profit_margin.
+    """
+    products = list(products)
+    if not products:
+        return []
+
+    frame = score_frame(products_frame(products), fee_config)
+    survivors = np.flatnonzero(profitable_mask(frame, **thresholds))
+
+    # Round to cents and convert whole columns to Python values in one pass each
+    profitable = [products[i] for i in survivors.tolist()]
+    columns = zip(
+        np.rint(frame['ebay_price'].to_numpy()[survivors] * 100).astype(np.int64).tolist(),
+        np.rint(frame['net_profit'].to_numpy()[survivors] * 100).astype(np.int64).tolist(),
+        frame['profit_margin'].to_numpy()[survivors].tolist()
+    )
+    for product, (ebay_cents, profit_cents, margin) in zip(profitable, columns):
+        product.ebay_cents = ebay_cents
+        product.net_profit_cents = profit_cents
+        product.profit_margin = margin
+
+    logger.debug(f"Scored {len(products)} candidates, {len(profitable)} profitable")
+    return profitable
+
+def filter_profitable_loop(products, fee_config=None, min_price=None, max_price=None, min_profit_margin=None):
+    """Per-product reference implementation of filter_profitable
+
+    Kept for benchmarking and cross-checking the batch path.
+    """
+    if min_price is None:
+        min_price = PRODUCT_SEARCH_CONFIG['min_price']
+    if max_price is None:
+        max_price = PRODUCT_SEARCH_CONFIG['max_price']
+    if min_profit_margin is None:
+        min_profit_margin = PRODUCT_SEARCH_CONFIG['min_profit_margin']
+
+    profitable = []
+    for product in products:
+        amazon_price = product.amazon_price
+        ebay_price = product.ebay_price
+        if ebay_price is None:
+            ebay_price = fees.estimated_ebay_price(amazon_price, fee_config)
+
+        fee_rate = fees.category_fee_rates([product.category], fee_config)[0]
+        profit = fees.net_profit(amazon_price, ebay_price, fee_config, fee_rate)
+        margin = (ebay_price - amazon_price) / amazon_price if amazon_price > 0 else float('-inf')
+
+        if min_price <= amazon_price <= max_price and margin >= min_profit_margin and profit > 0:
+            product.ebay_cents = to_cents(ebay_price)
+            product.net_profit_cents = to_cents(profit)
+            product.profit_margin = margin
+            profitable.append(product)
+
+    return profitable
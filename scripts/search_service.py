@@ -0,0 +1,224 @@
+"""
+Search service for Amazon to eBay Arbitrage System
+
+A long-lived process that keeps one ProductFinder warm and answers
+newline-delimited JSON-RPC 2.0 requests over a Unix socket or over
+stdin/stdout, so the web backend does not pay interpreter startup,
+imports and client setup on every search.
+
+Methods:
+    search   {keywords, category?, min_profit?, max_price?, limit?} -> [product]
+    product  {asin} -> product or null
+    ping     {} -> {"ok": true, "uptime": seconds}
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+
+from config import SEARCH_SERVICE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+class RpcError(Exception):
+    """An error reported back to the caller as a JSON-RPC error object"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+class SearchService:
+    """Dispatches JSON-RPC requests to a warm ProductFinder
+
+    Requests run on a shared thread pool, so concurrent searches overlap
+    their API round trips; the ProductFinder rate limiter still paces
+    calls to Amazon, sharing one quota with the scheduler's process.
+    """
+
+    def __init__(self, finder=None, max_workers=None):
+        """Create the finder once, up front"""
+        if finder is None:
+            from product_finder import ProductFinder
+            finder = ProductFinder()
+        self.finder = finder
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or SEARCH_SERVICE_CONFIG['max_workers'],
+            thread_name_prefix='SearchRequest'
+        )
+        self.started = time.monotonic()
+        self.methods = {
+            'search': self.search,
+            'product': self.product,
+            'ping': self.ping
+        }
+
+    def search(self, keywords, category=None, min_profit=None, max_price=None, limit=None):
+        """Profitable products matching keywords, as dicts"""
+        if not isinstance(keywords, str) or not keywords.strip():
+            raise RpcError(INVALID_PARAMS, "keywords must be a non-empty string")
+        limit = min(int(limit or 10), SEARCH_SERVICE_CONFIG['max_limit'])
+
+        products = self.finder.search_keywords(
+            keywords.strip(),
+            category=category,
+            min_profit=float(min_profit) if min_profit is not None else None,
+            max_price=float(max_price) if max_price is not None else None,
+            limit=limit
+        )
+        return [product.as_dict() for product in products]
+
+    def product(self, asin):
+        """Current Amazon details for one ASIN, or None"""
+        if not isinstance(asin, str) or not asin:
+            raise RpcError(INVALID_PARAMS, "asin must be a non-empty string")
+        product = self.finder.get_product_details(asin)
+        return product.as_dict() if product else None
+
+    def ping(self):
+        """Liveness check"""
+        return {'ok': True, 'uptime': round(time.monotonic() - self.started, 1)}
+
+    def handle_line(self, line):
+        """Answer one request line; returns the response dict, or None for a notification"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return self._error(None, PARSE_ERROR, f"Parse error: {e}")
+
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return self._error(request.get('id') if isinstance(request, dict) else None,
+                               INVALID_REQUEST, "Invalid request")
+
+        request_id = request.get('id')
+        method = self.methods.get(request['method'])
+        params = request.get('params') or {}
+
+        try:
+            if method is None:
+                raise RpcError(METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+            if isinstance(params, dict):
+                response = {'jsonrpc': '2.0', 'id': request_id, 'result': method(**params)}
+            elif isinstance(params, list):
+                response = {'jsonrpc': '2.0', 'id': request_id, 'result': method(*params)}
+            else:
+                raise RpcError(INVALID_PARAMS, "params must be an object or an array")
+        except RpcError as e:
+            response = self._error(request_id, e.code, e.message)
+        except TypeError as e:
+            response = self._error(request_id, INVALID_PARAMS, f"Invalid params: {e}")
+        except Exception as e:
+            logger.error(f"Error handling {request['method']} request: {e}")
+            response = self._error(request_id, SERVER_ERROR, str(e))
+
+        # Notifications get no reply, not even an error
+        if 'id' not in request:
+            return None
+        return response
+
+    def _error(self, request_id, code, message):
+        """A JSON-RPC error response"""
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+    def serve_stream(self, read_line, write):
+        """Answer requests read from one stream until it ends
+
+        Requests are handled concurrently and responses are written as they
+        complete, so they may arrive out of order; callers match them by id.
+        """
+        write_lock = threading.Lock()
+        pending = []
+
+        def respond(line):
+            response = self.handle_line(line)
+            if response is not None:
+                data = json.dumps(response, separators=(',', ':')) + '\n'
+                with write_lock:
+                    write(data)
+
+        while True:
+            line = read_line()
+            if not line:
+                break
+            if line.strip():
+                pending.append(self.executor.submit(respond, line))
+                pending = [f for f in pending if not f.done()]
+
+        # Finish what this stream asked for before it is closed
+        for future in pending:
+            future.result()
+
+    def serve_stdio(self):
+        """Serve requests on stdin, answering on stdout"""
+        def write(data):
+            sys.stdout.write(data)
+            sys.stdout.flush()
+
+        logger.info("Search service reading requests from stdin")
+        self.serve_stream(sys.stdin.readline, write)
+
+    def serve_socket(self, path):
+        """Serve requests on a Unix socket, one thread per connection"""
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                def write(data):
+                    self.wfile.write(data.encode('utf-8'))
+                    self.wfile.flush()
+
+                try:
+                    service.serve_stream(lambda: self.rfile.readline().decode('utf-8'), write)
+                except (BrokenPipeError, ConnectionResetError):
+                    logger.debug("Search client disconnected")
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+
+        with Server(path, Handler) as server:
+            logger.info(f"Search service listening on {path}")
+            try:
+                server.serve_forever()
+            finally:
+                if os.path.exists(path):
+                    os.remove(path)
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Amazon to eBay Arbitrage System search service')
+    parser.add_argument('--socket', default=SEARCH_SERVICE_CONFIG['socket_path'], help='Unix socket to listen on')
+    parser.add_argument('--stdio', action='store_true', help='Serve on stdin/stdout instead of a socket')
+    parser.add_argument('--workers', type=int, default=None, help='Requests handled concurrently')
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    # Logs go to stderr so stdout carries only responses in --stdio mode
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_arguments()
+
+    service = SearchService(max_workers=args.workers)
+    try:
+        if args.stdio:
+            service.serve_stdio()
+        else:
+            service.serve_socket(args.socket)
+    except KeyboardInterrupt:
+        logger.info("Search service stopped")
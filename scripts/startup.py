@@ -0,0 +1,159 @@
+"""
+Startup support for Amazon to eBay Arbitrage System
+
+Components are built on first use rather than at startup, so the
+scheduler starts without importing pandas, selenium, ebaysdk or the
+PA-API SDK and without launching a browser. StartupProfiler breaks
+startup time down into imports, component construction and milestones.
+"""
+
+import sys
+import time
+import builtins
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# As close to process start as a module can measure
+STARTED = time.perf_counter()
+
+class StartupProfiler:
+    """Records import times, component construction times and milestones
+
+    Imports are timed by wrapping builtins.__import__ once enabled; each
+    module is charged its inclusive time, and only the outermost imports
+    are listed so nested ones are not counted twice.
+    """
+
+    def __init__(self):
+        """Create a disabled profiler"""
+        self.enabled = False
+        self.imports = []
+        self.constructions = []
+        self.milestones = []
+        self._original_import = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        """Start timing imports"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def disable(self):
+        """Stop timing imports"""
+        if not self.enabled:
+            return
+        builtins.__import__ = self._original_import
+        self.enabled = False
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """builtins.__import__ replacement charging first imports their inclusive time"""
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                with self._lock:
+                    self.imports.append((name, time.perf_counter() - start))
+
+    @contextmanager
+    def timed(self, name):
+        """Record how long building the named component takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.constructions.append((name, elapsed))
+            logger.info(f"Built {name} in {elapsed:.3f}s")
+
+    def mark(self, name):
+        """Record a milestone at the current time since startup"""
+        with self._lock:
+            self.milestones.append((name, time.perf_counter() - STARTED))
+
+    def report(self, top=15):
+        """Startup breakdown as text"""
+        with self._lock:
+            imports = sorted(self.imports, key=lambda i: i[1], reverse=True)
+            constructions = list(self.constructions)
+            milestones = list(self.milestones)
+
+        lines = ["Startup profile", "=" * 60]
+
+        lines.append(f"Imports ({sum(t for _, t in imports):.3f}s across {len(imports)} top-level modules)")
+        for name, elapsed in imports[:top]:
+            lines.append(f"  {name:<44} {elapsed:>8.3f}s")
+
+        lines.append(f"Construction ({sum(t for _, t in constructions):.3f}s)")
+        for name, elapsed in constructions:
+            lines.append(f"  {name:<44} {elapsed:>8.3f}s")
+
+        lines.append("Milestones (since startup)")
+        for name, elapsed in milestones:
+            lines.append(f"  {name:<44} {elapsed:>8.3f}s")
+
+        return "\n".join(lines)
+
+PROFILER = StartupProfiler()
+
+# Enabled at import so the entry point's own imports are timed too
+if '--profile-startup' in sys.argv:
+    PROFILER.enable()
+
+class lazy_component:
+    """Decorator turning a builder method into an attribute built on first access
+
+    Works like functools.cached_property, but construction is serialized
+    so two scheduler threads never build the same component twice, and
+    its time is recorded by the startup profiler.
+    """
+
+    def __init__(self, builder):
+        """Wrap builder(instance), which returns the component"""
+        self.builder = builder
+        self.name = builder.__name__
+        self.__doc__ = builder.__doc__
+        self._lock = threading.RLock()
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        with self._lock:
+            if self.name not in instance.__dict__:
+                with PROFILER.timed(self.name):
+                    instance.__dict__[self.name] = self.builder(instance)
+            return instance.__dict__[self.name]
+
+def built(instance, name):
+    """The named lazy component if it has been built, else None"""
+    return instance.__dict__.get(name)
+
+def deferred(instance, component, method):
+    """Callable that builds the component on first call and runs method on it
+
+    Lets a scheduler register component methods without building the
+    components up front.
+    """
+    def call(*args, **kwargs):
+        return getattr(getattr(instance, component), method)(*args, **kwargs)
+
+    call.__name__ = f"{component}.{method}"
+    return call
@@ -0,0 +1,199 @@
+"""
+Tests for the database module
+"""
+
+import gc
+import logging
+import sqlite3
+import threading
+
+from config import SNAPSHOT_CONFIG
+from database import ArbitrageDatabase, INDEXES, RETIRED_INDEXES
+from product import Product
+
+def test_hot_queries_use_indexes(catalog):
+    """Every query in HOT_QUERIES is served without a full table scan"""
+    assert catalog.check_query_plans() == {}
+
+def test_setup_is_idempotent(catalog):
+    """Re-running setup keeps the managed indexes and the query plans"""
+    catalog.setup_database()
+    assert catalog.check_query_plans() == {}
+
+def test_managed_indexes_exist(db):
+    """setup_database creates every index in INDEXES"""
+    names = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert set(INDEXES) <= names
+
+def test_setup_drops_only_retired_indexes(db):
+    """Retired indexes are dropped on setup; indexes added by hand are kept"""
+    db.conn.execute(f"CREATE INDEX {RETIRED_INDEXES[0]} ON products (profit_margin)")
+    db.conn.execute("CREATE INDEX idx_products_title ON products (title)")
+    db.conn.commit()
+
+    db.setup_database()
+    names = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert RETIRED_INDEXES[0] not in names
+    assert 'idx_products_title' in names
+
+def test_upsert_reports_only_changed_prices(catalog):
+    """Re-sighting unchanged products writes nothing; a moved price is reported and logged"""
+    products = list(catalog.iter_unlisted_products())[:5]
+    seq = catalog.changes_since(0, 10 ** 6)[-1]['seq']
+
+    result = catalog.upsert_products(products)
+    assert result == {'inserted': 0, 'updated': 0, 'unchanged': 5, 'changed_asins': []}
+    assert catalog.changes_since(seq) == []
+
+    moved = Product(products[0].asin, products[0].title, products[0].amazon_cents + 100, products[0].ebay_cents)
+    new = Product('BNEW000001', 'New product', 2500, 4000)
+    result = catalog.upsert_products([moved, new, products[1]])
+    assert result == {'inserted': 1, 'updated': 1, 'unchanged': 1, 'changed_asins': [moved.asin]}
+
+    changes = catalog.changes_since(seq)
+    assert [(c['entity'], c['entity_key'], c['op']) for c in changes] == [
+        ('product', new.asin, 'insert'),
+        ('product', moved.asin, 'update')
+    ]
+    assert changes[1]['payload']['amazon_price'] == moved.amazon_price
+
+def test_unchanged_sighting_keeps_product_fresh(catalog):
+    """Seeing a product again at the same price renews its freshness without repricing it"""
+    product = next(catalog.iter_unlisted_products())
+    catalog.conn.execute(
+        "UPDATE products SET price_updated = datetime('now', '-3 days'), last_checked = datetime('now', '-3 days') WHERE asin = ?",
+        (product.asin,)
+    )
+    catalog.conn.commit()
+    assert catalog.get_known_asins([product.asin], fresh_within_hours=24) == set()
+
+    assert catalog.upsert_products([product])['unchanged'] == 1
+    assert catalog.get_known_asins([product.asin], fresh_within_hours=24) == {product.asin}
+    price_updated = catalog.conn.execute("SELECT price_updated FROM products WHERE asin = ?", (product.asin,)).fetchone()[0]
+    assert price_updated < catalog.conn.execute("SELECT datetime('now', '-2 days')").fetchone()[0]
+
+def test_bulk_insert_logs_new_products(db):
+    """add_products_bulk logs one insert per new product and ignores known ASINs"""
+    products = [Product(f"B{i:09d}", f"Product {i}", 1000 + i) for i in range(3)]
+
+    assert db.add_products_bulk(products) == {'inserted': 3, 'ignored': 0, 'updated': 0}
+    assert db.add_products_bulk(products) == {'inserted': 0, 'ignored': 3, 'updated': 0}
+    assert [c['entity_key'] for c in db.changes_since(0)] == [p.asin for p in products]
+
+def test_changes_since_resumes_and_prunes(catalog):
+    """Consumers page through the log by seq; pruning drops only expired entries"""
+    first = catalog.changes_since(0, limit=50)
+    second = catalog.changes_since(first[-1]['seq'], limit=50)
+    assert len(first) == len(second) == 50
+    assert second[0]['seq'] > first[-1]['seq']
+
+    assert catalog.prune_change_log(retention_days=7) == 0
+    catalog.conn.execute("UPDATE change_log SET changed_at = datetime('now', '-30 days') WHERE seq <= 100")
+    catalog.conn.commit()
+    assert catalog.prune_change_log(retention_days=7) == 100
+    assert catalog.changes_since(0, limit=1)[0]['seq'] == 101
+
+def test_mark_duplicate_leaves_unlisted_queue(catalog):
+    """Products marked as near-duplicates are skipped by the unlisted iterator"""
+    products = list(catalog.iter_unlisted_products())
+    margins = [p.profit_margin for p in products]
+    assert margins == sorted(margins, reverse=True)
+
+    assert catalog.mark_duplicate(products[0].id, products[1].id)
+    remaining = [p.id for p in catalog.iter_unlisted_products(page_size=7)]
+    assert remaining == [p.id for p in products[1:]]
+
+def _record_sale(db, order_id, amazon_cost, revenue):
+    """Place, fulfil and record the profit of one order"""
+    row_id = db.add_order(order_id, 'item1', 'Buyer', 'buyer@example.com', 'Address', revenue)
+    assert db.update_order_fulfilled(order_id, f"AMZ-{order_id}", f"TRACK-{order_id}")
+    assert db.record_profit(row_id, amazon_cost, revenue, round(revenue * 0.1, 2), round(revenue * 0.03, 2))
+    return row_id
+
+def test_profit_rollup_matches_raw_rows(db):
+    """record_profit keeps the daily rollup in step, and a backfill reproduces it"""
+    _record_sale(db, 'ORDER-1', 20.0, 35.0)
+    _record_sale(db, 'ORDER-2', 10.0, 18.0)
+
+    daily, totals = db.get_profit_report(use_snapshot=False)
+    assert len(daily) == 1
+    assert totals[0] == 2
+    assert abs(totals[2] - 53.0) < 1e-9
+    assert db.check_profit_rollup() == []
+
+    db.conn.execute("UPDATE daily_profit_rollup SET total_profit = total_profit + 1")
+    db.conn.commit()
+    assert len(db.check_profit_rollup()) == 1
+    assert db.backfill_profit_rollup() == 1
+    assert db.check_profit_rollup() == []
+
+def test_archive_moves_old_fulfilled_orders(db, tmp_path):
+    """Archived orders leave the hot tables but stay in history and the rollup"""
+    _record_sale(db, 'ORDER-OLD', 20.0, 35.0)
+    _record_sale(db, 'ORDER-NEW', 10.0, 18.0)
+    db.conn.execute('''
+    UPDATE orders SET date_ordered = '2024-01-10 09:00:00', date_fulfilled = '2024-01-12 09:00:00'
+    WHERE ebay_order_id = 'ORDER-OLD'
+    ''')
+    db.conn.commit()
+
+    assert db.archive_dir == str(tmp_path / 'arbitrage_archive')
+    assert db.archive_fulfilled_orders(older_than_days=90) == 1
+    assert [month for month, path in db.list_archives()] == ['2024_01']
+    assert db.conn.execute("SELECT ebay_order_id FROM orders").fetchall() == [('ORDER-NEW',)]
+
+    history = db.get_order_history('2024-01-01', '2024-02-01')
+    assert [(row[0], row[7]) for row in history] == [('ORDER-OLD', 35.0 - 20.0 - 3.5 - 1.05)]
+    assert db.check_profit_rollup() == []
+
+    # A repeated run finds nothing left to move
+    assert db.archive_fulfilled_orders(older_than_days=90) == 0
+
+def test_in_memory_database_has_no_archive():
+    """An in-memory database neither lists nor writes archives"""
+    db = ArbitrageDatabase(':memory:')
+    db.setup_database()
+    assert db.list_archives() == []
+    assert db.archive_fulfilled_orders() is None
+    db.close()
+
+def _snapshot_count(db):
+    """Products in the database's reporting snapshot"""
+    snapshot = sqlite3.connect(db.snapshot_path)
+    try:
+        return snapshot.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    finally:
+        snapshot.close()
+
+def test_snapshot_copies_in_steps(catalog, caplog):
+    """An undisturbed snapshot completes with the stepped backup"""
+    with caplog.at_level(logging.INFO, logger='database'):
+        assert catalog.take_snapshot(pages=4, sleep=0)
+    assert 'Took stepped reporting snapshot' in caplog.text
+    assert _snapshot_count(catalog) == 200
+    assert not catalog.snapshot_is_stale()
+
+def test_snapshot_falls_back_to_single_step(catalog, monkeypatch, caplog):
+    """A stepped copy that runs too long is redone in one step"""
+    monkeypatch.setitem(SNAPSHOT_CONFIG, 'max_step_seconds', 0)
+    with caplog.at_level(logging.INFO, logger='database'):
+        assert catalog.take_snapshot(pages=1, sleep=0)
+    assert 'Took single-step reporting snapshot' in caplog.text
+    assert _snapshot_count(catalog) == 200
+
+def test_pooled_connections_close_with_their_threads(db):
+    """Short-lived worker threads do not leave connections in the pool"""
+    def work():
+        db.changes_since(0)
+
+    for _ in range(5):
+        threads = [threading.Thread(target=work) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        gc.collect()
+        assert len(db._pool) <= 1
+
+    db.release_thread_connection()
+    assert db._pool == []
@@ -0,0 +1,126 @@
+"""
+Tests for the eBay comparables engine against a local Finding API stand-in
+"""
+
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from api_cache import ResponseCache
+from ebay_comparables import EbayComparables, FindingApiBackend
+from product import Product
+from rate_limiter import TokenBucket
+
+TITLE = 'Acme Wireless Mouse M100 Black'
+
+def _item(title, price, shipping=None):
+    """One Finding API search result item"""
+    item = {'title': [title], 'sellingStatus': [{'currentPrice': [{'__value__': str(price)}]}]}
+    if shipping is not None:
+        item['shippingInfo'] = [{'shippingServiceCost': [{'__value__': str(shipping)}]}]
+    return item
+
+class FindingStandIn(BaseHTTPRequestHandler):
+    """Answers Finding API GETs from the server's listings, keyed by operation"""
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        self.server.requests.append(params)
+        operation = params['OPERATION-NAME']
+        items = self.server.listings.get(operation, [])
+        body = json.dumps({f'{operation}Response': [{'searchResult': [{'item': items}]}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def finding_server():
+    """A Finding API stand-in on localhost; set .listings and read .requests"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FindingStandIn)
+    server.listings = {}
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def comparables(finding_server, tmp_path):
+    """An engine whose backend points at the stand-in, with a fresh comps cache"""
+    backend = FindingApiBackend(
+        endpoint=f"http://127.0.0.1:{finding_server.server_address[1]}/services/search/FindingService/v1",
+        app_id='test-app',
+        rate_limiter=TokenBucket(rate=1000, capacity=10)
+    )
+    cache = ResponseCache(path=str(tmp_path / 'comps.sqlite'), ttls={}, default_ttl=3600, stale_while_revalidate=0)
+    return EbayComparables(backend, cache)
+
+def test_backend_uses_configured_endpoint(comparables, finding_server):
+    """Requests reach the configured endpoint with the Finding API parameters"""
+    finding_server.listings['findCompletedItems'] = [_item(TITLE, 20.0, shipping=4.5)]
+
+    listings = comparables.backend.search(keywords='acme mouse', sold=True, limit=10)
+
+    assert listings == [{'title': TITLE, 'price': 24.5}]
+    params = finding_server.requests[0]
+    assert params['OPERATION-NAME'] == 'findCompletedItems'
+    assert params['SECURITY-APPNAME'] == 'test-app'
+    assert params['keywords'] == 'acme mouse'
+    assert params['paginationInput.entriesPerPage'] == '10'
+
+def test_estimate_from_sold_listings_ignores_outliers(comparables, finding_server):
+    """Enough sold comps give a sold-only estimate that outliers do not move"""
+    prices = [1.0, 24.0, 25.0, 26.0, 27.0, 28.0, 400.0]
+    finding_server.listings['findCompletedItems'] = [_item(TITLE, p) for p in prices]
+
+    result = comparables.estimate(TITLE)
+
+    assert result == {'price': 26.0, 'comps': 7, 'source': 'sold'}
+    assert [r['OPERATION-NAME'] for r in finding_server.requests] == ['findCompletedItems']
+
+def test_estimate_falls_back_to_active_listings(comparables, finding_server):
+    """Too few sold comps add active listings to the estimate"""
+    finding_server.listings['findCompletedItems'] = [_item(TITLE, 30.0)]
+    finding_server.listings['findItemsAdvanced'] = [_item(TITLE, p) for p in (32.0, 34.0, 36.0)]
+
+    result = comparables.estimate(TITLE)
+
+    assert result == {'price': 33.0, 'comps': 4, 'source': 'sold+active'}
+    assert [r['OPERATION-NAME'] for r in finding_server.requests] == ['findCompletedItems', 'findItemsAdvanced']
+
+def test_upc_lookup_ignores_listing_titles(comparables, finding_server):
+    """A UPC match counts whatever the listing title says"""
+    finding_server.listings['findCompletedItems'] = [_item(f'Listing {i}', 40.0 + i) for i in range(3)]
+
+    result = comparables.estimate(TITLE, upc='012345678905')
+
+    assert result['price'] == 41.0
+    params = finding_server.requests[0]
+    assert (params['productId.@type'], params['productId']) == ('UPC', '012345678905')
+
+def test_dissimilar_or_missing_comps_give_no_estimate(comparables, finding_server):
+    """Listings for other products are not comps"""
+    finding_server.listings['findCompletedItems'] = [_item('Garden Hose 50ft Green', 20.0)] * 5
+
+    assert comparables.estimate(TITLE) is None
+
+def test_queries_are_cached(comparables, finding_server):
+    """A repeated query is answered from the cache, and shared titles are looked up once"""
+    finding_server.listings['findCompletedItems'] = [_item(TITLE, p) for p in (20.0, 22.0, 24.0)]
+    products = [Product(f"B{i:09d}", TITLE, 1500) for i in range(3)]
+
+    first = comparables.estimate_prices(products)
+    assert first == {p.asin: 22.0 for p in products}
+    assert len(finding_server.requests) == 1
+
+    assert comparables.estimate(TITLE)['price'] == 22.0
+    assert len(finding_server.requests) == 1
@@ -0,0 +1,96 @@
+"""
+Tests for the price calculator and repricing policy
+"""
+
+import time
+
+import numpy as np
+
+import fees
+from price_calculator import PriceCalculator
+from repricing_policy import RepricingPolicy, DAY
+
+def list_products(db, count, markup=1.6):
+    """List the first count products at markup times their Amazon price"""
+    rows = db.conn.execute("SELECT id, amazon_price FROM products ORDER BY id LIMIT ?", (count,)).fetchall()
+    for product_id, amazon_price in rows:
+        assert db.update_product_listed_status(product_id, f"item{product_id}", f"Listing {product_id}",
+                                               round(amazon_price * markup, 2))
+
+def test_round_to_price_point():
+    """Prices round up to the next allowed ending, exact endings stay put"""
+    prices = np.array([10.00, 10.49, 10.50, 10.99, 11.00])
+    rounded = fees.round_to_price_point(prices, (0.49, 0.99))
+    assert np.allclose(rounded, [10.49, 10.49, 10.99, 10.99, 11.49])
+
+def test_update_prices_writes_only_changed_targets(catalog):
+    """Targets clear the markup floor, and a second run with no price moves writes nothing"""
+    list_products(catalog, 50)
+    calculator = PriceCalculator(catalog)
+    products_before = catalog.conn.execute("SELECT id, ebay_price, content_hash FROM products").fetchall()
+    seq = catalog.changes_since(0, 10 ** 6)[-1]['seq']
+
+    assert calculator.update_prices() > 0
+    assert calculator.last_run['listings'] == 50
+    assert calculator.update_prices() == 0
+
+    arrays = calculator.load_arrays()
+    assert (np.round(arrays['target_price'] * 100) >= calculator.compute_floors(arrays)).all()
+
+    # Targets live on the listing; products and the change log are untouched
+    assert catalog.conn.execute("SELECT id, ebay_price, content_hash FROM products").fetchall() == products_before
+    assert catalog.changes_since(seq) == []
+
+def test_reprice_changed_runs_only_on_changes(catalog):
+    """Discovery results with no changed products leave listings alone"""
+    list_products(catalog, 10)
+    calculator = PriceCalculator(catalog)
+
+    assert calculator.reprice_changed([]) == 0
+    assert calculator.last_run == {}
+    assert calculator.reprice_changed(['B000000000']) == 10
+    assert calculator.last_run['listings'] == 10
+
+def test_plan_is_independent_of_page_size(catalog):
+    """Streaming candidates in small pages queues the same revisions as one big page"""
+    list_products(catalog, 120, markup=1.0)
+    assert PriceCalculator(catalog).update_prices() > 0
+
+    policy = RepricingPolicy(catalog)
+    now = time.time() + 2 * DAY
+    plan = policy.plan(now, page_size=500)
+    assert plan
+    assert policy.last_plan['candidates'] == 120
+    assert policy.plan(now, page_size=7) == plan
+
+def test_plan_respects_daily_budget(catalog):
+    """Revisions recorded in the last day shrink the queue"""
+    list_products(catalog, 20, markup=1.0)
+    PriceCalculator(catalog).update_prices()
+
+    config = dict(RepricingPolicy().config, daily_revision_budget=5)
+    policy = RepricingPolicy(catalog, config)
+    now = int(time.time() + 2 * DAY)
+
+    plan = policy.plan(now)
+    assert len(plan) == 5
+    assert policy.last_plan['over_budget'] == policy.last_plan['due'] - 5
+
+    item_id, current, new_price = plan[0]
+    assert catalog.record_listing_revision(item_id, current, new_price, now=now)
+    assert catalog.count_listing_revisions_since(now - DAY) == 1
+    assert len(policy.plan(now)) == 4
+
+def test_record_listing_revision_logs_change(catalog):
+    """A revision updates the listed price and appears in the change log"""
+    list_products(catalog, 3, markup=1.0)
+    PriceCalculator(catalog).update_prices()
+    item_id, current, new_price = RepricingPolicy(catalog).plan(time.time() + 2 * DAY)[0]
+    seq = catalog.changes_since(0, 10 ** 6)[-1]['seq']
+
+    assert catalog.record_listing_revision(item_id, current, new_price)
+
+    changes = catalog.changes_since(seq)
+    assert [(c['entity'], c['entity_key'], c['op']) for c in changes] == [('listing', item_id, 'update')]
+    assert changes[0]['payload']['current_price'] == new_price
+    assert item_id not in [row[0] for row in catalog.iter_revision_candidates()]
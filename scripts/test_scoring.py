@@ -0,0 +1,50 @@
+"""
+Tests for batch profitability scoring
+"""
+
+import numpy as np
+
+import fees
+from benchmark import CATEGORIES, synthetic_candidates
+from price_calculator import PriceCalculator
+from product import Product
+from scoring import filter_profitable, filter_profitable_loop, products_frame, score_frame
+
+def test_batch_matches_loop():
+    """The vectorized path keeps the same products with the same figures as the loop"""
+    batch = filter_profitable(synthetic_candidates(2000))
+    loop = filter_profitable_loop(synthetic_candidates(2000))
+
+    assert [p.asin for p in batch] == [p.asin for p in loop]
+    assert [p.ebay_cents for p in batch] == [p.ebay_cents for p in loop]
+    assert [p.net_profit_cents for p in batch] == [p.net_profit_cents for p in loop]
+
+def test_discovery_charges_category_fee_rates():
+    """Scoring charges each category's final value fee, not the flat rate"""
+    products = [Product.from_prices(f"B{i:09d}", 'Candidate', 40.0, 60.0, category=c)
+                for i, c in enumerate(CATEGORIES + ['Unknown'])]
+    frame = score_frame(products_frame(products))
+
+    rates = fees.category_fee_rates([p.category for p in products])
+    assert np.allclose(frame['ebay_fees'], 60.0 * rates)
+    assert frame['ebay_fees'].iloc[-1] == 60.0 * fees.FEE_CONFIG['ebay_fee_rate']
+
+def test_discovery_agrees_with_repricing_floor():
+    """A product listed at the repricer's floor scores at the markup in discovery"""
+    markup = 0.2
+    amazon = np.array([19.99, 45.50, 80.00, 99.95, 30.00, 64.25])
+    categories = CATEGORIES + ['Unknown']
+    calculator = PriceCalculator(markup=markup)
+    floors = calculator.compute_floors({
+        'amazon_price': amazon,
+        'fee_rate': fees.category_fee_rates(categories)
+    })
+
+    products = [Product(f"B{i:09d}", 'Candidate', int(round(a * 100)), int(floor), category=c)
+                for i, (a, floor, c) in enumerate(zip(amazon, floors, categories))]
+    frame = score_frame(products_frame(products))
+    profit = frame['net_profit'].to_numpy()
+
+    # The floor is rounded up to the cent, so it clears the markup by less than a cent
+    assert (profit >= markup * amazon - 1e-9).all()
+    assert (profit < markup * amazon + 0.01).all()
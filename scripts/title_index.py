@@ -0,0 +1,229 @@
+"""
+MinHash/LSH title-similarity index for Amazon to eBay Arbitrage System
+
+Answers "which titles are most similar to this one" without comparing
+against every title in the catalog.
+"""
+
+import re
+import hashlib
+import logging
+
+import numpy as np
+
+from config import TITLE_INDEX_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no identity in listing titles
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'the', 'for', 'with', 'of', 'in', 'on', 'to', 'by', 'new',
+    'brand', 'free', 'shipping', 'fast', 'genuine', 'original', 'authentic', 'sealed'
+})
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Signatures are persisted, so the permutations must never change between
+# runs; changing this seed invalidates every stored signature
+MINHASH_SEED = 1729
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+def title_tokens(title):
+    """Lowercased alphanumeric tokens of a title, without stopwords"""
+    return [t for t in TOKEN_PATTERN.findall((title or '').lower()) if t not in STOPWORDS]
+
+def shingles(title):
+    """Distinct word unigrams and bigrams of a title"""
+    tokens = title_tokens(title)
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+class MinHasher:
+    """Computes fixed-length MinHash signatures of shingle sets"""
+
+    def __init__(self, num_perm=None):
+        """Draw the hash permutations from the fixed seed"""
+        self.num_perm = num_perm or TITLE_INDEX_CONFIG['num_perm']
+        rng = np.random.RandomState(MINHASH_SEED)
+        self._a = rng.randint(1, MAX_HASH, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, MAX_HASH, size=self.num_perm, dtype=np.uint64)
+
+    def signature(self, title):
+        """MinHash signature of a title as a uint32 array of num_perm values"""
+        hashed = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+             for s in shingles(title)),
+            dtype=np.uint64
+        )
+        if not hashed.size:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+
+        # a < 2^32 and x < 2^32, so a * x + b stays inside uint64
+        permuted = (np.outer(hashed, self._a) + self._b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def to_bytes(self, signature):
+        """Serialize a signature for storage"""
+        return signature.astype('<u4').tobytes()
+
+    def from_bytes(self, blob):
+        """Deserialize a stored signature, or None if it has the wrong length"""
+        if len(blob) != self.num_perm * 4:
+            return None
+        return np.frombuffer(blob, dtype='<u4').astype(np.uint32)
+
+class TitleIndex:
+    """LSH index over MinHash signatures for top-k similar-title queries
+
+    Signatures are split into bands; titles that agree on every row of at
+    least one band become candidates, and candidates are ranked by the
+    share of signature values they have in common with the query, an
+    estimate of the Jaccard similarity of their shingle sets. The main
+    index is kept as sorted per-band hash arrays; titles added afterwards
+    sit in a small overflow table until the next rebuild.
+    """
+
+    def __init__(self, num_perm=None, bands=None):
+        """Create an empty index"""
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands or TITLE_INDEX_CONFIG['bands']
+        if self.hasher.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.hasher.num_perm}) must be a multiple of bands ({self.bands})")
+        self.rows = self.hasher.num_perm // self.bands
+
+        rng = np.random.RandomState(MINHASH_SEED + 1)
+        self._band_mix = rng.randint(1, MAX_HASH, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+        self.keys = []
+        self._signatures = np.empty((0, self.hasher.num_perm), dtype=np.uint32)
+        self._sorted_hashes = []
+        self._sorted_positions = []
+        self._pending = []
+        self._pending_buckets = [{} for _ in range(self.bands)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _band_hashes(self, signatures):
+        """One uint64 hash per band for each signature row"""
+        banded = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        # Wrapping uint64 arithmetic is intended here
+        with np.errstate(over='ignore'):
+            return (banded * self._band_mix).sum(axis=2)
+
+    def build(self, items):
+        """Replace the index contents with (key, signature) pairs"""
+        items = list(items)
+        self.keys = [key for key, _ in items]
+        self._signatures = (np.vstack([sig for _, sig in items]) if items
+                            else np.empty((0, self.hasher.num_perm), dtype=np.uint32))
+        self._pending = []
+        self._pending_buckets = [{} for _ in range(self.bands)]
+        self._index_bands()
+
+    def _index_bands(self):
+        """Sort every band's hashes for binary-search lookups"""
+        hashes = self._band_hashes(self._signatures)
+        self._sorted_hashes = []
+        self._sorted_positions = []
+
+        for band in range(self.bands):
+            order = np.argsort(hashes[:, band], kind='stable')
+            self._sorted_hashes.append(hashes[order, band])
+            self._sorted_positions.append(order)
+
+    def add(self, key, title=None, signature=None):
+        """Add one title (or precomputed signature) under key"""
+        if signature is None:
+            signature = self.hasher.signature(title)
+
+        position = len(self.keys) + len(self._pending)
+        self._pending.append((key, signature))
+        for band, value in enumerate(self._band_hashes(signature[np.newaxis, :])[0]):
+            self._pending_buckets[band].setdefault(int(value), []).append(position)
+
+        if len(self._pending) >= TITLE_INDEX_CONFIG['rebuild_after']:
+            self.rebuild()
+
+    def rebuild(self):
+        """Fold pending additions into the sorted band arrays"""
+        if not self._pending:
+            return
+        self.build(list(zip(self.keys, self._signatures)) + self._pending)
+
+    def _signature_at(self, position):
+        """Signature of the title at an index position, main or pending"""
+        if position < len(self.keys):
+            return self._signatures[position]
+        return self._pending[position - len(self.keys)][1]
+
+    def _key_at(self, position):
+        """Key of the title at an index position, main or pending"""
+        if position < len(self.keys):
+            return self.keys[position]
+        return self._pending[position - len(self.keys)][0]
+
+    def query(self, title=None, k=10, min_similarity=0.0, signature=None):
+        """Top-k most similar indexed titles as (key, estimated similarity), best first"""
+        if signature is None:
+            signature = self.hasher.signature(title)
+
+        band_hashes = self._band_hashes(signature[np.newaxis, :])[0]
+        candidates = set()
+
+        for band, value in enumerate(band_hashes):
+            hashes = self._sorted_hashes[band] if self._sorted_hashes else None
+            if hashes is not None and len(hashes):
+                lo = np.searchsorted(hashes, value, side='left')
+                hi = np.searchsorted(hashes, value, side='right')
+                if hi > lo:
+                    candidates.update(self._sorted_positions[band][lo:hi].tolist())
+            candidates.update(self._pending_buckets[band].get(int(value), ()))
+
+        if not candidates:
+            return []
+
+        positions = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        main = positions[positions < len(self.keys)]
+        pending = positions[positions >= len(self.keys)]
+
+        signatures = self._signatures[main]
+        if len(pending):
+            signatures = np.vstack([signatures] + [self._signature_at(p)[np.newaxis, :] for p in pending.tolist()])
+        positions = np.concatenate([main, pending])
+
+        similarity = (signatures == signature).mean(axis=1)
+        keep = similarity >= min_similarity
+        positions, similarity = positions[keep], similarity[keep]
+
+        top = np.argsort(-similarity, kind='stable')[:k]
+        return [(self._key_at(int(positions[i])), float(similarity[i])) for i in top]
+
+    @classmethod
+    def from_database(cls, db, listed_only=False):
+        """Build an index over product titles keyed by product id
+
+        Signatures missing from title_signatures, or stored with a
+        different num_perm, are computed and stored first, so later builds
+        only read them back.
+        """
+        index = cls()
+        missing = []
+
+        for product_id, title in db.iter_products_missing_title_signature(index.hasher.num_perm * 4):
+            missing.append((product_id, index.hasher.to_bytes(index.hasher.signature(title))))
+            if len(missing) >= TITLE_INDEX_CONFIG['save_batch_size']:
+                db.save_title_signatures(missing)
+                missing = []
+        if missing:
+            db.save_title_signatures(missing)
+
+        items = []
+        for product_id, blob in db.iter_title_signatures(listed_only=listed_only):
+            signature = index.hasher.from_bytes(blob)
+            if signature is not None:
+                items.append((product_id, signature))
+
+        index.build(items)
+        logger.info(f"Built title index over {len(index)} products")
+        return index